@@ -0,0 +1,8 @@
+# Benchmarks run offline against the file mock DAO, configured the same
+# way as the test runner
+from commonconf.backends import use_configparser_backend
+from os.path import abspath, dirname
+import os
+
+use_configparser_backend(abspath(os.path.join(
+    dirname(__file__), "..", "travis-ci", "test.conf")), 'NWS')
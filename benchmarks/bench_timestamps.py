@@ -0,0 +1,42 @@
+"""
+Compares Subscription.from_json using dateutil and parse_datetime on a
+synthetic subscription payload.
+
+    python -m benchmarks.bench_timestamps [count]
+"""
+
+from benchmarks.fixtures import subscriptions_payload
+from uw_nws.models import Subscription, parse_datetime
+from uw_nws import models
+import dateutil.parser
+import json
+import mock
+import sys
+import timeit
+
+
+def build_subscriptions(data):
+    return [Subscription.from_json(d) for d in data["Subscriptions"]]
+
+
+def main(count=10000, repeat=3):
+    data = json.loads(subscriptions_payload(count))
+
+    def run():
+        return min(timeit.repeat(
+            lambda: build_subscriptions(data), number=1, repeat=repeat))
+
+    with mock.patch.object(models, "parse_datetime", dateutil.parser.parse):
+        dateutil_time = run()
+
+    parse_datetime.cache_clear()
+    fast_time = run()
+
+    print("{} subscriptions".format(count))
+    print("dateutil:       {:.3f}s".format(dateutil_time))
+    print("parse_datetime: {:.3f}s".format(fast_time))
+    print("speedup:        {:.1f}x".format(dateutil_time / fast_time))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
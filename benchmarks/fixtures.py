@@ -0,0 +1,71 @@
+"""
+Synthetic NWS payloads for benchmarks.
+"""
+
+from datetime import datetime, timedelta
+import json
+import uuid
+
+CHANNEL_ID = "b779df7b-d6f6-4afb-8165-8dbe6232119f"
+START = datetime(2012, 11, 13, 22, 51, 51)
+
+
+def timestamp(seconds):
+    return "{}+00:00".format(
+        (START + timedelta(seconds=seconds)).isoformat(sep=" "))
+
+
+def endpoint_json(index):
+    endpoint_id = str(uuid.UUID(int=index))
+    return {
+        "EndpointID": endpoint_id,
+        "EndpointURI": "/notification/v1/endpoint/{}".format(endpoint_id),
+        "EndpointAddress": "user{}@uw.edu".format(index),
+        "Carrier": None,
+        "Protocol": "Email",
+        "SubscriberID": "user{}".format(index),
+        "OwnerID": "user{}".format(index),
+        "Status": "verified",
+        "Active": True,
+        "Default": True,
+        "Created": timestamp(index),
+        "LastModified": timestamp(index + 60),
+    }
+
+
+def channel_json(index=0, channel_id=CHANNEL_ID):
+    return {
+        "ChannelID": channel_id,
+        "ChannelURI": "/notification/v1/channel/{}".format(channel_id),
+        "SurrogateID": "2012,autumn,cse,{},w".format(100 + index),
+        "Type": "uw_student_courseavailable",
+        "Name": "CSE {}".format(100 + index),
+        "Description": "Synthetic channel",
+        "Expires": timestamp(86400 * 90),
+        "Created": timestamp(0),
+        "LastModified": timestamp(0),
+        "Tags": {"sln": str(10000 + index), "year": "2012",
+                 "quarter": "autumn"},
+    }
+
+
+def subscription_json(index, channel=None):
+    subscription_id = str(uuid.UUID(int=(1 << 64) + index))
+    return {
+        "SubscriptionID": subscription_id,
+        "SubscriptionURI": "/notification/v1/subscription/{}".format(
+            subscription_id),
+        "Channel": channel if channel is not None else channel_json(),
+        "Endpoint": endpoint_json(index),
+        "Created": timestamp(index),
+        "LastModified": timestamp(index + 120),
+    }
+
+
+def subscriptions_payload(count):
+    channel = channel_json()
+    return json.dumps({
+        "Subscriptions": [
+            subscription_json(i, channel) for i in range(count)],
+        "TotalCount": count,
+    })
@@ -0,0 +1,210 @@
+"""
+Benchmarks for model serialization, validation and the mock DAO request
+paths.  Results are written as JSON so that runs can be compared:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --compare before.json --output after.json
+"""
+
+from benchmarks.fixtures import (
+    CHANNEL_ID, subscriptions_payload, subscription_json)
+from uw_nws import NWS
+from uw_nws.models import Dispatch, Subscription
+from uw_nws.utilities import fdao_nws_override
+from restclients_core.dao import MockDAO
+from contextlib import contextmanager
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def best_of(func, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@benchmark
+def subscription_from_json(count, repeat):
+    data = [subscription_json(i) for i in range(count)]
+
+    def run():
+        for datum in data:
+            Subscription.from_json(datum)
+    return count, best_of(run, repeat)
+
+
+@benchmark
+def person_json_data(count, repeat):
+    person = NWS().get_person_by_uwregid("9136CCB8F66711D5BE060004AC494FFE")
+
+    def run():
+        for i in range(count):
+            person.json_data()
+    return count, best_of(run, repeat)
+
+
+@benchmark
+def validation(count, repeat):
+    nws = NWS()
+    uuids = [str(uuid.UUID(int=i)) for i in range(count)]
+
+    def run():
+        for value in uuids:
+            nws._validate_uuid(value)
+            nws._validate_regid("9136CCB8F66711D5BE060004AC494FFE")
+            nws._validate_subscriber_id("javerage@washington.edu")
+            nws._validate_endpoint_protocol("Email")
+    return count, best_of(run, repeat)
+
+
+@benchmark
+def construction(count, repeat):
+    def run():
+        for i in range(count):
+            nws = NWS(actas_user="javerage")
+            nws._validate_uuid("b779df7b-d6f6-4afb-8165-8dbe6232119f")
+            nws._validate_subscriber_id("javerage")
+    return count, best_of(run, repeat)
+
+
+@contextmanager
+def mock_resource(name, data):
+    """
+    Registers a temporary mock resource for an NWS url path.
+    """
+    path = tempfile.mkdtemp()
+    try:
+        resource_dir = os.path.join(path, "nws", "file", "notification", "v1")
+        os.makedirs(resource_dir)
+        with open(os.path.join(resource_dir, name), "w") as f:
+            f.write(data)
+
+        MockDAO.register_mock_path(path)
+        yield
+    finally:
+        if path in MockDAO.paths:
+            MockDAO.paths.remove(path)
+        shutil.rmtree(path)
+
+
+@benchmark
+def search_subscriptions(count, repeat):
+    channel_id = "00000000-0000-4000-8000-{:012d}".format(count)
+    with mock_resource("subscription_channel_id_{}".format(channel_id),
+                       subscriptions_payload(count)):
+        nws = NWS()
+        return count, best_of(
+            lambda: nws.search_subscriptions(channel_id=channel_id), repeat)
+
+
+@benchmark
+def create_dispatches(count, repeat):
+    dispatches = []
+    for i in range(count):
+        dispatch = Dispatch()
+        dispatch.dispatch_id = str(uuid.UUID(int=i))
+        dispatch.message = {"Body": "Seat available", "Channel": CHANNEL_ID}
+        dispatches.append(dispatch)
+
+    # The mock DAO returns the resource for any method, so this answers
+    # each dispatch POST with a 200
+    with mock_resource("dispatch", ""):
+        nws = NWS(actas_user="javerage")
+
+        def run():
+            results = nws.create_dispatches(dispatches, max_in_flight=10)
+            if not all(result.is_success() for result in results):
+                raise RuntimeError("Mock dispatch POST failed")
+        return count, best_of(run, repeat)
+
+
+def run_benchmarks(count, repeat, names=None):
+    results = {}
+    with fdao_nws_override:
+        for func in BENCHMARKS:
+            if names and func.__name__ not in names:
+                continue
+            operations, seconds = func(count, repeat)
+            results[func.__name__] = {
+                "operations": operations,
+                "seconds": seconds,
+                "operations_per_second": operations / seconds,
+            }
+    return {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "count": count,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Prints the change in throughput for each benchmark, returning the names
+    of those that are slower than the baseline by more than threshold.
+    """
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["operations_per_second"]
+        after = result["operations_per_second"]
+        change = (after - before) / before
+        print("{:<24} {:>12.0f} -> {:>12.0f} ops/s {:>+8.1%}".format(
+            name, before, after, change))
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("names", nargs="*", help="benchmarks to run")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="file to write results to")
+    parser.add_argument("--compare", help="results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.count, args.repeat, args.names)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print("Regressions: {}".format(", ".join(regressions)))
+            return 1
+    else:
+        for name, result in sorted(results["results"].items()):
+            print("{:<24} {:>12.0f} ops/s".format(
+                name, result["operations_per_second"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,11 +22,17 @@ setup(
     author="UW-IT AXDD",
     author_email="aca-it@uw.edu",
     include_package_data=True,
+    python_requires='>=3.7',
     install_requires=[
         'UW-RestClients-Core>1.0,<2.0',
+        'prometheus-client',
         'python-dateutil',
         'mock',
     ],
+    extras_require={
+        'orjson': ['orjson'],
+        'msgspec': ['msgspec'],
+    },
     license='Apache License, Version 2.0',
     description=(
         'A library for connecting to the Notification Web Service at '
@@ -39,6 +45,6 @@ setup(
         'License :: OSI Approved :: Apache Software License',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
     ],
 )
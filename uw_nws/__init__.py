@@ -7,17 +7,36 @@ from restclients_core.exceptions import (
 from uw_nws.exceptions import (
     InvalidUUID, InvalidEndpointProtocol, InvalidSurrogateID)
 from uw_nws.dao import NWS_DAO
-from uw_nws.models import Person, Channel, Endpoint, Subscription, MessageType
+from uw_nws.cache import LocalCache
+from uw_nws.codec import encode_model, dumps, loads
+from uw_nws.instrumentation import (
+    instrumented, bind_call, record_decode)
+from uw_nws.index import _subscriber_key
+from uw_nws.validators import (
+    validate_uuid, validate_uuids, validate_regid, validate_subscriber_id,
+    validate_person_id, validate_endpoint_protocol,
+    validate_message_type_surrogate)
+from uw_nws.utilities import (
+    iter_json_array, get_response_header, is_last_page)
+from uw_nws.models import (
+    Person, Channel, Endpoint, Subscription, MessageType, OperationResult,
+    BulkOperationReport, ReconciliationPlan, ChannelRecord,
+    SubscriptionRecord)
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from logging import getLogger
 from urllib.parse import quote, urlencode
-from datetime import datetime, time
-import json
-import re
+from datetime import datetime
+import threading
+import time
 
 MANAGED_ATTRIBUTES = (
     'DispatchedEmailCount', 'DispatchedTextMessageCount',
     'SentTextMessageCount', 'SubscriptionCount')
 API = "/notification/v1"
+SEARCH_PAGE_SIZE = 100
 DAO = NWS_DAO()
+logger = getLogger(__name__)
 
 
 class NWS(object):
@@ -25,16 +44,32 @@ class NWS(object):
     The NWS object has methods for getting, updating, deleting information
     about channels, subscriptions, endpoints, and templates.
     """
-    def __init__(self, actas_user=None):
+    _lookup_cache = None
+    _lookup_cache_lock = threading.Lock()
+    _validator_cache = None
+    _validator_cache_lock = threading.Lock()
+    _pending_requests = {}
+    _pending_requests_lock = threading.Lock()
+
+    def __init__(self, actas_user=None, subscription_index=None,
+                 write_buffer=None, dispatch_outbox=None, channel_index=None):
+        """
+        :param subscription_index: an optional SubscriptionIndex, kept up
+                                   to date by subscription changes and used
+                                   to answer is_subscribed
+        :param channel_index: an optional ChannelIndex, used to answer
+                              get_active_channels_by_sln_year_quarter for
+                              its term
+        :param write_buffer: an optional WriteBehindBuffer, used to collapse
+                             repeated person and endpoint updates
+        :param dispatch_outbox: an optional DispatchOutbox, which new
+                                dispatches are added to rather than posted
+        """
         self.actas_user = actas_user
-        self._re_uuid = re.compile(
-            r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
-        self._re_regid = re.compile(r'^[A-F0-9]{32}$', re.I)
-        self._re_subscriber_id = re.compile(
-            r'^([a-z]adm_)?[a-z][a-z0-9]{0,7}(@washington.edu)?$', re.I)
-        self._re_protocol = re.compile(r'^(Email|SMS)$', re.I)
-        self._re_message_type_surrogate = re.compile(
-            r'^uw_[a-z0-9|_]{1,37}$', re.I)
+        self.subscription_index = subscription_index
+        self.write_buffer = write_buffer
+        self.dispatch_outbox = dispatch_outbox
+        self.channel_index = channel_index
         self._read_headers = {"Accept": "application/json"}
 
     def _write_headers(self):
@@ -43,6 +78,7 @@ class NWS(object):
             write_headers["X_UW_ACT_AS"] = self.actas_user
         return write_headers
 
+    @instrumented(API + "/endpoint/{endpoint_id}")
     def get_endpoint_by_endpoint_id(self, endpoint_id):
         """
         Get an endpoint by endpoint id
@@ -55,9 +91,11 @@ class NWS(object):
         if response.status != 200:
             raise DataFailureException(url, response.status, response.data)
 
-        data = json.loads(response.data)
+        data = self._json_loads(response.data)
         return Endpoint.from_json(data.get("Endpoint"))
 
+    @instrumented(
+        API + "/endpoint?subscriber_id={subscriber_id}&protocol={protocol}")
     def get_endpoint_by_subscriber_id_and_protocol(
             self, subscriber_id, protocol):
         """
@@ -74,12 +112,13 @@ class NWS(object):
         if response.status != 200:
             raise DataFailureException(url, response.status, response.data)
 
-        data = json.loads(response.data)
+        data = self._json_loads(response.data)
         try:
             return Endpoint.from_json(data.get("Endpoints")[0])
         except IndexError:
             raise DataFailureException(url, 404, "No SMS endpoint found")
 
+    @instrumented(API + "/endpoint?endpoint_address={endpoint_address}")
     def get_endpoint_by_address(self, endpoint_addr):
         """
         Get an endpoint by address
@@ -91,12 +130,13 @@ class NWS(object):
         if response.status != 200:
             raise DataFailureException(url, response.status, response.data)
 
-        data = json.loads(response.data)
+        data = self._json_loads(response.data)
         try:
             return Endpoint.from_json(data.get("Endpoints")[0])
         except IndexError:
             raise DataFailureException(url, 404, "No SMS endpoint found")
 
+    @instrumented(API + "/endpoint?subscriber_id={subscriber_id}")
     def get_endpoints_by_subscriber_id(self, subscriber_id):
         """
         Search for all endpoints by a given subscriber
@@ -110,13 +150,14 @@ class NWS(object):
         if response.status != 200:
             raise DataFailureException(url, response.status, response.data)
 
-        data = json.loads(response.data)
+        data = self._json_loads(response.data)
 
         endpoints = []
         for datum in data.get("Endpoints", []):
             endpoints.append(Endpoint.from_json(datum))
         return endpoints
 
+    @instrumented(API + "/endpoint/{endpoint_id}/verification")
     def resend_sms_endpoint_verification(self, endpoint_id):
         """
         Calls NWS function to resend verification message to endpoint's
@@ -132,6 +173,7 @@ class NWS(object):
             raise DataFailureException(url, response.status, response.data)
         return response.status
 
+    @instrumented(API + "/endpoint/{endpoint_id}")
     def delete_endpoint(self, endpoint_id):
         """
         Deleting an existing endpoint
@@ -146,22 +188,20 @@ class NWS(object):
             raise DataFailureException(url, response.status, response.data)
         return response.status
 
+    @instrumented(API + "/endpoint/{endpoint_id}")
     def update_endpoint(self, endpoint):
         """
         Update an existing endpoint
         :param endpoint: is the updated endpoint the client wants to update
+        Returns 202 if the update is left in the write buffer
         """
         self._validate_uuid(endpoint.endpoint_id)
         self._validate_subscriber_id(endpoint.subscriber_id)
 
         url = "{}/endpoint/{}".format(API, endpoint.endpoint_id)
-        response = DAO.putURL(
-            url, self._write_headers(), self._json_body(endpoint.json_data()))
-
-        if response.status != 204:
-            raise DataFailureException(url, response.status, response.data)
-        return response.status
+        return self._put(url, self._model_body(endpoint))
 
+    @instrumented(API + "/endpoint")
     def create_endpoint(self, endpoint):
         """
         Create a new endpoint
@@ -171,35 +211,75 @@ class NWS(object):
 
         url = "{}/endpoint".format(API)
         response = DAO.postURL(
-            url, self._write_headers(), self._json_body(endpoint.json_data()))
+            url, self._write_headers(), self._model_body(endpoint))
 
         if response.status != 201:
             raise DataFailureException(url, response.status, response.data)
         return response.status
 
+    @instrumented(API + "/endpoint")
     def create_new_endpoint(self, endpoint):
         return self.create_endpoint(endpoint)
 
+    @instrumented(API + "/subscription/{subscription_id}")
     def delete_subscription(self, subscription_id):
         """
         Deleting an existing subscription
         :param subscription_id: is the subscription the client wants to delete
         """
         self._validate_uuid(subscription_id)
+        return self._delete_subscription(subscription_id)
+
+    @instrumented(API + "/subscription/{subscription_id}")
+    def delete_subscriptions(self, subscription_ids, max_in_flight=10):
+        """
+        Delete existing subscriptions, with up to max_in_flight requests at
+        a time
+        :param subscription_ids: an iterable of subscription ids to delete
+        Returns a BulkOperationReport, in the order of subscription_ids
+        """
+        subscription_ids = list(subscription_ids)
+        self._validate_uuids(subscription_ids)
 
+        return self._run_bulk(
+            self._delete_subscription, subscription_ids, max_in_flight)
+
+    def _delete_subscription(self, subscription_id):
         url = "{}/subscription/{}".format(API, subscription_id)
         response = DAO.deleteURL(url, self._write_headers())
 
         if response.status != 204:
             raise DataFailureException(url, response.status, response.data)
 
+        if self.subscription_index is not None:
+            self.subscription_index.remove(subscription_id)
         return response.status
 
+    @instrumented(API + "/subscription")
     def create_subscription(self, subscription):
         """
         Create a new subscription
         :param subscription: the new subscription the client wants to create
         """
+        self._validate_subscription(subscription)
+        return self._post_subscription(subscription)
+
+    @instrumented(API + "/subscription")
+    def create_subscriptions(self, subscriptions, max_in_flight=10):
+        """
+        Create new subscriptions, with up to max_in_flight requests at a
+        time
+        :param subscriptions: an iterable of new subscriptions to create
+        Returns a BulkOperationReport, in the order of subscriptions
+        """
+        subscriptions = list(subscriptions)
+        for subscription in subscriptions:
+            self._validate_subscription(subscription)
+
+        return self._run_bulk(
+            self._post_subscription, subscriptions, max_in_flight)
+
+    def _validate_subscription(self, subscription):
         if subscription.subscription_id is not None:
             self._validate_uuid(subscription.subscription_id)
 
@@ -214,25 +294,31 @@ class NWS(object):
         if subscription.channel is not None:
             self._validate_uuid(subscription.channel.channel_id)
 
+    def _post_subscription(self, subscription):
         url = "{}/subscription".format(API)
         response = DAO.postURL(
             url, self._write_headers(),
-            self._json_body(subscription.json_data()))
+            self._model_body(subscription))
 
         if response.status != 201:
             raise DataFailureException(url, response.status, response.data)
 
+        if self.subscription_index is not None:
+            self.subscription_index.add(subscription)
         return response.status
 
+    @instrumented(API + "/subscription")
     def create_new_subscription(self, subscription):
         return self.create_subscription(subscription)
 
+    @instrumented(API + "/subscription?{query}")
     def get_subscriptions_by_channel_id(self, channel_id):
         """
         Search for all subscriptions on a given channel
         """
         return self.search_subscriptions(channel_id=channel_id)
 
+    @instrumented(API + "/subscription?{query}")
     def get_subscriptions_by_subscriber_id(
             self, subscriber_id, max_results=10):
         """
@@ -241,14 +327,23 @@ class NWS(object):
         return self.search_subscriptions(
             subscriber_id=subscriber_id, max_results=max_results)
 
+    @instrumented(API + "/subscription?{query}")
     def get_subscriptions_by_channel_id_and_subscriber_id(
             self, channel_id, subscriber_id):
         """
-        Search for all subscriptions by a given channel and subscriber
+        Search for all subscriptions by a given channel and subscriber.
+        With a subscription index, a subscriber not indexed on the channel
+        has no subscriptions, without a request
         """
+        if (self.subscription_index is not None and
+                not self.subscription_index.is_subscribed(
+                    channel_id, subscriber_id)):
+            return []
+
         return self.search_subscriptions(
             channel_id=channel_id, subscriber_id=subscriber_id)
 
+    @instrumented(API + "/subscription?{query}")
     def get_subscriptions_by_channel_id_and_person_id(
             self, channel_id, person_id):
         """
@@ -257,37 +352,121 @@ class NWS(object):
         return self.search_subscriptions(
             channel_id=channel_id, person_id=person_id)
 
+    @instrumented(API + "/subscription?{query}")
     def get_subscription_by_channel_id_and_endpoint_id(
             self, channel_id, endpoint_id):
         """
-        Search for subscription by a given channel and endpoint
+        Search for subscription by a given channel and endpoint.  With a
+        subscription index, an endpoint not indexed on the channel is not
+        found, without a request
         """
-        subscriptions = self.search_subscriptions(
-            channel_id=channel_id, endpoint_id=endpoint_id)
-
-        try:
-            return subscriptions[0]
-        except IndexError:
-            raise DataFailureException(url, 404, "No subscription found")
-
-    def search_subscriptions(self, **kwargs):
+        kwargs = {"channel_id": channel_id, "endpoint_id": endpoint_id}
+        if (self.subscription_index is None or
+                self.subscription_index.has_endpoint(
+                    channel_id, endpoint_id)):
+            subscriptions = self.search_subscriptions(**kwargs)
+            if len(subscriptions):
+                return subscriptions[0]
+
+        raise DataFailureException(
+            self._search_url("subscription", kwargs), 404,
+            "No subscription found")
+
+    @instrumented(API + "/subscription?{query}")
+    def is_subscribed(self, channel_id, subscriber_id):
         """
-        Search for all subscriptions by parameters
+        Returns True if the subscriber has a subscription on the channel,
+        from the subscription index if there is one
         """
-        params = [(key, kwargs[key]) for key in sorted(kwargs.keys())]
-        url = "{}/subscription?{}".format(API, urlencode(params, doseq=True))
+        self._validate_uuid(channel_id)
+        self._validate_subscriber_id(subscriber_id)
 
-        response = DAO.getURL(url, self._read_headers)
+        if self.subscription_index is not None:
+            return self.subscription_index.is_subscribed(
+                channel_id, subscriber_id)
 
-        if response.status != 200:
-            raise DataFailureException(url, response.status, response.data)
+        return len(self.search_subscriptions(
+            channel_id=channel_id, subscriber_id=subscriber_id)) > 0
+
+    @instrumented(API + "/subscription?{query}")
+    def reconcile_channel(self, channel_id, desired_subscriber_ids,
+                          protocol="Email", dry_run=False, max_in_flight=10):
+        """
+        Creates and deletes subscriptions so that the subscribers on the
+        channel are desired_subscriber_ids.  Subscribers without a
+        subscription are subscribed with their protocol endpoint, and every
+        subscription of a subscriber not in desired_subscriber_ids is
+        deleted.  Subscriptions without a subscriber are left alone.
+        :param dry_run: return the plan without running it
+        Returns a ReconciliationPlan
+        """
+        self._validate_uuid(channel_id)
+        self._validate_endpoint_protocol(protocol)
 
-        data = json.loads(response.data)
+        desired = {}
+        for subscriber_id in desired_subscriber_ids:
+            self._validate_subscriber_id(subscriber_id)
+            desired.setdefault(_subscriber_key(subscriber_id), subscriber_id)
+
+        current = {}
+        for subscription in self.iter_subscriptions(
+                records=True, channel_id=channel_id):
+            endpoint = subscription.endpoint
+            if endpoint is None or not endpoint.subscriber_id:
+                continue
+            current.setdefault(_subscriber_key(
+                endpoint.subscriber_id), []).append(
+                    subscription.subscription_id)
+
+        creates = []
+        for key in sorted(desired.keys() - current.keys()):
+            subscription = Subscription()
+            subscription.channel = Channel(channel_id=channel_id)
+            subscription.endpoint = Endpoint(
+                subscriber_id=desired[key], protocol=protocol)
+            creates.append(subscription)
+
+        deletes = [subscription_id for key in sorted(
+            current.keys() - desired.keys()) for subscription_id in (
+                current[key])]
+
+        plan = ReconciliationPlan(
+            channel_id, creates, deletes,
+            unchanged=len(desired.keys() & current.keys()))
+        if not dry_run:
+            plan.deleted = self.delete_subscriptions(deletes, max_in_flight)
+            plan.created = self.create_subscriptions(creates, max_in_flight)
+        return plan
+
+    @instrumented(API + "/subscription?{query}")
+    def search_subscriptions(self, lazy=False, records=False, **kwargs):
+        """
+        Search for all subscriptions by parameters
+        :param lazy: return LazySubscription models, which decode each field
+                     on first access
+        :param records: return read-only SubscriptionRecord tuples
+        """
+        from_json = self._model_decoder(
+            Subscription, SubscriptionRecord, lazy, records)
         subscriptions = []
-        for datum in data.get("Subscriptions", []):
-            subscriptions.append(Subscription.from_json(datum))
+        for datum in self._timed_decode(iter_json_array(
+                self._search("subscription", kwargs), "Subscriptions")):
+            subscriptions.append(from_json(datum))
         return subscriptions
 
+    @instrumented(API + "/subscription?{query}")
+    def iter_subscriptions(self, lazy=False, records=False, **kwargs):
+        """
+        Search for all subscriptions by parameters, requesting one page of
+        max_results subscriptions at a time
+        """
+        from_json = self._model_decoder(
+            Subscription, SubscriptionRecord, lazy, records)
+        for datum in self._iter_search_pages(
+                "subscription", "Subscriptions", kwargs):
+            yield from_json(datum)
+
+    @instrumented(API + "/channel/{channel_id}")
     def get_channel_by_channel_id(self, channel_id):
         """
         Get a channel by channel id
@@ -296,20 +475,17 @@ class NWS(object):
 
         url = "{}/channel/{}".format(API, channel_id)
 
-        response = DAO.getURL(url, self._read_headers)
-
-        if response.status != 200:
-            raise DataFailureException(url, response.status, response.data)
-
-        data = json.loads(response.data)
+        data = self._get_cached_lookup(url, self._read_headers)
         return Channel.from_json(data.get("Channel"))
 
+    @instrumented(API + "/channel?{query}")
     def get_channels_by_sln(self, channel_type, sln):
         """
         Search for all channels by sln
         """
         return self.search_channels(type=channel_type, tag_sln=sln)
 
+    @instrumented(API + "/channel?{query}")
     def get_channels_by_sln_year_quarter(
             self, channel_type, sln, year, quarter):
         """
@@ -318,6 +494,29 @@ class NWS(object):
         return self.search_channels(
             type=channel_type, tag_sln=sln, tag_year=year, tag_quarter=quarter)
 
+    @instrumented(API + "/channel?{query}")
+    def get_active_channels_by_sln_year_quarter(
+            self, channel_type, sln, year, quarter, expires=None):
+        """
+        Search for all active channels by sln, year and quarter.  Without
+        an expires, lookups for the term of the channel index are answered
+        from the index
+        """
+        if (expires is None and self.channel_index is not None and
+                self.channel_index.covers(channel_type, year, quarter)):
+            self.channel_index.refresh_if_stale(self)
+            return self.channel_index.get_channels_by_sln(sln)
+
+        if expires is None:
+            # Set expires_after to midnight of current day
+            expires = datetime.combine(
+                datetime.utcnow().date(), datetime.min.time())
+
+        return self.search_channels(
+            type=channel_type, tag_sln=sln, tag_year=year, tag_quarter=quarter,
+            expires_after=expires.isoformat())
+
+    @instrumented(API + "/channel?{query}")
     def get_active_channels_by_year_quarter(
             self, channel_type, year, quarter, expires=None):
         """
@@ -325,49 +524,175 @@ class NWS(object):
         """
         if expires is None:
             # Set expires_after to midnight of current day
-            expires = datetime.combine(datetime.utcnow().date(), time.min)
+            expires = datetime.combine(
+                datetime.utcnow().date(), datetime.min.time())
 
         return self.search_channels(
             type=channel_type, tag_year=year, tag_quarter=quarter,
             expires_after=expires.isoformat())
 
-    def search_channels(self, **kwargs):
+    @instrumented(API + "/channel?{query}")
+    def search_channels(self, lazy=False, records=False, **kwargs):
         """
         Search for all channels by parameters
+        :param lazy: return LazyChannel models, which decode each field
+                     on first access
+        :param records: return read-only ChannelRecord tuples
+        """
+        from_json = self._model_decoder(
+            Channel, ChannelRecord, lazy, records)
+        channels = []
+        for datum in self._timed_decode(iter_json_array(
+                self._search("channel", kwargs), "Channels")):
+            channels.append(from_json(datum))
+        return channels
+
+    @instrumented(API + "/channel?{query}")
+    def iter_channels(self, lazy=False, records=False, **kwargs):
+        """
+        Search for all channels by parameters, requesting one page of
+        max_results channels at a time
         """
+        from_json = self._model_decoder(
+            Channel, ChannelRecord, lazy, records)
+        for datum in self._iter_search_pages("channel", "Channels", kwargs):
+            yield from_json(datum)
+
+    def _search_url(self, resource, kwargs):
         params = [(key, kwargs[key]) for key in sorted(kwargs.keys())]
-        url = "{}/channel?{}".format(API, urlencode(params, doseq=True))
+        return "{}/{}?{}".format(API, resource, urlencode(params, doseq=True))
+
+    def _search(self, resource, kwargs):
+        """
+        Returns the response body for a search.  Callers parse the body
+        with iter_json_array without holding a reference to it, so that
+        it can be released as soon as it has been decoded.
+        """
+        url = self._search_url(resource, kwargs)
 
         response = DAO.getURL(url, self._read_headers)
 
         if response.status != 200:
             raise DataFailureException(url, response.status, response.data)
 
-        data = json.loads(response.data)
-        channels = []
-        for datum in data.get("Channels", []):
-            channels.append(Channel.from_json(datum))
-        return channels
+        return response.data
 
+    def _search_page(self, url, etag=None, last_modified=None):
+        """
+        Returns the response for a page of search results.  With the
+        validators of an earlier response for url, the GET is conditional,
+        and the response is a 304 without a body if the page is unchanged.
+        """
+        headers = dict(self._read_headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response = DAO.getURL(url, headers)
+
+        if response.status == 304 and (etag or last_modified):
+            return response
+
+        if response.status != 200:
+            raise DataFailureException(url, response.status, response.data)
+
+        return response
+
+    def _model_decoder(self, model, record, lazy, records):
+        if records:
+            return record.from_json
+        return partial(model.from_json, lazy=lazy)
+
+    def _iter_search_pages(self, resource, key, kwargs):
+        """
+        Yields the json data for each search result, paging through the
+        results with the first_result and max_results parameters until
+        TotalCount results have been read, or a short page if the response
+        has no TotalCount
+        """
+        kwargs = dict(kwargs)
+        page_size = int(kwargs.setdefault("max_results", SEARCH_PAGE_SIZE))
+        first_result = int(kwargs.get("first_result", 1))
+
+        while True:
+            kwargs["first_result"] = first_result
+            members = {}
+            count = 0
+            for datum in self._timed_decode(iter_json_array(
+                    self._search(resource, kwargs), key, members)):
+                count += 1
+                yield datum
+
+            first_result += count
+            if is_last_page(count, page_size, first_result,
+                            members.get("TotalCount")):
+                break
+
+    @instrumented(API + "/person/{person_id}")
     def get_person_by_surrogate_id(self, surrogate_id):
         self._validate_subscriber_id(surrogate_id)
         return self._get_person_by_id(surrogate_id)
 
+    @instrumented(API + "/person/{person_id}")
     def get_person_by_uwregid(self, uwregid):
         self._validate_regid(uwregid)
         return self._get_person_by_id(uwregid)
 
-    def _get_person_by_id(self, identifier):
-        url = "{}/person/{}".format(API, identifier)
+    @instrumented(API + "/person/{person_id}")
+    def get_people(self, identifiers, max_in_flight=10):
+        """
+        Get people by uwregid or surrogate id, with up to max_in_flight
+        requests at a time
+        Returns a dict of OperationResult, keyed by identifier, holding the
+        exception raised for each person that could not be read
+        """
+        identifiers = list(dict.fromkeys(identifiers))
+        for identifier in identifiers:
+            self._validate_person_id(identifier)
 
-        response = DAO.getURL(url, {"Accept": "application/json"})
+        results = self._run_concurrently(
+            self._get_person_by_id, identifiers, max_in_flight)
+        return {result.item: result for result in results}
 
-        if response.status != 200:
-            raise DataFailureException(url, response.status, response.data)
+    def _get_person_by_id(self, identifier):
+        url = "{}/person/{}".format(API, identifier)
 
-        data = json.loads(response.data)
+        data = self._get_coalesced(url, {"Accept": "application/json"})
         return Person.from_json(data.get("Person"))
 
+    def _get_coalesced(self, url, headers):
+        """
+        Returns the decoded response for url.  Concurrent requests for the
+        same url share a single GET, each caller building its own model.
+        Each waiting caller gets its own DataFailureException if the GET
+        fails; other exceptions are shared by the callers.
+        """
+        with NWS._pending_requests_lock:
+            future = NWS._pending_requests.get(url)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                NWS._pending_requests[url] = future
+
+        if is_owner:
+            try:
+                data = self._get_revalidated(url, headers)
+                future.set_result(data)
+                return data
+            except Exception as ex:
+                future.set_exception(ex)
+                raise
+            finally:
+                with NWS._pending_requests_lock:
+                    del NWS._pending_requests[url]
+
+        ex = future.exception()
+        if isinstance(ex, DataFailureException):
+            raise DataFailureException(ex.url, ex.status, ex.msg)
+        return future.result()
+
+    @instrumented(API + "/person")
     def create_person(self, person):
         """
         Create a new person
@@ -377,20 +702,23 @@ class NWS(object):
 
         url = "{}/person".format(API)
         response = DAO.postURL(
-            url, self._write_headers(), self._json_body(person.json_data()))
+            url, self._write_headers(), self._model_body(person))
 
         if response.status != 201:
             raise DataFailureException(url, response.status, response.data)
 
         return response.status
 
+    @instrumented(API + "/person")
     def create_new_person(self, person):
         return self.create_person(person)
 
+    @instrumented(API + "/person/{person_id}")
     def update_person(self, person):
         """
         Update an existing person
         :param person: is the updated person that the client wants to update
+        Returns 202 if the update is left in the write buffer
         """
         self._validate_regid(person.person_id)
         self._validate_subscriber_id(person.surrogate_id)
@@ -399,32 +727,75 @@ class NWS(object):
             person.attributes.pop(attr, None)
 
         url = "{}/person/{}".format(API, person.person_id)
-        response = DAO.putURL(
-            url, self._write_headers(), self._json_body(person.json_data()))
+        return self._put(
+            url, self._model_body(person),
+            "{}/person/{}".format(API, person.surrogate_id))
+
+    def _put(self, url, body, *alternate_urls):
+        """
+        Sends a PUT of body to url, or adds it to the write buffer, where
+        it replaces any pending PUT to url.  Cached validators for url and
+        alternate_urls are dropped once it is sent.
+        """
+        send = partial(
+            self._send_put, url, self._write_headers(), body, alternate_urls)
+        if self.write_buffer is not None:
+            self.write_buffer.put(url, send)
+            return 202
+        return send()
+
+    def _send_put(self, url, headers, body, alternate_urls):
+        response = DAO.putURL(url, headers, body)
+        for validator_url in (url,) + alternate_urls:
+            self._delete_validators(validator_url)
 
         if response.status != 204:
             raise DataFailureException(url, response.status, response.data)
-
         return response.status
 
+    @instrumented(API + "/dispatch")
     def create_new_dispatch(self, dispatch):
         """
         Create a new dispatch
         :param dispatch:
         is the new dispatch that the client wants to create
+        Returns 202 if the dispatch is added to the dispatch outbox
         """
         self._validate_uuid(dispatch.dispatch_id)
 
-        # Create new dispatch
+        if self.dispatch_outbox is not None:
+            self.dispatch_outbox.enqueue(
+                dispatch.dispatch_id, self._model_body(dispatch),
+                self.actas_user)
+            return 202
+        return self._post_dispatch(dispatch)
+
+    @instrumented(API + "/dispatch")
+    def create_dispatches(self, dispatches, max_in_flight=10):
+        """
+        Create new dispatches, with up to max_in_flight requests at a time
+        :param dispatches: an iterable of new dispatches to create
+        Returns a list of OperationResult, in the order of dispatches
+        """
+        dispatches = list(dispatches)
+        self._validate_uuids(dispatch.dispatch_id for dispatch in dispatches)
+
+        return self._run_concurrently(
+            self._post_dispatch, dispatches, max_in_flight)
+
+    def _post_dispatch(self, dispatch):
+        return self._post_dispatch_body(self._model_body(dispatch))
+
+    def _post_dispatch_body(self, body):
         url = "{}/dispatch".format(API)
-        post_response = DAO.postURL(
-            url, self._write_headers(), self._json_body(dispatch.json_data()))
+        post_response = DAO.postURL(url, self._write_headers(), body)
 
         if post_response.status != 200:
             raise DataFailureException(
                 url, post_response.status, post_response.data)
         return post_response.status
 
+    @instrumented(API + "/dispatch/{dispatch_id}")
     def delete_dispatch(self, dispatch_id):
         """
         Deleting an existing dispatch
@@ -439,6 +810,7 @@ class NWS(object):
             raise DataFailureException(url, response.status, response.data)
         return response.status
 
+    @instrumented(API + "/message-type/{message_type_id}")
     def get_message_type_by_id(self, message_type_id):
         """
         Get a message type by message type ID
@@ -448,13 +820,12 @@ class NWS(object):
         self._validate_uuid(message_type_id)
 
         url = "{}/message-type/{}".format(API, message_type_id)
-        response = DAO.getURL(url, self._write_headers())
-        if response.status != 200:
-            raise DataFailureException(url, response.status, response.data)
 
-        data = json.loads(response.data)
+        data = self._get_cached_lookup(
+            url, self._write_headers(), self.actas_user)
         return MessageType.from_json(data.get("MessageType"))
 
+    @instrumented(API + "/message-type/{message_type_id}")
     def update_message_type(self, message_type):
         """
         Update an existing message type
@@ -465,13 +836,14 @@ class NWS(object):
 
         url = "{}/message-type/{}".format(API, message_type.message_type_id)
         response = DAO.putURL(
-            url, self._write_headers(), self._json_body(
-                message_type.json_data()))
+            url, self._write_headers(), self._model_body(message_type))
+        self._delete_cached_lookup(url, self.actas_user)
 
         if response.status != 204:
             raise DataFailureException(url, response.status, response.data)
         return response.status
 
+    @instrumented(API + "/message-type/{message_type_id}")
     def delete_message_type(self, message_type_id):
         """
         Delete an existing message type
@@ -482,32 +854,188 @@ class NWS(object):
 
         url = "{}/message-type/{}".format(API, message_type_id)
         response = DAO.deleteURL(url, self._write_headers())
+        self._delete_cached_lookup(url, self.actas_user)
 
         if response.status != 204:
             raise DataFailureException(url, response.status, response.data)
         return response.status
 
-    def _validate_uuid(self, uuid):
-        if (uuid is None or not self._re_uuid.match(str(uuid))):
-            raise InvalidUUID(uuid)
+    @classmethod
+    def get_lookup_cache(cls):
+        """
+        Returns the cache used for channel and message type lookups, or
+        None if LOOKUP_CACHE_TIMEOUT is not set.  LOOKUP_CACHE_CLASS can
+        name a class with the get/set/delete methods of a memcached client
+        to share the cache between processes.
+        """
+        if not int(DAO.get_service_setting("LOOKUP_CACHE_TIMEOUT", 0)):
+            return None
+
+        if cls._lookup_cache is None:
+            with cls._lookup_cache_lock:
+                if cls._lookup_cache is None:
+                    backend = DAO.get_service_setting(
+                        "LOOKUP_CACHE_CLASS", None)
+                    if backend:
+                        cls._lookup_cache = DAO._getModule(backend, None)
+                    else:
+                        size = int(DAO.get_service_setting(
+                            "LOOKUP_CACHE_SIZE", 1000))
+                        cls._lookup_cache = LocalCache(max_size=size)
+        return cls._lookup_cache
+
+    def _get_cached_lookup(self, url, headers, actas_user=None):
+        """
+        Returns the decoded response for url, from the lookup cache if it
+        is enabled.  Decoded responses are cached rather than models, so
+        that callers never share mutable models.  Responses requested as
+        actas_user are cached for that user only.
+        """
+        cache = self.get_lookup_cache()
+        key = self._lookup_key(url, actas_user)
+        if cache is not None:
+            data = cache.get(key)
+            if data is not None:
+                return data
+
+        data = self._get_revalidated(url, headers)
+
+        if cache is not None:
+            cache.set(key, data, int(
+                DAO.get_service_setting("LOOKUP_CACHE_TIMEOUT", 0)))
+        return data
+
+    def _delete_cached_lookup(self, url, actas_user=None):
+        cache = self.get_lookup_cache()
+        if cache is not None:
+            cache.delete(self._lookup_key(url, actas_user))
+        self._delete_validators(url)
+
+    def _lookup_key(self, url, actas_user=None):
+        if actas_user is None:
+            return "uw_nws:{}".format(url)
+        return "uw_nws:{}:{}".format(actas_user, url)
+
+    @classmethod
+    def get_validator_cache(cls):
+        """
+        Returns the cache of ETag and Last-Modified validators used for
+        conditional GETs, or None if VALIDATOR_CACHE_SIZE is 0.
+        """
+        size = int(DAO.get_service_setting("VALIDATOR_CACHE_SIZE", 1000))
+        if not size:
+            return None
+
+        if cls._validator_cache is None:
+            with cls._validator_cache_lock:
+                if cls._validator_cache is None:
+                    cls._validator_cache = LocalCache(max_size=size)
+        return cls._validator_cache
+
+    def _get_revalidated(self, url, headers):
+        """
+        Returns the decoded response for url.  If validators were returned
+        with an earlier response, the GET is conditional, and a 304 returns
+        the earlier decoded response without reading a body.
+        """
+        cache = self.get_validator_cache()
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None:
+            etag, last_modified, data = cached
+            headers = dict(headers)
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
 
-    def _validate_regid(self, regid):
-        if (regid is None or not self._re_regid.match(str(regid))):
-            raise InvalidRegID(regid)
+        response = DAO.getURL(url, headers)
 
-    def _validate_subscriber_id(self, subscriber_id):
-        if (subscriber_id is None or
-                not self._re_subscriber_id.match(str(subscriber_id))):
-            raise InvalidNetID(subscriber_id)
+        if response.status == 304 and cached is not None:
+            return data
 
-    def _validate_endpoint_protocol(self, protocol):
-        if (protocol is None or not self._re_protocol.match(str(protocol))):
-            raise InvalidEndpointProtocol(protocol)
+        if response.status != 200:
+            raise DataFailureException(url, response.status, response.data)
 
-    def _validate_message_type_surrogate(self, surrogate_id):
-        if (surrogate_id is None or
-                not self._re_message_type_surrogate.match(str(surrogate_id))):
-            raise InvalidSurrogateID(surrogate_id)
+        data = self._json_loads(response.data)
+
+        if cache is not None:
+            etag = get_response_header(response, "ETag")
+            last_modified = get_response_header(response, "Last-Modified")
+            if etag or last_modified:
+                cache.set(url, (etag, last_modified, data))
+            elif cached is not None:
+                cache.delete(url)
+        return data
+
+    def _delete_validators(self, url):
+        cache = self.get_validator_cache()
+        if cache is not None:
+            cache.delete(url)
+
+    _validate_uuid = staticmethod(validate_uuid)
+    _validate_uuids = staticmethod(validate_uuids)
+    _validate_regid = staticmethod(validate_regid)
+    _validate_subscriber_id = staticmethod(validate_subscriber_id)
+    _validate_person_id = staticmethod(validate_person_id)
+    _validate_endpoint_protocol = staticmethod(validate_endpoint_protocol)
+    _validate_message_type_surrogate = staticmethod(
+        validate_message_type_surrogate)
 
     def _json_body(self, json_data):
-        return json.dumps(json_data)
+        return dumps(json_data)
+
+    def _model_body(self, model):
+        """
+        Returns the encoded json_data() of a model, without building it
+        """
+        return encode_model(model)
+
+    def _json_loads(self, data):
+        start = time.perf_counter()
+        try:
+            return loads(data)
+        finally:
+            record_decode(time.perf_counter() - start)
+
+    def _timed_decode(self, items):
+        """
+        Records the time spent decoding each item of a streamed response
+        """
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                record_decode(time.perf_counter() - start)
+            yield item
+
+    def _run_bulk(self, func, items, max_in_flight):
+        """
+        Calls func for each item concurrently, each request being retried
+        by the DAO.  Returns a BulkOperationReport
+        """
+        start = time.perf_counter()
+        results = self._run_concurrently(func, items, max_in_flight)
+        return BulkOperationReport(results, time.perf_counter() - start)
+
+    def _run_concurrently(self, func, items, max_in_flight):
+        """
+        Calls func for each item using a pool of max_in_flight threads.
+        Returns a list of OperationResult, in the order of items
+        """
+        func = bind_call(func)
+
+        def run(item):
+            try:
+                return OperationResult(item, value=func(item))
+            except Exception as ex:
+                return OperationResult(item, exception=ex)
+
+        if not items:
+            return []
+
+        with ThreadPoolExecutor(
+                max_workers=min(max_in_flight, len(items))) as executor:
+            return list(executor.map(run, items))
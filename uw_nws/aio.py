@@ -0,0 +1,115 @@
+"""
+Coroutine interface for the Notifications Web Service.
+"""
+
+from uw_nws import NWS, DAO
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+import asyncio
+import threading
+
+ASYNC_METHODS = (
+    'get_endpoint_by_endpoint_id',
+    'get_endpoint_by_subscriber_id_and_protocol',
+    'get_endpoint_by_address',
+    'get_endpoints_by_subscriber_id',
+    'resend_sms_endpoint_verification',
+    'delete_endpoint',
+    'update_endpoint',
+    'create_endpoint',
+    'create_new_endpoint',
+    'delete_subscription',
+    'delete_subscriptions',
+    'create_subscription',
+    'create_subscriptions',
+    'create_new_subscription',
+    'get_subscriptions_by_channel_id',
+    'get_subscriptions_by_subscriber_id',
+    'get_subscriptions_by_channel_id_and_subscriber_id',
+    'get_subscriptions_by_channel_id_and_person_id',
+    'get_subscription_by_channel_id_and_endpoint_id',
+    'is_subscribed',
+    'reconcile_channel',
+    'search_subscriptions',
+    'get_channel_by_channel_id',
+    'get_channels_by_sln',
+    'get_channels_by_sln_year_quarter',
+    'get_active_channels_by_sln_year_quarter',
+    'get_active_channels_by_year_quarter',
+    'search_channels',
+    'get_person_by_surrogate_id',
+    'get_person_by_uwregid',
+    'get_people',
+    'create_person',
+    'create_new_person',
+    'update_person',
+    'create_new_dispatch',
+    'create_dispatches',
+    'delete_dispatch',
+    'get_message_type_by_id',
+    'update_message_type',
+    'delete_message_type',
+)
+
+DEFAULT_ASYNC_WORKERS = 50
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the shared executor used for NWS requests, with ASYNC_WORKERS
+    threads.  Each worker makes one blocking request at a time, so no more
+    than ASYNC_WORKERS requests are in flight, and no more than POOL_SIZE
+    while POOL_BLOCK is set.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(DAO.get_service_setting(
+                    'ASYNC_WORKERS', DEFAULT_ASYNC_WORKERS))
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='uw_nws')
+    return _executor
+
+
+def _async_method(name):
+    method = getattr(NWS, name)
+
+    @wraps(method)
+    async def wrapped(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(
+                getattr(self._nws, name), *args, **kwargs))
+    return wrapped
+
+
+class AsyncNWS(object):
+    """
+    The AsyncNWS object has the same methods as the NWS object, exposed as
+    coroutines.  Requests are run on a shared executor using the pooled
+    NWS_DAO connections, or the file-based mock resources when the DAO is
+    not Live.  The transport is still blocking, so concurrency is limited
+    by the ASYNC_WORKERS and POOL_SIZE settings rather than the event loop.
+    """
+    def __init__(self, actas_user=None, executor=None,
+                 subscription_index=None, write_buffer=None,
+                 dispatch_outbox=None, channel_index=None):
+        self._nws = NWS(actas_user=actas_user,
+                        subscription_index=subscription_index,
+                        write_buffer=write_buffer,
+                        dispatch_outbox=dispatch_outbox,
+                        channel_index=channel_index)
+        self._executor = executor if executor is not None else (
+            get_executor())
+
+    @property
+    def actas_user(self):
+        return self._nws.actas_user
+
+
+for _name in ASYNC_METHODS:
+    setattr(AsyncNWS, _name, _async_method(_name))
@@ -0,0 +1,99 @@
+"""
+A circuit breaker for the NWS services, so that requests fail fast while
+a service is down rather than waiting on timeouts and retries.
+"""
+
+from uw_nws.instrumentation import record_circuit_state
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker(object):
+    """
+    Opens after failure_threshold consecutive failures.  While open, calls
+    are rejected until reset_timeout seconds have passed, when one trial
+    call is allowed through: its success closes the circuit, and its
+    failure opens it again.
+    """
+    _breakers = {}
+    _breakers_lock = threading.Lock()
+
+    def __init__(self, service, failure_threshold=5, reset_timeout=30):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+        record_circuit_state(service, CLOSED)
+
+    @classmethod
+    def get(cls, service, failure_threshold=5, reset_timeout=30):
+        """
+        Returns the process-wide breaker for service, updating its
+        settings.
+        """
+        with cls._breakers_lock:
+            breaker = cls._breakers.get(service)
+            if breaker is None:
+                breaker = cls(service, failure_threshold, reset_timeout)
+                cls._breakers[service] = breaker
+        breaker.failure_threshold = failure_threshold
+        breaker.reset_timeout = reset_timeout
+        return breaker
+
+    @classmethod
+    def reset_all(cls):
+        with cls._breakers_lock:
+            for breaker in cls._breakers.values():
+                breaker.reset()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if (self.state == OPEN and
+                    time.time() - self.opened_at >= self.reset_timeout):
+                self._set_state(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if (self.state == HALF_OPEN or (
+                    self.state == CLOSED and
+                    self.failures >= self.failure_threshold)):
+                self.opened_at = time.time()
+                self._set_state(OPEN)
+
+    def release(self):
+        """
+        Ends a trial call that did not reach the service without recording
+        a result, so that the next call is the trial.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._set_state(OPEN)
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        self.state = state
+        record_circuit_state(self.service, state)
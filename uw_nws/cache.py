@@ -0,0 +1,49 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class LocalCache(object):
+    """
+    An in-process cache with TTL expiry and LRU eviction.  It implements the
+    get/set/delete methods of a memcached client, so that a shared cache
+    can be configured in its place.
+    """
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                return None
+
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=0):
+        expires = time.time() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
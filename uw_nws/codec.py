@@ -0,0 +1,133 @@
+"""
+JSON encoding and decoding for NWS requests and responses, using orjson or
+msgspec when one is installed and the json module otherwise.  The
+JSON_CODEC setting can name the codec to use.  The setting is read once,
+when a codec is first needed; reset_codec() makes the next use read it
+again.
+
+Search responses are the exception: they are decoded one result at a time
+by utilities.iter_json_array, which uses the json module as the other
+codecs cannot decode part of a document.
+"""
+
+import threading
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class StdlibCodec(object):
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    name = "orjson"
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgspecCodec(object):
+    name = "msgspec"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return self._decoder.decode(data)
+
+
+CODECS = {"json": StdlibCodec}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec
+if msgspec is not None:
+    CODECS["msgspec"] = MsgspecCodec
+
+_codecs = {}
+_codecs_lock = threading.Lock()
+# The codec named by the JSON_CODEC setting, once it has been read
+_default_codec = None
+
+
+def get_codec(name=None):
+    """
+    Returns the codec named by name or the JSON_CODEC setting, or the
+    fastest installed codec if neither is set.
+    """
+    if name is None:
+        codec = _default_codec
+        if codec is None:
+            codec = _resolve_default_codec()
+        return codec
+
+    codec = _codecs.get(name)
+    if codec is None:
+        if name not in CODECS:
+            raise ValueError("JSON codec {} is not installed".format(name))
+        with _codecs_lock:
+            codec = _codecs.setdefault(name, CODECS[name]())
+    return codec
+
+
+def reset_codec():
+    """
+    Clears the codec read from the JSON_CODEC setting, so that the next
+    use reads the setting again.
+    """
+    global _default_codec
+    _default_codec = None
+
+
+def _resolve_default_codec():
+    global _default_codec
+    from uw_nws import DAO
+    name = DAO.get_service_setting("JSON_CODEC", None)
+    if name is None:
+        name = "orjson" if orjson is not None else (
+            "msgspec" if msgspec is not None else "json")
+    _default_codec = get_codec(name)
+    return _default_codec
+
+
+def dumps(obj):
+    return get_codec().dumps(obj)
+
+
+def loads(data):
+    return get_codec().loads(data)
+
+
+def encode_model(model):
+    """
+    Returns the json_data() of a model as bytes, encoding its json_fields()
+    without building the json_data() wrapper.
+    """
+    return b"".join((
+        b'{"', model.json_key.encode("ascii"), b'":',
+        get_codec().dumps(model.json_fields()), b"}"))
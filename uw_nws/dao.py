@@ -1,11 +1,108 @@
-from restclients_core.dao import DAO
+from restclients_core.dao import DAO, LiveDAO
 from restclients_core.exceptions import DataFailureException
+from restclients_core.models import MockHTTP
+from uw_nws.breaker import CircuitBreaker
+from uw_nws.exceptions import CircuitOpenException, RateLimitException
+from uw_nws.instrumentation import (
+    record_response, record_retry, record_circuit_rejection)
+from uw_nws.ratelimit import wait_for_rate_limit
+from uw_nws.utilities import get_response_header
+from urllib3.connection import HTTPConnection
+from email.utils import parsedate_to_datetime
 from os.path import abspath, dirname
+import threading
+import random
+import socket
 import json
+import time
 import os
 
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Statuses of requests that were not processed, which any POST can retry
+REJECTED_STATUS_CODES = (429, 503)
+# POSTs that are safe to retry on any error, as the client sets the
+# resource id
+RETRY_POST_URLS = ("/notification/v1/dispatch",)
+RETRY_METHODS = ("GET", "DELETE")
+# POSTs with a client-side rate limit, by operation
+RATE_LIMITED_POST_URLS = {
+    "/notification/v1/dispatch": "dispatch",
+    "/notification/v1/subscription": "subscription",
+}
+
+
+class NWSLiveDAO(LiveDAO):
+    """
+    Live implementation with configurable connection pools.  With
+    POOL_SHARED, the nws and nws_auth services share a pool when they use
+    the same host.
+    """
+    _pools_lock = threading.Lock()
+
+    def get_pool(self):
+        key = self._pool_key()
+        if key not in LiveDAO.pools:
+            with NWSLiveDAO._pools_lock:
+                if key not in LiveDAO.pools:
+                    LiveDAO.pools[key] = self.create_pool()
+        return LiveDAO.pools[key]
+
+    def _pool_key(self):
+        if self.dao.get_service_setting("POOL_SHARED", False):
+            return "nws:{}".format(self.dao.get_service_setting("HOST"))
+        return self.dao.service_name()
+
+    def create_pool(self):
+        pool = super(NWSLiveDAO, self).create_pool()
+        pool.block = bool(self.dao.get_service_setting("POOL_BLOCK", True))
+
+        # TCP keep-alive probes, which detect dead connections; this does
+        # not limit how long idle connections are kept in the pool
+        keepidle = int(self.dao.get_service_setting("POOL_TCP_KEEPIDLE", 0))
+        if keepidle:
+            socket_options = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                socket_options.append(
+                    (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepidle))
+            pool.conn_kw["socket_options"] = socket_options
+        return pool
+
+    def get_pool_stats(self):
+        """
+        Returns request and connection counts for the pool.  Misses are
+        the connections the pool opened, and hits, requests less misses,
+        approximate the requests made on a reused connection.
+        """
+        pool = self.get_pool()
+        return {
+            "pool": self._pool_key(),
+            "maxsize": pool.pool.maxsize,
+            "idle": len([c for c in list(pool.pool.queue) if c is not None]),
+            "requests": pool.num_requests,
+            "hits": max(pool.num_requests - pool.num_connections, 0),
+            "misses": pool.num_connections,
+        }
+
+
+class PooledDAO(DAO):
+    def _get_live_implementation(self):
+        return NWSLiveDAO(self.service_name(), self)
+
+    def get_pool_stats(self):
+        """
+        Returns the connection pool stats, or None if the DAO is not Live.
+        """
+        implementation = self.get_implementation()
+        if implementation.is_live():
+            return implementation.get_pool_stats()
+
+
+class NWS_AUTH_DAO(PooledDAO):
+    # Process-wide token cache, keyed by secret: (access_token, refresh_at)
+    _tokens = {}
+    _token_lock = threading.Lock()
 
-class NWS_AUTH_DAO(DAO):
     def service_name(self):
         return 'nws_auth'
 
@@ -13,6 +110,40 @@ class NWS_AUTH_DAO(DAO):
         return True
 
     def get_auth_token(self, secret):
+        """
+        Returns a cached access token for the secret, requesting a new one
+        when it is within TOKEN_REFRESH_MARGIN seconds of expiring.
+        Only one thread requests a new token, other threads wait for it.
+        """
+        token = self._get_cached_token(secret)
+        if token is not None:
+            return token
+
+        with NWS_AUTH_DAO._token_lock:
+            token = self._get_cached_token(secret)
+            if token is not None:
+                return token
+
+            data = self._request_auth_token(secret)
+            token = data.get('access_token', '')
+            try:
+                expires_in = float(data.get('expires_in', 0))
+            except (TypeError, ValueError):
+                expires_in = 0
+
+            margin = float(self.get_service_setting(
+                'TOKEN_REFRESH_MARGIN', 60))
+            if token and expires_in > margin:
+                NWS_AUTH_DAO._tokens[secret] = (
+                    token, time.time() + expires_in - margin)
+            return token
+
+    def _get_cached_token(self, secret):
+        cached = NWS_AUTH_DAO._tokens.get(secret)
+        if cached is not None and cached[1] > time.time():
+            return cached[0]
+
+    def _request_auth_token(self, secret):
         url = '/oauth2/token'
         headers = {'Authorization': 'Basic {}'.format(secret),
                    'Content-type': 'application/x-www-form-urlencoded'}
@@ -22,11 +153,15 @@ class NWS_AUTH_DAO(DAO):
         if response.status != 200:
             raise DataFailureException(url, response.status, response.data)
 
-        data = json.loads(response.data)
-        return data.get('access_token', '')
+        return json.loads(response.data)
+
+    @staticmethod
+    def clear_auth_tokens():
+        with NWS_AUTH_DAO._token_lock:
+            NWS_AUTH_DAO._tokens.clear()
 
 
-class NWS_DAO(DAO):
+class NWS_DAO(PooledDAO):
     def __init__(self):
         self.auth_dao = NWS_AUTH_DAO()
         return super(NWS_DAO, self).__init__()
@@ -37,6 +172,166 @@ class NWS_DAO(DAO):
     def service_mock_paths(self):
         return [abspath(os.path.join(dirname(__file__), 'resources'))]
 
+    def _load_resource(self, method, url, headers, body):
+        """
+        Retries GETs, DELETEs and dispatch POSTs that fail with a
+        RETRY_STATUS_CODES status or a connection error, and other POSTs
+        that fail with a REJECTED_STATUS_CODES status, up to
+        RETRY_MAX_ATTEMPTS attempts, 1 by default.  Requests are rejected
+        with CircuitOpenException while the circuit breaker for the service
+        is open.  Each attempt of a rate limited POST waits for the rate
+        limit.  A 404 for a retried DELETE is returned as a 204, as an
+        earlier attempt may have deleted the resource.
+        """
+        operation = self._rate_limit_operation(method, url)
+        if operation is not None:
+            self._wait_for_rate_limit(operation, url)
+
+        breaker = self.get_circuit_breaker()
+        if breaker is not None and not breaker.allow_request():
+            record_circuit_rejection(self.service_name())
+            raise CircuitOpenException(url, 503, "NWS circuit is open")
+
+        retry_errors = method in RETRY_METHODS or (
+            method == "POST" and url in RETRY_POST_URLS)
+        retry_status_codes = RETRY_STATUS_CODES if retry_errors else (
+            REJECTED_STATUS_CODES if method == "POST" else ())
+        max_attempts = 1
+        if retry_status_codes:
+            max_attempts = int(self.get_service_setting(
+                "RETRY_MAX_ATTEMPTS", 1))
+
+        attempt = 1
+        while True:
+            try:
+                response = self._load_timed_resource(
+                    method, url, headers, body)
+            except DataFailureException as ex:
+                # Only connection errors and retryable statuses are retried,
+                # not errors such as a failed token request
+                if not retry_errors or attempt >= max_attempts or not (
+                        ex.status == 0 or ex.status in retry_status_codes):
+                    self._record_breaker_error(breaker, ex.status)
+                    raise
+                status, delay = ex.status, self._retry_delay(attempt)
+            except Exception:
+                self._record_breaker_status(breaker, 0)
+                raise
+            else:
+                if (method == "DELETE" and attempt > 1 and
+                        response.status == 404):
+                    # An earlier attempt deleted the resource
+                    response = self._deleted_response(response)
+                delay = None
+                if (response.status in retry_status_codes and
+                        attempt < max_attempts):
+                    delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    self._record_breaker_status(breaker, response.status)
+                    return response
+                status = response.status
+
+            record_retry(self.service_name(), status)
+            time.sleep(delay)
+            attempt += 1
+
+            if operation is not None:
+                try:
+                    self._wait_for_rate_limit(operation, url)
+                except RateLimitException:
+                    self._record_breaker_status(breaker, status)
+                    raise
+
+    def _deleted_response(self, response):
+        deleted = MockHTTP()
+        deleted.status = 204
+        deleted.data = ""
+        deleted.headers = dict(response.headers or {})
+        return deleted
+
+    def _rate_limit_operation(self, method, url):
+        if method == "POST":
+            if url.endswith("/verification"):
+                return "verification"
+            return RATE_LIMITED_POST_URLS.get(url)
+
+    def _wait_for_rate_limit(self, operation, url):
+        if not wait_for_rate_limit(self, operation):
+            raise RateLimitException(
+                url, 429, "NWS {} rate limit exceeded".format(operation))
+
+    def _load_timed_resource(self, method, url, headers, body):
+        start = time.perf_counter()
+        response = super(NWS_DAO, self)._load_resource(
+            method, url, headers, body)
+        record_response(response, time.perf_counter() - start)
+        return response
+
+    def _retry_delay(self, attempt, response=None):
+        """
+        Returns the seconds to wait before retrying: the Retry-After of the
+        response if there is one, otherwise an exponential backoff with
+        full jitter.  Returns None if Retry-After exceeds RETRY_MAX_DELAY.
+        """
+        backoff = float(self.get_service_setting("RETRY_BACKOFF", 0.5))
+        max_delay = float(self.get_service_setting("RETRY_MAX_DELAY", 30))
+
+        retry_after = None
+        if response is not None:
+            retry_after = self._parse_retry_after(
+                get_response_header(response, "Retry-After"))
+
+        if retry_after is not None:
+            if retry_after > max_delay:
+                return None
+            return retry_after + random.uniform(0, backoff)
+
+        return random.uniform(0, min(max_delay, backoff * 2 ** attempt))
+
+    def _parse_retry_after(self, value):
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(),
+                       0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def get_circuit_breaker(self):
+        """
+        Returns the circuit breaker for the service, or None if
+        CIRCUIT_FAILURE_THRESHOLD is 0, the default.
+        """
+        threshold = int(self.get_service_setting(
+            "CIRCUIT_FAILURE_THRESHOLD", 0))
+        if threshold:
+            return CircuitBreaker.get(
+                self.service_name(), threshold, float(
+                    self.get_service_setting("CIRCUIT_RESET_TIMEOUT", 30)))
+
+    def _record_breaker_status(self, breaker, status):
+        if breaker is not None:
+            if status == 0 or status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+    def _record_breaker_error(self, breaker, status):
+        """
+        Records a failure for a connection error or 5xx status.  Other
+        errors, such as a failed token request, are not a result of the
+        service, and are not recorded.
+        """
+        if breaker is not None:
+            if status == 0 or status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.release()
+
     def _custom_headers(self, method, url, headers, body):
         headers = {}
         secret = self.get_service_setting('AUTH_SECRET', '')
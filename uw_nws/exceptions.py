@@ -1,3 +1,4 @@
+from restclients_core.exceptions import DataFailureException
 
 
 class InvalidUUID(Exception):
@@ -13,3 +14,18 @@ class InvalidEndpointProtocol(Exception):
 class InvalidSurrogateID(Exception):
     """Exception for invalid surrogate ID in message-type"""
     pass
+
+
+class InvalidSnapshot(Exception):
+    """Exception for a file that is not an NWS snapshot."""
+    pass
+
+
+class CircuitOpenException(DataFailureException):
+    """Exception for a request rejected while the NWS circuit is open."""
+    pass
+
+
+class RateLimitException(DataFailureException):
+    """Exception for a request that timed out waiting on a rate limit."""
+    pass
@@ -0,0 +1,378 @@
+"""
+In-memory indexes of channel and subscriber membership, and of a term's
+channels by SLN.
+"""
+
+from uw_nws.models import Channel
+from uw_nws.utilities import (
+    iter_json_array, get_response_header, is_last_page)
+from datetime import datetime, timezone
+import threading
+import json
+import time
+
+
+def _subscriber_key(subscriber_id):
+    """
+    Subscriber ids are indexed without the washington.edu domain, so that
+    "javerage" and "javerage@washington.edu" are the same subscriber.
+    """
+    subscriber_id = str(subscriber_id).lower()
+    if subscriber_id.endswith("@washington.edu"):
+        subscriber_id = subscriber_id[:-len("@washington.edu")]
+    return subscriber_id
+
+
+class SubscriptionIndex(object):
+    """
+    Maps channel ids to subscribers and subscribers to channel ids, so that
+    membership can be checked without a request.  A subscriber is on a
+    channel while any of its subscriptions to the channel is indexed.
+    """
+    def __init__(self, subscriptions=None):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._subscribers = {}
+        self._channels = {}
+        self._endpoints = {}
+        if subscriptions is not None:
+            self.add_all(subscriptions)
+
+    def add(self, subscription):
+        """
+        Adds a Subscription, LazySubscription or SubscriptionRecord.
+        Returns False if the subscription has no channel or subscriber to
+        index it by.
+        """
+        channel, endpoint = subscription.channel, subscription.endpoint
+        if (channel is None or not channel.channel_id or
+                endpoint is None or not endpoint.subscriber_id):
+            return False
+
+        with self._lock:
+            self._add(subscription.subscription_id, channel.channel_id,
+                      endpoint.subscriber_id, endpoint.endpoint_id)
+        return True
+
+    def add_all(self, subscriptions):
+        for subscription in subscriptions:
+            self.add(subscription)
+
+    def load_search(self, nws, **kwargs):
+        """
+        Adds the subscriptions matching a search, paging through the
+        results with NWS.iter_subscriptions
+        """
+        self.add_all(nws.iter_subscriptions(records=True, **kwargs))
+
+    def remove(self, subscription_id):
+        """
+        Removes a subscription by id, returning True if it was indexed.
+        """
+        with self._lock:
+            entry = self._entries.get(subscription_id)
+            if entry is None:
+                return False
+
+            for match in self._find_matches(*entry):
+                if isinstance(match, tuple):
+                    self._remove(match)
+            return self._remove(subscription_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._subscribers.clear()
+            self._channels.clear()
+            self._endpoints.clear()
+
+    def is_subscribed(self, channel_id, subscriber_id):
+        subscribers = self._subscribers.get(channel_id)
+        return (subscribers is not None and
+                _subscriber_key(subscriber_id) in subscribers)
+
+    def has_endpoint(self, channel_id, endpoint_id):
+        return (channel_id, endpoint_id) in self._endpoints
+
+    def get_subscribers(self, channel_id):
+        """
+        Returns the set of subscriber ids on the channel, without the
+        washington.edu domain.
+        """
+        with self._lock:
+            return set(self._subscribers.get(channel_id, ()))
+
+    def get_channel_ids(self, subscriber_id):
+        with self._lock:
+            return set(self._channels.get(_subscriber_key(subscriber_id), ()))
+
+    def save(self, path):
+        """
+        Writes the index to a json snapshot file.
+        """
+        with self._lock:
+            entries = [{
+                "SubscriptionID": key if isinstance(key, str) else None,
+                "ChannelID": channel_id,
+                "SubscriberID": subscriber_id,
+                "EndpointID": endpoint_id,
+            } for key, (channel_id, subscriber_id, endpoint_id) in (
+                self._entries.items())]
+
+        with open(path, "w") as f:
+            json.dump({"Subscriptions": entries}, f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns a SubscriptionIndex read from a json snapshot file.
+        """
+        with open(path) as f:
+            data = json.load(f)
+
+        index = cls()
+        for entry in data.get("Subscriptions", []):
+            index._add(entry["SubscriptionID"], entry["ChannelID"],
+                       entry["SubscriberID"], entry["EndpointID"])
+        return index
+
+    def _add(self, subscription_id, channel_id, subscriber_id, endpoint_id):
+        subscriber_id = _subscriber_key(subscriber_id)
+        # Subscriptions are created without an id, until they are read back
+        key = subscription_id if subscription_id is not None else (
+            channel_id, subscriber_id, endpoint_id)
+        self._remove(key)
+
+        matches = self._find_matches(channel_id, subscriber_id, endpoint_id)
+        if subscription_id is None:
+            if any(not isinstance(match, tuple) for match in matches):
+                return
+        else:
+            # Replace the entry added when the subscription was created
+            for match in matches:
+                if isinstance(match, tuple):
+                    self._remove(match)
+
+        self._entries[key] = (channel_id, subscriber_id, endpoint_id)
+        self._subscribers.setdefault(channel_id, {}).setdefault(
+            subscriber_id, set()).add(key)
+        self._channels.setdefault(subscriber_id, {}).setdefault(
+            channel_id, set()).add(key)
+        self._endpoints.setdefault((channel_id, endpoint_id), set()).add(key)
+
+    def _find_matches(self, channel_id, subscriber_id, endpoint_id):
+        """
+        Returns the keys of the subscriber's entries on the channel that
+        may be the same subscription.  A subscription created without an
+        endpoint id matches any endpoint.
+        """
+        keys = self._subscribers.get(channel_id, {}).get(subscriber_id, ())
+        return [key for key in keys if (
+            endpoint_id is None or self._entries[key][2] is None or
+            self._entries[key][2] == endpoint_id)]
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+
+        channel_id, subscriber_id, endpoint_id = entry
+        self._discard(self._subscribers, channel_id, subscriber_id, key)
+        self._discard(self._channels, subscriber_id, channel_id, key)
+
+        keys = self._endpoints[(channel_id, endpoint_id)]
+        keys.discard(key)
+        if not keys:
+            del self._endpoints[(channel_id, endpoint_id)]
+        return True
+
+    def _discard(self, mapping, outer, inner, key):
+        keys = mapping[outer][inner]
+        keys.discard(key)
+        if not keys:
+            del mapping[outer][inner]
+            if not mapping[outer]:
+                del mapping[outer]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ChannelIndex(object):
+    """
+    Maps the SLNs of a term's active channels of one type to the channels,
+    so that SLN lookups do not need a request.  Each refresh pages through
+    the term's channels with conditional GETs, so that unchanged pages are
+    not downloaded again, and applies only the channels that are new, have
+    a new LastModified, or are no longer returned.  Channels past their
+    expiry are left out of lookups between refreshes.
+    """
+    def __init__(self, channel_type, year, quarter, max_age=None,
+                 page_size=100):
+        """
+        :param max_age: seconds after which refresh_if_stale() refreshes
+                        the index, or None to refresh only when empty
+        :param page_size: the max_results of each page of a refresh
+        """
+        self.channel_type = channel_type
+        self.year = str(year)
+        self.quarter = str(quarter).lower()
+        self.max_age = max_age
+        self.page_size = page_size
+        self.refreshed = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._channels = {}
+        self._slns = {}
+        self._pages = {}
+
+    def covers(self, channel_type, year, quarter):
+        return (channel_type == self.channel_type and
+                str(year) == self.year and
+                str(quarter).lower() == self.quarter)
+
+    def refresh(self, nws, expires=None):
+        """
+        Updates the index from the term's channels that expire after
+        expires, midnight UTC of the current day by default.  Each page is
+        requested with the validators returned with it by the previous
+        refresh, and a page that is unchanged keeps the channels it had.
+        Returns the number of channels added, updated or removed
+        """
+        start = time.time()
+        if expires is None:
+            expires = _midnight()
+
+        kwargs = {"type": self.channel_type, "tag_year": self.year,
+                  "tag_quarter": self.quarter,
+                  "expires_after": expires.isoformat(),
+                  "max_results": self.page_size}
+        pages = {}
+        seen = set()
+        changed = 0
+        first_result = 1
+        while True:
+            kwargs["first_result"] = first_result
+            url = nws._search_url("channel", kwargs)
+            etag, last_modified, channel_ids, total_count = self._pages.get(
+                url, (None, None, None, None))
+            response = nws._search_page(url, etag, last_modified)
+
+            if response.status != 304:
+                members = {}
+                channel_ids = []
+                for datum in nws._timed_decode(iter_json_array(
+                        response.data, "Channels", members)):
+                    channel_ids.append(datum["ChannelID"])
+                    with self._lock:
+                        changed += self._apply(datum)
+                etag = get_response_header(response, "ETag")
+                last_modified = get_response_header(response, "Last-Modified")
+                total_count = members.get("TotalCount")
+
+            pages[url] = (etag, last_modified, channel_ids, total_count)
+            seen.update(channel_ids)
+            first_result += len(channel_ids)
+            if is_last_page(len(channel_ids), self.page_size, first_result,
+                            total_count):
+                break
+
+        with self._lock:
+            for channel_id in set(self._channels) - seen:
+                self._remove(channel_id)
+                changed += 1
+            self._pages = pages
+            self.refreshed = start
+        return changed
+
+    def is_stale(self):
+        return self.refreshed is None or (
+            self.max_age is not None and
+            time.time() - self.refreshed >= self.max_age)
+
+    def refresh_if_stale(self, nws):
+        """
+        Refreshes the index if it is stale.  Only one thread refreshes the
+        index, other threads wait for it.
+        """
+        if self.is_stale():
+            with self._refresh_lock:
+                if self.is_stale():
+                    self.refresh(nws)
+
+    def get_channels_by_sln(self, sln):
+        """
+        Returns Channel models for the channels tagged with the SLN that
+        expire after midnight UTC of the current day.
+        """
+        with self._lock:
+            data = [self._channels[channel_id] for channel_id in (
+                self._slns.get(str(sln), ()))]
+
+        expires = _midnight()
+        channels = []
+        for datum in data:
+            channel = Channel.from_json(datum)
+            if _is_active(channel, expires):
+                channels.append(channel)
+        return sorted(channels, key=lambda c: c.channel_id)
+
+    def get_slns(self):
+        with self._lock:
+            return set(self._slns)
+
+    def clear(self):
+        with self._lock:
+            self._channels.clear()
+            self._slns.clear()
+            self._pages = {}
+            self.refreshed = None
+
+    def _apply(self, datum):
+        current = self._channels.get(datum["ChannelID"])
+        if (current is not None and
+                current.get("LastModified") is not None and
+                current.get("LastModified") == datum.get("LastModified")):
+            return False
+        self._add(datum)
+        return True
+
+    def _add(self, datum):
+        channel_id = datum["ChannelID"]
+        self._remove(channel_id)
+        self._channels[channel_id] = datum
+        sln = (datum.get("Tags") or {}).get("sln")
+        if sln is not None:
+            self._slns.setdefault(str(sln), set()).add(channel_id)
+
+    def _remove(self, channel_id):
+        datum = self._channels.pop(channel_id, None)
+        if datum is None:
+            return False
+
+        sln = (datum.get("Tags") or {}).get("sln")
+        if sln is not None:
+            channel_ids = self._slns[str(sln)]
+            channel_ids.discard(channel_id)
+            if not channel_ids:
+                del self._slns[str(sln)]
+        return True
+
+    def __len__(self):
+        return len(self._channels)
+
+
+def _midnight():
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def _is_active(channel, expires):
+    """
+    Returns True if the channel expires after expires, a naive UTC
+    datetime, as the expires_after search parameter does.
+    """
+    if channel.expires is None:
+        return True
+    if channel.expires.tzinfo is None:
+        return channel.expires > expires
+    return channel.expires > expires.replace(tzinfo=timezone.utc)
@@ -0,0 +1,239 @@
+"""
+Per-call metrics for the public NWS methods.  Each call is reported to the
+registered callbacks and observed in prometheus histograms.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+from functools import wraps
+from logging import getLogger
+import inspect
+import threading
+import time
+
+logger = getLogger(__name__)
+
+prometheus_call_duration = Histogram(
+    'nws_client_call_duration_seconds',
+    'NWS client method duration (seconds)', ['method'])
+prometheus_request_duration = Histogram(
+    'nws_client_request_duration_seconds',
+    'NWS client time waiting on responses (seconds)', ['method'])
+prometheus_decode_duration = Histogram(
+    'nws_client_decode_duration_seconds',
+    'NWS client JSON decode duration (seconds)', ['method'])
+prometheus_build_duration = Histogram(
+    'nws_client_build_duration_seconds',
+    'NWS client model build duration (seconds)', ['method'])
+prometheus_response_bytes = Histogram(
+    'nws_client_response_bytes', 'NWS client bytes received', ['method'],
+    buckets=[1024, 16384, 131072, 1048576, 8388608, 67108864])
+prometheus_retries = Counter(
+    'nws_client_retries', 'NWS client requests retried', ['service', 'status'])
+prometheus_circuit_state = Gauge(
+    'nws_client_circuit_open',
+    'NWS client circuit breaker state (0 closed, 1 open, 0.5 half open)',
+    ['service'])
+prometheus_circuit_rejections = Counter(
+    'nws_client_circuit_rejections',
+    'NWS client requests rejected by an open circuit', ['service'])
+prometheus_outbox_depth = Gauge(
+    'nws_client_outbox_depth', 'NWS client dispatches waiting in the outbox')
+prometheus_outbox_age = Gauge(
+    'nws_client_outbox_oldest_age_seconds',
+    'NWS client age of the oldest dispatch waiting in the outbox (seconds)')
+prometheus_rate_limit_wait = Histogram(
+    'nws_client_rate_limit_wait_seconds',
+    'NWS client time waiting on rate limits (seconds)', ['operation'])
+
+CIRCUIT_STATE_VALUES = {"closed": 0, "open": 1, "half_open": 0.5}
+
+_callbacks = []
+_local = threading.local()
+
+
+class CallMetrics(object):
+    """
+    Metrics for one call to a public NWS method.  build_time is the time
+    spent outside of requests and JSON decoding, which is mostly model
+    building and validation.  The request and decode times of concurrent
+    requests made by bulk methods are summed.
+    """
+    def __init__(self, method, url_template):
+        self._lock = threading.Lock()
+        self.method = method
+        self.url_template = url_template
+        self.status = None
+        self.requests = 0
+        self.bytes_received = 0
+        self.request_time = 0.0
+        self.decode_time = 0.0
+        self.total_time = 0.0
+        self.retries = 0
+        self.exception = None
+
+    @property
+    def build_time(self):
+        return max(
+            self.total_time - self.request_time - self.decode_time, 0.0)
+
+    def __str__(self):
+        return (
+            "method:{} url:{} status:{} bytes:{} request:{:.6f} "
+            "decode:{:.6f} build:{:.6f} total:{:.6f}").format(
+                self.method, self.url_template, self.status,
+                self.bytes_received, self.request_time, self.decode_time,
+                self.build_time, self.total_time)
+
+
+def register_callback(callback):
+    """
+    Registers a callable to be passed the CallMetrics of each NWS call.
+    """
+    if callback not in _callbacks:
+        _callbacks.append(callback)
+
+
+def unregister_callback(callback):
+    if callback in _callbacks:
+        _callbacks.remove(callback)
+
+
+def current_call():
+    return getattr(_local, 'call', None)
+
+
+def bind_call(func):
+    """
+    Returns func wrapped so that requests it makes from a worker thread are
+    counted in the current call.
+    """
+    call = current_call()
+    if call is None:
+        return func
+
+    @wraps(func)
+    def wrapped(*args, **kwargs):
+        previous = current_call()
+        _local.call = call
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.call = previous
+    return wrapped
+
+
+def record_response(response, elapsed):
+    call = current_call()
+    if call is not None:
+        with call._lock:
+            call.requests += 1
+            call.status = response.status
+            call.request_time += elapsed
+            if response.data:
+                call.bytes_received += len(response.data)
+
+
+def record_decode(elapsed):
+    call = current_call()
+    if call is not None:
+        with call._lock:
+            call.decode_time += elapsed
+
+
+def record_retry(service, status):
+    prometheus_retries.labels(service, str(status)).inc()
+    call = current_call()
+    if call is not None:
+        with call._lock:
+            call.retries += 1
+
+
+def record_circuit_state(service, state):
+    prometheus_circuit_state.labels(service).set(CIRCUIT_STATE_VALUES[state])
+
+
+def record_circuit_rejection(service):
+    prometheus_circuit_rejections.labels(service).inc()
+
+
+def record_outbox(depth, oldest_age):
+    prometheus_outbox_depth.set(depth)
+    prometheus_outbox_age.set(oldest_age)
+
+
+def record_rate_limit_wait(operation, elapsed):
+    prometheus_rate_limit_wait.labels(operation).observe(elapsed)
+
+
+def _report(call):
+    labels = (call.method,)
+    prometheus_call_duration.labels(*labels).observe(call.total_time)
+    prometheus_request_duration.labels(*labels).observe(call.request_time)
+    prometheus_decode_duration.labels(*labels).observe(call.decode_time)
+    prometheus_build_duration.labels(*labels).observe(call.build_time)
+    prometheus_response_bytes.labels(*labels).observe(call.bytes_received)
+
+    for callback in list(_callbacks):
+        try:
+            callback(call)
+        except Exception as ex:
+            logger.exception("NWS instrumentation callback failed: {}".format(
+                ex))
+
+
+def _run(call, func, *args, **kwargs):
+    start = time.perf_counter()
+    _local.call = call
+    try:
+        return func(*args, **kwargs)
+    except StopIteration:
+        raise
+    except Exception as ex:
+        call.exception = ex
+        raise
+    finally:
+        _local.call = None
+        call.total_time += time.perf_counter() - start
+
+
+def instrumented(url_template):
+    """
+    Decorator for public NWS methods.  Calls made from within another
+    instrumented method are counted in the outer call.  Generators are
+    timed only while they are running.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def wrapped_generator(*args, **kwargs):
+                call = CallMetrics(func.__name__, url_template)
+                generator = func(*args, **kwargs)
+                is_outer = False
+                try:
+                    while True:
+                        if current_call() is not None:
+                            item = next(generator)
+                        else:
+                            is_outer = True
+                            item = _run(call, next, generator)
+                        yield item
+                except StopIteration:
+                    return
+                finally:
+                    generator.close()
+                    if is_outer:
+                        _report(call)
+            return wrapped_generator
+
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            if current_call() is not None:
+                return func(*args, **kwargs)
+
+            call = CallMetrics(func.__name__, url_template)
+            try:
+                return _run(call, func, *args, **kwargs)
+            finally:
+                _report(call)
+        return wrapped
+    return decorator
@@ -1,7 +1,23 @@
 from restclients_core import models
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
 import dateutil.parser
 
 
+@lru_cache(maxsize=1024)
+def parse_datetime(value):
+    """
+    Decodes an NWS timestamp such as "2012-11-13 22:51:51+00:00", using
+    dateutil only for values that datetime.fromisoformat does not accept.
+    Recently decoded values are memoized, datetimes being immutable.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
 class Person(models.Model):
     person_id = models.CharField(max_length=40)
     person_uri = models.CharField(max_length=200)
@@ -22,12 +38,12 @@ class Person(models.Model):
         person.person_uri = json_data["PersonURI"]
         person.surrogate_id = json_data["SurrogateID"]
         if "Created" in json_data:
-            person.created = dateutil.parser.parse(json_data["Created"])
+            person.created = parse_datetime(json_data["Created"])
         if "LastModified" in json_data:
-            person.last_modified = dateutil.parser.parse(
+            person.last_modified = parse_datetime(
                 json_data["LastModified"])
         person.modified_by = json_data.get("ModifiedBy")
-        person.attributes = json_data.get("Attributes", {})
+        person.attributes = dict(json_data.get("Attributes", {}))
 
         for endpoint_data in json_data.get("Endpoints", []):
             person.endpoints.append(Endpoint.from_json(endpoint_data))
@@ -54,21 +70,23 @@ class Person(models.Model):
                 verified_endpoints[endpoint.protocol.lower()] = endpoint
         return verified_endpoints
 
+    json_key = "Person"
+
     def json_data(self):
+        return {self.json_key: self.json_fields()}
+
+    def json_fields(self):
         return {
-            "Person": {
-                "PersonID": self.person_id,
-                "PersonURI": self.person_uri,
-                "SurrogateID": self.surrogate_id,
-                "Created": self.created.isoformat() if (
-                    self.created is not None) else None,
-                "LastModified": self.last_modified.isoformat() if (
-                    self.last_modified is not None) else None,
-                "ModifiedBy": self.modified_by,
-                "Attributes": self.attributes,
-                "Endpoints": [e.json_data()["Endpoint"] for e in (
-                    self.endpoints)]
-            }
+            "PersonID": self.person_id,
+            "PersonURI": self.person_uri,
+            "SurrogateID": self.surrogate_id,
+            "Created": self.created.isoformat() if (
+                self.created is not None) else None,
+            "LastModified": self.last_modified.isoformat() if (
+                self.last_modified is not None) else None,
+            "ModifiedBy": self.modified_by,
+            "Attributes": self.attributes,
+            "Endpoints": [e.json_fields() for e in self.endpoints]
         }
 
 
@@ -89,7 +107,10 @@ class Channel(models.Model):
         self.tags = {}
 
     @staticmethod
-    def from_json(json_data):
+    def from_json(json_data, lazy=False):
+        if lazy:
+            return LazyChannel(json_data)
+
         channel = Channel()
         channel.channel_id = json_data["ChannelID"]
         channel.channel_uri = json_data["ChannelURI"]
@@ -98,34 +119,37 @@ class Channel(models.Model):
         channel.name = json_data["Name"]
         channel.description = json_data.get("Description")
         if "Expires" in json_data:
-            channel.expires = dateutil.parser.parse(json_data["Expires"])
+            channel.expires = parse_datetime(json_data["Expires"])
         if "Created" in json_data:
-            channel.created = dateutil.parser.parse(json_data["Created"])
+            channel.created = parse_datetime(json_data["Created"])
         if "LastModified" in json_data:
-            channel.last_modified = dateutil.parser.parse(
+            channel.last_modified = parse_datetime(
                 json_data["LastModified"])
         channel.modified_by = json_data.get("ModifiedBy")
-        channel.tags = json_data.get("Tags", {})
+        channel.tags = dict(json_data.get("Tags", {}))
         return channel
 
+    json_key = "Channel"
+
     def json_data(self):
+        return {self.json_key: self.json_fields()}
+
+    def json_fields(self):
         return {
-            "Channel": {
-                "ChannelID": self.channel_id,
-                "ChannelURI": self.channel_uri,
-                "SurrogateID": self.surrogate_id,
-                "Type": self.type,
-                "Name": self.name,
-                "Description": self.description,
-                "Expires": self.expires.isoformat() if (
-                    self.expires is not None) else None,
-                "Created": self.created.isoformat() if (
-                    self.created is not None) else None,
-                "LastModified": self.last_modified.isoformat() if (
-                    self.last_modified is not None) else None,
-                "ModifiedBy": self.modified_by,
-                "Tags": self.tags
-            }
+            "ChannelID": self.channel_id,
+            "ChannelURI": self.channel_uri,
+            "SurrogateID": self.surrogate_id,
+            "Type": self.type,
+            "Name": self.name,
+            "Description": self.description,
+            "Expires": self.expires.isoformat() if (
+                self.expires is not None) else None,
+            "Created": self.created.isoformat() if (
+                self.created is not None) else None,
+            "LastModified": self.last_modified.isoformat() if (
+                self.last_modified is not None) else None,
+            "ModifiedBy": self.modified_by,
+            "Tags": self.tags
         }
 
 
@@ -148,7 +172,10 @@ class Endpoint(models.Model):
         return (self.status is not None and self.status.lower() == 'verified')
 
     @staticmethod
-    def from_json(json_data):
+    def from_json(json_data, lazy=False):
+        if lazy:
+            return LazyEndpoint(json_data)
+
         endpoint = Endpoint()
         endpoint.endpoint_id = json_data["EndpointID"]
         endpoint.endpoint_uri = json_data["EndpointURI"]
@@ -161,9 +188,9 @@ class Endpoint(models.Model):
         endpoint.active = json_data["Active"]
         endpoint.default = json_data.get("Default")
         if "Created" in json_data:
-            endpoint.created = dateutil.parser.parse(json_data["Created"])
+            endpoint.created = parse_datetime(json_data["Created"])
         if "LastModified" in json_data:
-            endpoint.last_modified = dateutil.parser.parse(
+            endpoint.last_modified = parse_datetime(
                 json_data["LastModified"])
         endpoint.modified_by = json_data.get("ModifiedBy")
         return endpoint
@@ -174,25 +201,28 @@ class Endpoint(models.Model):
     def get_owner_net_id(self):
         return self.owner
 
+    json_key = "Endpoint"
+
     def json_data(self):
+        return {self.json_key: self.json_fields()}
+
+    def json_fields(self):
         return {
-            "Endpoint": {
-                "EndpointID": self.endpoint_id,
-                "EndpointURI": self.endpoint_uri,
-                "EndpointAddress": self.endpoint_address,
-                "Carrier": self.carrier,
-                "Protocol": self.protocol,
-                "SubscriberID": self.subscriber_id,
-                "OwnerID": self.owner,
-                "Status": self.status,
-                "Active": self.active,
-                "Default": self.default,
-                "Created": self.created.isoformat() if (
-                    self.created is not None) else None,
-                "LastModified": self.last_modified.isoformat() if (
-                    self.last_modified is not None) else None,
-                "ModifiedBy": self.modified_by
-            }
+            "EndpointID": self.endpoint_id,
+            "EndpointURI": self.endpoint_uri,
+            "EndpointAddress": self.endpoint_address,
+            "Carrier": self.carrier,
+            "Protocol": self.protocol,
+            "SubscriberID": self.subscriber_id,
+            "OwnerID": self.owner,
+            "Status": self.status,
+            "Active": self.active,
+            "Default": self.default,
+            "Created": self.created.isoformat() if (
+                self.created is not None) else None,
+            "LastModified": self.last_modified.isoformat() if (
+                self.last_modified is not None) else None,
+            "ModifiedBy": self.modified_by
         }
 
 
@@ -209,14 +239,17 @@ class Subscription(models.Model):
         self.endpoint = None
 
     @staticmethod
-    def from_json(json_data):
+    def from_json(json_data, lazy=False):
+        if lazy:
+            return LazySubscription(json_data)
+
         subscription = Subscription()
         subscription.subscription_id = json_data["SubscriptionID"]
         subscription.subscription_uri = json_data["SubscriptionURI"]
         if json_data.get("Created", None) is not None:
-            subscription.created = dateutil.parser.parse(json_data["Created"])
+            subscription.created = parse_datetime(json_data["Created"])
         if json_data.get("LastModified", None) is not None:
-            subscription.last_modified = dateutil.parser.parse(
+            subscription.last_modified = parse_datetime(
                 json_data["LastModified"])
         subscription.modified_by = json_data.get("ModifiedBy")
 
@@ -227,24 +260,204 @@ class Subscription(models.Model):
             subscription.channel = Channel.from_json(json_data["Channel"])
         return subscription
 
+    json_key = "Subscription"
+
     def json_data(self):
+        return {self.json_key: self.json_fields()}
+
+    def json_fields(self):
         return {
-            "Subscription": {
-                "SubscriptionID": self.subscription_id,
-                "SubscriptionURI": self.subscription_uri,
-                "Created": self.created.isoformat() if (
-                    self.created is not None) else None,
-                "LastModified": self.last_modified.isoformat() if (
-                    self.last_modified is not None) else None,
-                "ModifiedBy": self.modified_by,
-                "Channel": self.channel.json_data()["Channel"] if (
-                    self.channel is not None) else None,
-                "Endpoint": self.endpoint.json_data()["Endpoint"] if (
-                    self.endpoint is not None) else None
-            }
+            "SubscriptionID": self.subscription_id,
+            "SubscriptionURI": self.subscription_uri,
+            "Created": self.created.isoformat() if (
+                self.created is not None) else None,
+            "LastModified": self.last_modified.isoformat() if (
+                self.last_modified is not None) else None,
+            "ModifiedBy": self.modified_by,
+            "Channel": self.channel.json_fields() if (
+                self.channel is not None) else None,
+            "Endpoint": self.endpoint.json_fields() if (
+                self.endpoint is not None) else None
         }
 
 
+class LazyField(object):
+    """
+    A model attribute decoded from the model's json data on first access.
+    """
+    def __init__(self, key, decode=None, default=None):
+        self.key = key
+        self.decode = decode
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            value = instance._json.get(self.key)
+            if value is None:
+                value = self.default() if self.default is not None else None
+            elif self.decode is not None:
+                value = self.decode(value)
+            instance.__dict__[self.name] = value
+            return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+
+class LazyModel(object):
+    """
+    Mixin for models that keep their json data, decoding each field on
+    first access.  Fields can be assigned as usual, and json_data()
+    returns the same data as the fully decoded model.
+    """
+    def __init__(self, json_data):
+        self._json = json_data
+        models.Model.__init__(self)
+
+
+class LazyChannel(LazyModel, Channel):
+    channel_id = LazyField("ChannelID")
+    channel_uri = LazyField("ChannelURI")
+    surrogate_id = LazyField("SurrogateID")
+    type = LazyField("Type")
+    name = LazyField("Name")
+    description = LazyField("Description")
+    expires = LazyField("Expires", parse_datetime)
+    created = LazyField("Created", parse_datetime)
+    last_modified = LazyField("LastModified", parse_datetime)
+    modified_by = LazyField("ModifiedBy")
+    tags = LazyField("Tags", default=dict)
+
+
+class LazyEndpoint(LazyModel, Endpoint):
+    endpoint_id = LazyField("EndpointID")
+    endpoint_uri = LazyField("EndpointURI")
+    endpoint_address = LazyField("EndpointAddress")
+    carrier = LazyField("Carrier")
+    protocol = LazyField("Protocol")
+    subscriber_id = LazyField("SubscriberID")
+    owner = LazyField("OwnerID")
+    status = LazyField("Status")
+    active = LazyField("Active")
+    default = LazyField("Default")
+    created = LazyField("Created", parse_datetime)
+    last_modified = LazyField("LastModified", parse_datetime)
+    modified_by = LazyField("ModifiedBy")
+
+
+class LazySubscription(LazyModel, Subscription):
+    subscription_id = LazyField("SubscriptionID")
+    subscription_uri = LazyField("SubscriptionURI")
+    created = LazyField("Created", parse_datetime)
+    last_modified = LazyField("LastModified", parse_datetime)
+    modified_by = LazyField("ModifiedBy")
+    channel = LazyField("Channel", LazyChannel)
+    endpoint = LazyField("Endpoint", LazyEndpoint)
+
+
+def _parse_optional_datetime(json_data, key):
+    value = json_data.get(key)
+    return parse_datetime(value) if value is not None else None
+
+
+class ChannelRecord(namedtuple("ChannelRecord", (
+        "channel_id", "channel_uri", "surrogate_id", "type", "name",
+        "description", "expires", "created", "last_modified", "modified_by",
+        "tags"))):
+    """
+    A compact, read-only Channel for high-volume results.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, json_data):
+        return cls(
+            json_data["ChannelID"],
+            json_data["ChannelURI"],
+            json_data["SurrogateID"],
+            json_data["Type"],
+            json_data["Name"],
+            json_data.get("Description"),
+            _parse_optional_datetime(json_data, "Expires"),
+            _parse_optional_datetime(json_data, "Created"),
+            _parse_optional_datetime(json_data, "LastModified"),
+            json_data.get("ModifiedBy"),
+            json_data.get("Tags", {}))
+
+    json_key = "Channel"
+    json_data = Channel.json_data
+    json_fields = Channel.json_fields
+
+
+class EndpointRecord(namedtuple("EndpointRecord", (
+        "endpoint_id", "endpoint_uri", "endpoint_address", "carrier",
+        "protocol", "subscriber_id", "owner", "status", "active", "default",
+        "created", "last_modified", "modified_by"))):
+    """
+    A compact, read-only Endpoint for high-volume results.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, json_data):
+        return cls(
+            json_data["EndpointID"],
+            json_data["EndpointURI"],
+            json_data["EndpointAddress"],
+            json_data.get("Carrier"),
+            json_data["Protocol"],
+            json_data["SubscriberID"],
+            json_data["OwnerID"],
+            json_data["Status"],
+            json_data["Active"],
+            json_data.get("Default"),
+            _parse_optional_datetime(json_data, "Created"),
+            _parse_optional_datetime(json_data, "LastModified"),
+            json_data.get("ModifiedBy"))
+
+    is_verified = Endpoint.is_verified
+    get_user_net_id = Endpoint.get_user_net_id
+    get_owner_net_id = Endpoint.get_owner_net_id
+    json_key = "Endpoint"
+    json_data = Endpoint.json_data
+    json_fields = Endpoint.json_fields
+
+
+class SubscriptionRecord(namedtuple("SubscriptionRecord", (
+        "subscription_id", "subscription_uri", "created", "last_modified",
+        "modified_by", "channel", "endpoint"))):
+    """
+    A compact, read-only Subscription for high-volume results.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, json_data):
+        channel = json_data.get("Channel")
+        endpoint = json_data.get("Endpoint")
+        return cls(
+            json_data["SubscriptionID"],
+            json_data["SubscriptionURI"],
+            _parse_optional_datetime(json_data, "Created"),
+            _parse_optional_datetime(json_data, "LastModified"),
+            json_data.get("ModifiedBy"),
+            ChannelRecord.from_json(channel) if (
+                channel is not None) else None,
+            EndpointRecord.from_json(endpoint) if (
+                endpoint is not None) else None)
+
+    json_key = "Subscription"
+    json_data = Subscription.json_data
+    json_fields = Subscription.json_fields
+
+
 class Dispatch(models.Model):
     dispatch_id = models.CharField(max_length=40, default=None)
     dispatch_uri = models.CharField(max_length=200)
@@ -260,20 +473,23 @@ class Dispatch(models.Model):
     def __init__(self, *args, **kwargs):
         self.message = {}
 
+    json_key = "Dispatch"
+
     def json_data(self):
+        return {self.json_key: self.json_fields()}
+
+    def json_fields(self):
         return {
-            "Dispatch": {
-                "DispatchID": self.dispatch_id,
-                "DispatchURI": self.dispatch_uri,
-                "Message": self.message,
-                "Content": self.content,
-                "Directive": self.directive,
-                "NumberOfRecipients": self.number_of_recipients,
-                "Locked": self.locked,
-                "LockID": self.lock_id,
-                "LockedOn": self.locked_on,
-                "LockedBy": self.locked_by
-            }
+            "DispatchID": self.dispatch_id,
+            "DispatchURI": self.dispatch_uri,
+            "Message": self.message,
+            "Content": self.content,
+            "Directive": self.directive,
+            "NumberOfRecipients": self.number_of_recipients,
+            "Locked": self.locked,
+            "LockID": self.lock_id,
+            "LockedOn": self.locked_on,
+            "LockedBy": self.locked_by
         }
 
 
@@ -307,29 +523,118 @@ class MessageType(models.Model):
         message_type.body = json_data["Body"]
         message_type.short = json_data["Short"]
         if "Created" in json_data:
-            message_type.created = dateutil.parser.parse(json_data["Created"])
+            message_type.created = parse_datetime(json_data["Created"])
         if "LastModified" in json_data:
-            message_type.last_modified = dateutil.parser.parse(
-                 json_data["LastModified"])
+            message_type.last_modified = parse_datetime(
+                json_data["LastModified"])
         return message_type
 
+    json_key = "MessageType"
+
     def json_data(self):
+        return {self.json_key: self.json_fields()}
+
+    def json_fields(self):
         return {
-            "MessageType": {
-                "MessageTypeID": self.message_type_id,
-                "MessageTypeURI": self.message_type_uri,
-                "SurrogateID": self.surrogate_id,
-                "ContentType": self.content_type,
-                "DestinationID": self.destination_id,
-                "DestinationType": self.destination_type,
-                "From": self.from_dispatcher,
-                "To": self.to_endpoint,
-                "Subject": self.subject,
-                "Body": self.body,
-                "Short": self.short,
-                "Created": self.created.isoformat() if (
-                    self.created is not None) else None,
-                "LastModified": self.last_modified.isoformat() if (
-                    self.last_modified is not None) else None
-            }
+            "MessageTypeID": self.message_type_id,
+            "MessageTypeURI": self.message_type_uri,
+            "SurrogateID": self.surrogate_id,
+            "ContentType": self.content_type,
+            "DestinationID": self.destination_id,
+            "DestinationType": self.destination_type,
+            "From": self.from_dispatcher,
+            "To": self.to_endpoint,
+            "Subject": self.subject,
+            "Body": self.body,
+            "Short": self.short,
+            "Created": self.created.isoformat() if (
+                self.created is not None) else None,
+            "LastModified": self.last_modified.isoformat() if (
+                self.last_modified is not None) else None
         }
+
+
+class OperationResult(object):
+    """
+    The outcome of one item in a bulk operation, holding either the value
+    returned for the item or the exception it raised.
+    """
+    def __init__(self, item, value=None, exception=None):
+        self.item = item
+        self.value = value
+        self.exception = exception
+
+    def is_success(self):
+        return self.exception is None
+
+
+class BulkOperationReport(object):
+    """
+    The outcome of a bulk operation, with an OperationResult for each item
+    in the order the items were given.
+    """
+    def __init__(self, results, elapsed=0.0):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self):
+        return [result for result in self.results if result.is_success()]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.is_success()]
+
+    def is_success(self):
+        return all(result.is_success() for result in self.results)
+
+    def status_counts(self):
+        """
+        Returns the number of results for each response status.
+        """
+        counts = {}
+        for result in self.results:
+            status = (result.value if result.is_success() else
+                      getattr(result.exception, "status", None))
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, index):
+        return self.results[index]
+
+    def __str__(self):
+        return "{} succeeded, {} failed in {:.3f} seconds".format(
+            len(self.succeeded), len(self.failed), self.elapsed)
+
+
+class ReconciliationPlan(object):
+    """
+    The subscriptions to create and delete so that the subscribers on a
+    channel match a roster.  After the plan is run, created and deleted
+    hold the BulkOperationReport of each change.
+    """
+    def __init__(self, channel_id, creates, deletes, unchanged=0):
+        self.channel_id = channel_id
+        self.creates = creates
+        self.deletes = deletes
+        self.unchanged = unchanged
+        self.created = None
+        self.deleted = None
+
+    def is_empty(self):
+        return not (self.creates or self.deletes)
+
+    def is_success(self):
+        return all(report is None or report.is_success() for report in (
+            self.created, self.deleted))
+
+    def __str__(self):
+        return "{}: {} to create, {} to delete, {} unchanged".format(
+            self.channel_id, len(self.creates), len(self.deletes),
+            self.unchanged)
@@ -0,0 +1,238 @@
+"""
+A durable outbox for dispatches, so that sending a notification does not
+wait on NWS and is not lost while NWS is unavailable.
+"""
+
+from uw_nws import NWS
+from uw_nws.instrumentation import record_outbox
+from logging import getLogger
+import threading
+import sqlite3
+import random
+import atexit
+import uuid
+import time
+
+logger = getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+FAILED = "failed"
+RETRY_STATUS_CODES = (0, 429, 500, 502, 503, 504)
+
+
+class DispatchOutbox(object):
+    """
+    Stores dispatches in a SQLite database until a background drainer has
+    posted them.  Each pass claims up to batch_size due dispatches, so that
+    drainers sharing the database do not send the same dispatch, and sends
+    them with up to max_in_flight requests at a time.  A claim that is not
+    resolved within lease seconds, as when a drainer exits, is released to
+    the other drainers.  Dispatches that fail with a transient error are
+    retried with a jittered exponential backoff, up to max_attempts times,
+    then kept with a failed status.  The depth and age metrics are updated
+    after each pass.
+    """
+    def __init__(self, path, batch_size=100, max_in_flight=10, interval=1.0,
+                 max_attempts=10, backoff=2.0, max_backoff=300.0,
+                 lease=300.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._db = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dispatch ("
+            "dispatch_id TEXT PRIMARY KEY, body BLOB NOT NULL, "
+            "actas_user TEXT, enqueued REAL NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL, "
+            "status TEXT NOT NULL, last_status INTEGER, claim TEXT)")
+        columns = [row[1] for row in self._db.execute(
+            "PRAGMA table_info(dispatch)")]
+        if "claim" not in columns:
+            self._db.execute("ALTER TABLE dispatch ADD COLUMN claim TEXT")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS dispatch_due "
+            "ON dispatch (status, next_attempt)")
+
+    def enqueue(self, dispatch_id, body, actas_user=None):
+        """
+        Stores the encoded body of a dispatch to be posted.  A pending
+        dispatch with the same id is replaced.
+        """
+        now = time.time()
+        with self._lock:
+            # Replacing a dispatch that is being sent drops its claim, so
+            # that the new body is sent too
+            self._db.execute(
+                "INSERT OR REPLACE INTO dispatch (dispatch_id, body, "
+                "actas_user, enqueued, next_attempt, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (dispatch_id, body, actas_user, now, now, PENDING))
+        self._wakeup.set()
+
+    def drain(self):
+        """
+        Posts the pending dispatches that are due, returning the number
+        that were sent.
+        """
+        claim, rows = self._claim()
+
+        batches = {}
+        for row in rows:
+            batches.setdefault(row[2], []).append(row)
+
+        sent = 0
+        for actas_user, batch in batches.items():
+            nws = NWS(actas_user=actas_user)
+            results = nws._run_concurrently(
+                lambda row: nws._post_dispatch_body(row[1]), batch,
+                self.max_in_flight)
+
+            with self._lock:
+                for result in results:
+                    dispatch_id, attempts = result.item[0], result.item[3] + 1
+                    if result.is_success():
+                        sent += 1
+                        self._db.execute(
+                            "DELETE FROM dispatch WHERE dispatch_id = ? "
+                            "AND claim = ?", (dispatch_id, claim))
+                    else:
+                        self._record_failure(
+                            dispatch_id, claim, attempts, result.exception)
+
+        self._update_metrics()
+        return sent
+
+    def _claim(self):
+        """
+        Marks up to batch_size due dispatches as being sent, including
+        those whose claim has expired.
+        Returns the claim id and the (dispatch_id, body, actas_user,
+        attempts) of each claimed dispatch
+        """
+        claim = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT dispatch_id, body, actas_user, attempts "
+                    "FROM dispatch WHERE status IN (?, ?) "
+                    "AND next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                    (PENDING, SENDING, now, self.batch_size)).fetchall()
+                self._db.executemany(
+                    "UPDATE dispatch SET status = ?, claim = ?, "
+                    "next_attempt = ? WHERE dispatch_id = ?",
+                    [(SENDING, claim, now + self.lease, row[0])
+                     for row in rows])
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return claim, rows
+
+    def _record_failure(self, dispatch_id, claim, attempts, exception):
+        status = getattr(exception, "status", 0)
+        if status in RETRY_STATUS_CODES and attempts < self.max_attempts:
+            delay = random.uniform(0, min(
+                self.max_backoff, self.backoff * 2 ** attempts))
+            self._db.execute(
+                "UPDATE dispatch SET attempts = ?, next_attempt = ?, "
+                "last_status = ?, status = ?, claim = NULL "
+                "WHERE dispatch_id = ? AND claim = ?",
+                (attempts, time.time() + delay, status, PENDING,
+                 dispatch_id, claim))
+        else:
+            logger.error("NWS dispatch {} failed: {}".format(
+                dispatch_id, exception))
+            self._db.execute(
+                "UPDATE dispatch SET attempts = ?, status = ?, "
+                "last_status = ?, claim = NULL "
+                "WHERE dispatch_id = ? AND claim = ?",
+                (attempts, FAILED, status, dispatch_id, claim))
+
+    def depth(self):
+        """
+        Returns the number of dispatches waiting to be sent.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM dispatch WHERE status IN (?, ?)",
+                (PENDING, SENDING)).fetchone()[0]
+
+    def oldest_age(self):
+        """
+        Returns the seconds since the oldest dispatch waiting to be sent was
+        enqueued.
+        """
+        with self._lock:
+            enqueued = self._db.execute(
+                "SELECT MIN(enqueued) FROM dispatch WHERE status IN (?, ?)",
+                (PENDING, SENDING)).fetchone()[0]
+        return time.time() - enqueued if enqueued is not None else 0.0
+
+    def get_failed(self):
+        """
+        Returns (dispatch_id, attempts, last_status) for each dispatch that
+        could not be sent.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT dispatch_id, attempts, last_status FROM dispatch "
+                "WHERE status = ? ORDER BY enqueued", (FAILED,)).fetchall()
+
+    def start(self):
+        """
+        Starts the background drainer.
+        """
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="uw_nws_dispatch_outbox", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Stops the background drainer.  Dispatches that have not been sent
+        stay in the outbox.
+        """
+        thread = self._thread
+        if thread is not None:
+            self._stopped.set()
+            self._wakeup.set()
+            thread.join()
+            self._thread = None
+            atexit.unregister(self.stop)
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            try:
+                if self.drain():
+                    continue
+            except Exception as ex:
+                logger.exception("NWS dispatch outbox drain failed: {}".format(
+                    ex))
+            self._wakeup.wait(self.interval)
+
+    def _update_metrics(self):
+        record_outbox(self.depth(), self.oldest_age())
@@ -0,0 +1,159 @@
+"""
+Client-side rate limits for NWS operations, so that bulk jobs stay within
+the NWS quotas rather than being throttled.
+
+RATE_LIMITS maps an operation ("dispatch", "subscription" or
+"verification") to a rate in requests per second, or a (rate, burst)
+pair.  With RATE_LIMIT_DIR, the token buckets are kept in files in that
+directory, shared by every process on the host.
+"""
+
+from uw_nws.instrumentation import record_rate_limit_wait
+from logging import getLogger
+import threading
+import struct
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = getLogger(__name__)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket(object):
+    """
+    A token bucket holding up to capacity tokens, refilled at rate tokens
+    per second, shared by the threads of a process.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Takes a token, waiting for one to be added if the bucket is empty.
+        Returns False if no token is available within timeout seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < wait:
+                    return False
+            time.sleep(wait)
+
+    def _take(self):
+        """
+        Takes a token if one is available, returning 0, or returns the
+        seconds until one will be.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, wait = self._refill_and_take(
+                self._tokens, now - self._updated)
+            self._updated = now
+            return wait
+
+    def _refill_and_take(self, tokens, elapsed):
+        tokens = min(self.capacity, tokens + max(elapsed, 0) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0
+        return tokens, (1 - tokens) / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    A token bucket stored in a file, shared by the processes on a host
+    through an exclusive lock on the file.
+    """
+    STATE = struct.Struct("=dd")
+
+    def __init__(self, path, rate, capacity=None):
+        super(FileTokenBucket, self).__init__(rate, capacity)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def _take(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # Wall clock time, as monotonic clocks are per process
+                now = time.time()
+                data = os.pread(self._fd, self.STATE.size, 0)
+                if len(data) == self.STATE.size:
+                    tokens, updated = self.STATE.unpack(data)
+                else:
+                    tokens, updated = self.capacity, now
+
+                tokens, wait = self._refill_and_take(tokens, now - updated)
+                os.pwrite(self._fd, self.STATE.pack(tokens, now), 0)
+                return wait
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        os.close(self._fd)
+
+
+def get_rate_limiter(dao, operation):
+    """
+    Returns the token bucket for an operation, or None if the operation
+    has no rate limit.
+    """
+    limit = (dao.get_service_setting("RATE_LIMITS", None) or {}).get(
+        operation)
+    if not limit:
+        return None
+
+    rate, capacity = limit if isinstance(limit, (list, tuple)) else (
+        limit, None)
+    directory = dao.get_service_setting("RATE_LIMIT_DIR", None)
+    if directory and fcntl is None:
+        logger.warning("File locks are not available, the {} rate limit "
+                       "is not shared between processes".format(operation))
+        directory = None
+
+    key = (dao.service_name(), operation, rate, capacity, directory)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(key)
+            if bucket is None:
+                if directory:
+                    bucket = FileTokenBucket(os.path.join(
+                        directory, "{}_{}.bucket".format(
+                            dao.service_name(), operation)), rate, capacity)
+                else:
+                    bucket = TokenBucket(rate, capacity)
+                _buckets[key] = bucket
+    return bucket
+
+
+def wait_for_rate_limit(dao, operation):
+    """
+    Waits until the rate limit for an operation allows another request,
+    for up to RATE_LIMIT_TIMEOUT seconds.  Returns False if it timed out.
+    """
+    bucket = get_rate_limiter(dao, operation)
+    if bucket is None:
+        return True
+
+    timeout = dao.get_service_setting("RATE_LIMIT_TIMEOUT", None)
+    start = time.monotonic()
+    try:
+        return bucket.acquire(
+            float(timeout) if timeout is not None else None)
+    finally:
+        record_rate_limit_wait(operation, time.monotonic() - start)
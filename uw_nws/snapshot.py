@@ -0,0 +1,154 @@
+"""
+Snapshots of channels and subscriptions, stored as length-prefixed json
+records so that they can be written while paging through search results
+and read back without decoding the records that are not used.
+
+A snapshot file starts with MAGIC, followed by records of a one byte type,
+a four byte big-endian length, and the json data of one search result.
+"""
+
+from uw_nws import NWS, DAO, API
+from uw_nws.codec import dumps, loads
+from uw_nws.exceptions import InvalidSnapshot
+from uw_nws.models import (
+    Channel, Subscription, ChannelRecord, SubscriptionRecord)
+from functools import partial
+import struct
+import mmap
+import os
+
+MAGIC = b"NWSSNAP1"
+CHANNEL = b"C"
+SUBSCRIPTION = b"S"
+RECORD_HEADER = struct.Struct(">cI")
+
+
+def export_snapshot(nws, path, channel_searches=(),
+                    subscription_searches=()):
+    """
+    Writes the results of channel and subscription searches to path,
+    requesting one page of results at a time.  Each search is a dict of
+    search parameters.  Returns the number of channels and subscriptions
+    written.
+    """
+    counts = {"channels": 0, "subscriptions": 0}
+    tmp_path = "{}.tmp".format(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            for record_type, resource, key, searches, count_key in (
+                    (CHANNEL, "channel", "Channels", channel_searches,
+                     "channels"),
+                    (SUBSCRIPTION, "subscription", "Subscriptions",
+                     subscription_searches, "subscriptions")):
+                for kwargs in searches:
+                    for datum in nws._iter_search_pages(
+                            resource, key, kwargs):
+                        data = dumps(datum)
+                        f.write(RECORD_HEADER.pack(record_type, len(data)))
+                        f.write(data)
+                        counts[count_key] += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return counts
+
+
+class Snapshot(object):
+    """
+    A memory-mapped snapshot file.  Opening a snapshot reads only the
+    record headers; models are built as they are iterated.
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise InvalidSnapshot(path)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise InvalidSnapshot(path)
+
+        self._offsets = {CHANNEL: [], SUBSCRIPTION: []}
+        offset = len(MAGIC)
+        size = len(self._mmap)
+        while offset < size:
+            if offset + RECORD_HEADER.size > size:
+                self.close()
+                raise InvalidSnapshot(path)
+            record_type, length = RECORD_HEADER.unpack_from(
+                self._mmap, offset)
+            offset += RECORD_HEADER.size
+            if record_type in self._offsets:
+                self._offsets[record_type].append((offset, length))
+            offset += length
+
+        if offset != size:
+            self.close()
+            raise InvalidSnapshot(path)
+
+    @property
+    def channel_count(self):
+        return len(self._offsets[CHANNEL])
+
+    @property
+    def subscription_count(self):
+        return len(self._offsets[SUBSCRIPTION])
+
+    def channels(self, lazy=False, records=False):
+        """
+        Yields the channels in the snapshot, as Channel models,
+        LazyChannel models or ChannelRecord tuples.
+        """
+        from_json = ChannelRecord.from_json if records else partial(
+            Channel.from_json, lazy=lazy)
+        for datum in self._iter_json(CHANNEL):
+            yield from_json(datum)
+
+    def subscriptions(self, lazy=False, records=False):
+        """
+        Yields the subscriptions in the snapshot, as Subscription models,
+        LazySubscription models or SubscriptionRecord tuples.
+        """
+        from_json = SubscriptionRecord.from_json if records else partial(
+            Subscription.from_json, lazy=lazy)
+        for datum in self._iter_json(SUBSCRIPTION):
+            yield from_json(datum)
+
+    def warm_lookup_cache(self):
+        """
+        Adds the snapshot channels to the NWS lookup cache, so that
+        get_channel_by_channel_id does not request them.  Returns the
+        number of channels added.
+        """
+        cache = NWS.get_lookup_cache()
+        if cache is None:
+            return 0
+
+        timeout = int(DAO.get_service_setting("LOOKUP_CACHE_TIMEOUT", 0))
+        count = 0
+        for datum in self._iter_json(CHANNEL):
+            cache.set("uw_nws:{}/channel/{}".format(
+                API, datum["ChannelID"]), {"Channel": datum}, timeout)
+            count += 1
+        return count
+
+    def _iter_json(self, record_type):
+        for offset, length in self._offsets[record_type]:
+            yield loads(self._mmap[offset:offset + length])
+
+    def close(self):
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
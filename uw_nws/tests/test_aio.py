@@ -0,0 +1,70 @@
+from unittest import TestCase
+from uw_nws import NWS
+from uw_nws.aio import AsyncNWS, ASYNC_METHODS, get_executor
+from uw_nws.utilities import fdao_nws_override
+from uw_nws.exceptions import InvalidUUID
+from restclients_core.exceptions import DataFailureException
+from commonconf import override_settings
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import mock
+
+
+@fdao_nws_override
+class NWSTestAsync(TestCase):
+    def test_async_methods(self):
+        for name in ASYNC_METHODS:
+            self.assertTrue(hasattr(NWS, name))
+            self.assertTrue(
+                asyncio.iscoroutinefunction(getattr(AsyncNWS, name)))
+
+    def test_actas_user(self):
+        nws = AsyncNWS(actas_user="javerage")
+        self.assertEquals(nws.actas_user, "javerage")
+
+    def test_endpoint_by_endpoint_id(self):
+        nws = AsyncNWS()
+        endpoint = asyncio.run(nws.get_endpoint_by_endpoint_id(
+            "780f2a49-2118-4969-9bef-bbd38c26970a"))
+        self.assertEquals(
+            endpoint.endpoint_id, "780f2a49-2118-4969-9bef-bbd38c26970a")
+
+    def test_gather(self):
+        nws = AsyncNWS()
+
+        async def lookups():
+            return await asyncio.gather(
+                nws.get_channel_by_channel_id(
+                    "b779df7b-d6f6-4afb-8165-8dbe6232119f"),
+                nws.get_subscriptions_by_channel_id(
+                    "b779df7b-d6f6-4afb-8165-8dbe6232119f"),
+                nws.get_person_by_uwregid("9136CCB8F66711D5BE060004AC494FFE"))
+
+        channel, subscriptions, person = asyncio.run(lookups())
+        self.assertEquals(
+            channel.channel_id, "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+        self.assertEquals(len(subscriptions), 5)
+        self.assertEquals(person.surrogate_id, "javerage@washington.edu")
+
+    def test_exceptions(self):
+        nws = AsyncNWS()
+        self.assertRaises(
+            InvalidUUID, asyncio.run, nws.get_channel_by_channel_id("abc"))
+        self.assertRaises(
+            DataFailureException, asyncio.run, nws.get_channel_by_channel_id(
+                "00000000-d6f6-4afb-8165-8dbe6232119f"))
+
+    def test_executor(self):
+        with override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                               RESTCLIENTS_NWS_ASYNC_WORKERS=25,
+                               RESTCLIENTS_NWS_POOL_SIZE=5):
+            with mock.patch("uw_nws.aio._executor", None):
+                executor = get_executor()
+                self.assertEquals(executor._max_workers, 25)
+                self.assertIs(get_executor(), executor)
+                executor.shutdown()
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        nws = AsyncNWS(executor=executor)
+        self.assertIs(nws._executor, executor)
+        executor.shutdown()
@@ -0,0 +1,51 @@
+from unittest import TestCase
+from uw_nws.breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from uw_nws.instrumentation import prometheus_circuit_state
+import mock
+import time
+
+
+class NWSTestCircuitBreaker(TestCase):
+    def _state_value(self, service):
+        return prometheus_circuit_state.labels(service)._value.get()
+
+    def test_open_and_close(self):
+        breaker = CircuitBreaker("test", failure_threshold=2,
+                                 reset_timeout=30)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(self._state_value("test"), 1)
+        self.assertFalse(breaker.allow_request())
+
+        with mock.patch("uw_nws.breaker.time.time",
+                        return_value=time.time() + 31):
+            self.assertTrue(breaker.allow_request())
+            self.assertEqual(breaker.state, HALF_OPEN)
+            self.assertFalse(breaker.allow_request())
+
+            breaker.record_failure()
+            self.assertEqual(breaker.state, OPEN)
+            self.assertFalse(breaker.allow_request())
+
+        with mock.patch("uw_nws.breaker.time.time",
+                        return_value=time.time() + 62):
+            self.assertTrue(breaker.allow_request())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CLOSED)
+            self.assertEqual(self._state_value("test"), 0)
+
+    def test_get(self):
+        breaker = CircuitBreaker.get("test_get", 3, 10)
+        self.assertIs(CircuitBreaker.get("test_get", 4, 20), breaker)
+        self.assertEqual(breaker.failure_threshold, 4)
+        self.assertEqual(breaker.reset_timeout, 20)
+
+        breaker.record_failure()
+        CircuitBreaker.reset_all()
+        self.assertEqual(breaker.failures, 0)
@@ -0,0 +1,119 @@
+from unittest import TestCase
+from uw_nws import NWS, DAO
+from uw_nws.cache import LocalCache
+from commonconf import override_settings
+from restclients_core.exceptions import DataFailureException
+import mock
+import time
+
+
+class SharedCache(LocalCache):
+    pass
+
+
+class NWSTestLocalCache(TestCase):
+    def test_get_set_delete(self):
+        cache = LocalCache()
+        self.assertEquals(cache.get("a"), None)
+        self.assertTrue(cache.set("a", "1"))
+        self.assertEquals(cache.get("a"), "1")
+        self.assertTrue(cache.delete("a"))
+        self.assertFalse(cache.delete("a"))
+        self.assertEquals(cache.get("a"), None)
+
+    def test_timeout(self):
+        cache = LocalCache()
+        cache.set("a", "1", 60)
+        cache.set("b", "2", 60)
+        with mock.patch("uw_nws.cache.time.time",
+                        return_value=time.time() + 61):
+            self.assertEquals(cache.get("a"), None)
+        self.assertEquals(cache.get("b"), "2")
+        self.assertEquals(len(cache), 1)
+
+    def test_lru_eviction(self):
+        cache = LocalCache(max_size=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        self.assertEquals(cache.get("b"), None)
+        self.assertEquals(cache.get("a"), "1")
+        self.assertEquals(cache.get("c"), "3")
+
+        cache.clear()
+        self.assertEquals(len(cache), 0)
+
+
+@override_settings(RESTCLIENTS_NWS_DAO_CLASS='Mock',
+                   RESTCLIENTS_NWS_LOOKUP_CACHE_TIMEOUT=60)
+class NWSTestLookupCache(TestCase):
+    def setUp(self):
+        NWS._lookup_cache = None
+
+    def tearDown(self):
+        NWS._lookup_cache = None
+
+    def test_channel_lookup(self):
+        nws = NWS()
+        with mock.patch.object(DAO, "getURL", wraps=DAO.getURL) as get_url:
+            channel = nws.get_channel_by_channel_id(
+                "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+            channel.tags["sln"] = "00000"
+            channel = NWS().get_channel_by_channel_id(
+                "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+            self.assertEquals(get_url.call_count, 1)
+            self.assertEquals(channel.tags["sln"], "12345")
+            self.assertEquals(
+                channel.channel_id, "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+
+            self.assertRaises(
+                DataFailureException, nws.get_channel_by_channel_id,
+                "00000000-d6f6-4afb-8165-8dbe6232119f")
+            self.assertRaises(
+                DataFailureException, nws.get_channel_by_channel_id,
+                "00000000-d6f6-4afb-8165-8dbe6232119f")
+            self.assertEquals(get_url.call_count, 3)
+
+    def test_message_type_invalidation(self):
+        nws = NWS(actas_user="javerage")
+        message_type_id = "d097a66a-23bb-4b2b-bb44-01fe1d11aab8"
+        message_type = nws.get_message_type_by_id(message_type_id)
+        cache = NWS.get_lookup_cache()
+        key = "uw_nws:javerage:/notification/v1/message-type/{}".format(
+            message_type_id)
+        self.assertIsNotNone(cache.get(key))
+
+        self.assertRaises(
+            DataFailureException, nws.update_message_type, message_type)
+        self.assertIsNone(cache.get(key))
+
+        nws.get_message_type_by_id(message_type_id)
+        self.assertRaises(
+            DataFailureException, nws.delete_message_type, message_type_id)
+        self.assertIsNone(cache.get(key))
+
+    def test_message_type_actas_user(self):
+        message_type_id = "d097a66a-23bb-4b2b-bb44-01fe1d11aab8"
+        with mock.patch.object(DAO, "getURL", wraps=DAO.getURL) as get_url:
+            NWS(actas_user="javerage").get_message_type_by_id(message_type_id)
+            NWS(actas_user="javerage").get_message_type_by_id(message_type_id)
+            self.assertEquals(get_url.call_count, 1)
+
+            NWS(actas_user="bill").get_message_type_by_id(message_type_id)
+            self.assertEquals(get_url.call_count, 2)
+            self.assertEquals(
+                get_url.call_args[0][1]["X_UW_ACT_AS"], "bill")
+
+    @override_settings(RESTCLIENTS_NWS_LOOKUP_CACHE_TIMEOUT=60,
+                       RESTCLIENTS_NWS_LOOKUP_CACHE_CLASS=(
+                           "uw_nws.tests.test_cache.SharedCache"))
+    def test_cache_class(self):
+        self.assertIsInstance(NWS.get_lookup_cache(), SharedCache)
+
+    @override_settings(RESTCLIENTS_NWS_LOOKUP_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.assertIsNone(NWS.get_lookup_cache())
+        nws = NWS()
+        nws.get_message_type_by_id("d097a66a-23bb-4b2b-bb44-01fe1d11aab0")
+        self.assertIsNone(NWS._lookup_cache)
@@ -1,10 +1,12 @@
 from unittest import TestCase
-from uw_nws import NWS
-from uw_nws.models import Channel
+from uw_nws import NWS, DAO
+from uw_nws.models import Channel, LazyChannel, ChannelRecord
 from uw_nws.utilities import fdao_nws_override
 from uw_nws.exceptions import InvalidUUID
 from restclients_core.exceptions import DataFailureException
+from restclients_core.models import MockHTTP
 from datetime import datetime
+import mock
 
 
 @fdao_nws_override
@@ -15,6 +17,31 @@ class NWSTestChannel(TestCase):
             "b779df7b-d6f6-4afb-8165-8dbe6232119f")
         self._assert_channel(channel)
 
+    def test_channel_conditional_get(self):
+        get_url = DAO.getURL
+
+        def conditional_get_url(url, headers):
+            if headers.get("If-None-Match") == '"v1"':
+                response = MockHTTP()
+                response.status = 304
+                return response
+            response = get_url(url, headers)
+            response.headers = {"ETag": '"v1"'}
+            return response
+
+        nws = NWS()
+        with mock.patch.object(NWS, "_validator_cache", None), \
+                mock.patch.object(
+                    DAO, "getURL", side_effect=conditional_get_url), \
+                mock.patch.object(
+                    NWS, "_json_loads", wraps=nws._json_loads) as json_loads:
+            for i in range(2):
+                channel = nws.get_channel_by_channel_id(
+                    "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+                self._assert_channel(channel)
+                channel.tags["sln"] = "00000"
+            self.assertEquals(json_loads.call_count, 1)
+
     def test_channel_by_channel_id_exceptions(self):
         nws = NWS()
         self.assertRaises(InvalidUUID, nws.get_channel_by_channel_id, "abc")
@@ -32,6 +59,36 @@ class NWSTestChannel(TestCase):
             DataFailureException, nws.get_channels_by_sln,
             "uw_student_courseavailable", "00000")
 
+    def test_lazy_channels(self):
+        nws = NWS()
+        channels = nws.search_channels(
+            type="uw_student_courseavailable",
+            surrogate_id="2012,autumn,cse,100,w", lazy=True)
+        self.assertIsInstance(channels[0], LazyChannel)
+        self._assert_channel(channels[0])
+        self.assertEquals(channels[0].created.year, 2012)
+
+        eager = nws.search_channels(
+            type="uw_student_courseavailable",
+            surrogate_id="2012,autumn,cse,100,w")
+        self.assertEquals(
+            [c.json_data() for c in eager], [c.json_data() for c in channels])
+
+    def test_channel_records(self):
+        nws = NWS()
+        records = nws.search_channels(
+            type="uw_student_courseavailable",
+            surrogate_id="2012,autumn,cse,100,w", records=True)
+        self.assertIsInstance(records[0], ChannelRecord)
+        self._assert_channel(records[0])
+
+        records = list(nws.iter_channels(
+            type="uw_student_courseavailable",
+            surrogate_id="2012,autumn,cse,100,w", max_results=1,
+            records=True))
+        self.assertEquals(len(records), 2)
+        self.assertIsInstance(records[1], ChannelRecord)
+
     def test_channel_sln_and_term(self):
         nws = NWS()
         channels = nws.get_channels_by_sln_year_quarter(
@@ -42,6 +99,17 @@ class NWSTestChannel(TestCase):
             DataFailureException, nws.get_channels_by_sln_year_quarter,
             "uw_student_courseavailable", "12345", 2013, "summer")
 
+    def test_iter_channels(self):
+        nws = NWS()
+        with mock.patch.object(nws, "_search", wraps=nws._search) as search:
+            channels = list(nws.iter_channels(
+                type="uw_student_courseavailable",
+                surrogate_id="2012,autumn,cse,100,w", max_results=1))
+            self.assertEquals(search.call_count, 2)
+
+        self.assertEquals(len(channels), 2)
+        self._assert_channel(channels[0])
+
     def test_active_channels_by_year_quarter(self):
         nws = NWS()
         dt = datetime(2013, 5, 31, 0, 0, 0)
@@ -53,6 +121,19 @@ class NWSTestChannel(TestCase):
             DataFailureException,  nws.get_active_channels_by_year_quarter,
             "uw_student_courseavailable", 2013, 'summer', expires=dt)
 
+    def test_active_channels_default_expires(self):
+        nws = NWS()
+        with mock.patch.object(nws, "search_channels") as search_channels:
+            search_channels.return_value = []
+            self.assertEquals(nws.get_active_channels_by_year_quarter(
+                "uw_student_courseavailable", 2013, "spring"), [])
+
+        expires = datetime.strptime(
+            search_channels.call_args[1]["expires_after"],
+            "%Y-%m-%dT%H:%M:%S")
+        self.assertEquals(expires, datetime.combine(
+            datetime.utcnow().date(), datetime.min.time()))
+
     def _assert_channel(self, channel):
         self.assertEquals(
             channel.channel_id, "b779df7b-d6f6-4afb-8165-8dbe6232119f")
@@ -0,0 +1,73 @@
+from unittest import TestCase
+from uw_nws import NWS, DAO
+from uw_nws.codec import (
+    CODECS, StdlibCodec, get_codec, reset_codec, encode_model, dumps, loads)
+from uw_nws.models import (
+    Subscription, Endpoint, Channel, Person, Dispatch, SubscriptionRecord)
+from commonconf import override_settings
+from datetime import datetime
+import json
+import mock
+
+
+class NWSTestCodec(TestCase):
+    def tearDown(self):
+        reset_codec()
+
+    def _subscription(self):
+        subscription = Subscription()
+        subscription.subscription_id = "c4597f93-0f62-4feb-ac88-af5f0329001f"
+        subscription.created = datetime(2013, 3, 5, 1, 9, 31)
+        subscription.endpoint = Endpoint()
+        subscription.endpoint.endpoint_address = "javerage0@uw.edu"
+        subscription.endpoint.protocol = "Email"
+        subscription.channel = Channel()
+        subscription.channel.channel_id = (
+            "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+        subscription.channel.tags = {"sln": "12345"}
+        return subscription
+
+    def test_codecs(self):
+        data = {"Name": "café", "Count": 3, "Tags": {"a": None},
+                "Items": [True, 1.5]}
+        for name in CODECS:
+            codec = get_codec(name)
+            self.assertEqual(codec.name, name)
+            encoded = codec.dumps(data)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded), data)
+            self.assertEqual(codec.loads(encoded), data)
+            self.assertEqual(codec.loads(encoded.decode("utf-8")), data)
+
+    def test_get_codec(self):
+        self.assertIs(get_codec(), get_codec())
+        self.assertRaises(ValueError, get_codec, "yaml")
+        with override_settings(RESTCLIENTS_NWS_JSON_CODEC="json"):
+            reset_codec()
+            with mock.patch("uw_nws.DAO.get_service_setting",
+                            wraps=DAO.get_service_setting) as mock_setting:
+                self.assertIsInstance(get_codec(), StdlibCodec)
+                self.assertIsInstance(get_codec(), StdlibCodec)
+                self.assertEqual(mock_setting.call_count, 1)
+            self.assertEqual(dumps({"a": 1}), b'{"a":1}')
+            self.assertEqual(loads(b'{"a":1}'), {"a": 1})
+
+    def test_encode_model(self):
+        subscription = self._subscription()
+        person = Person()
+        person.person_id = "9136CCB8F66711D5BE060004AC494FFE"
+        person.attributes = {"AcceptedTermsOfUse": True}
+        person.endpoints = [subscription.endpoint]
+        dispatch = Dispatch()
+        dispatch.message = {"Body": "Seat available"}
+        record = SubscriptionRecord.from_json(
+            subscription.json_data()["Subscription"])
+
+        for name in CODECS:
+            with override_settings(RESTCLIENTS_NWS_JSON_CODEC=name):
+                reset_codec()
+                for model in (subscription, person, dispatch, record):
+                    self.assertEqual(json.loads(encode_model(model)),
+                                     model.json_data())
+                    self.assertEqual(json.loads(NWS()._json_body(
+                        model.json_data())), model.json_data())
@@ -1,8 +1,16 @@
 from unittest import TestCase
-from uw_nws.dao import NWS_DAO, NWS_AUTH_DAO
+from uw_nws.dao import NWS_DAO, NWS_AUTH_DAO, NWSLiveDAO
+from uw_nws.breaker import CircuitBreaker, OPEN, CLOSED
+from uw_nws.exceptions import CircuitOpenException
+from restclients_core.dao import LiveDAO
+from restclients_core.models import MockHTTP
 from uw_nws.utilities import fdao_nws_override
 from commonconf import override_settings
+from restclients_core.exceptions import DataFailureException
+from email.utils import formatdate
+import socket
 import mock
+import time
 
 
 @fdao_nws_override
@@ -24,3 +32,303 @@ class NWSTestDAO(TestCase):
     def test_is_cacheable(self):
         auth = NWS_AUTH_DAO()
         self.assertTrue(auth._is_cacheable("POST", "/", {}, ""))
+
+    @mock.patch.object(NWS_AUTH_DAO, "postURL")
+    def test_auth_token_cache(self, mock_post):
+        response = mock.Mock(status=200)
+        response.data = '{"access_token": "abcdef", "expires_in": 3600}'
+        mock_post.return_value = response
+
+        NWS_AUTH_DAO.clear_auth_tokens()
+        auth = NWS_AUTH_DAO()
+        self.assertEqual(auth.get_auth_token("test1"), "abcdef")
+        self.assertEqual(auth.get_auth_token("test1"), "abcdef")
+        self.assertEqual(mock_post.call_count, 1)
+
+        self.assertEqual(auth.get_auth_token("test2"), "abcdef")
+        self.assertEqual(mock_post.call_count, 2)
+
+        NWS_AUTH_DAO.clear_auth_tokens()
+        self.assertEqual(auth.get_auth_token("test1"), "abcdef")
+        self.assertEqual(mock_post.call_count, 3)
+        NWS_AUTH_DAO.clear_auth_tokens()
+
+    @mock.patch.object(NWS_AUTH_DAO, "postURL")
+    def test_auth_token_expiring(self, mock_post):
+        response = mock.Mock(status=200)
+        response.data = '{"access_token": "abcdef", "expires_in": 30}'
+        mock_post.return_value = response
+
+        NWS_AUTH_DAO.clear_auth_tokens()
+        auth = NWS_AUTH_DAO()
+        self.assertEqual(auth.get_auth_token("test1"), "abcdef")
+        self.assertEqual(auth.get_auth_token("test1"), "abcdef")
+        self.assertEqual(mock_post.call_count, 2)
+
+    @mock.patch.object(NWS_AUTH_DAO, "postURL")
+    def test_auth_token_failure(self, mock_post):
+        mock_post.return_value = mock.Mock(status=401, data="")
+
+        NWS_AUTH_DAO.clear_auth_tokens()
+        auth = NWS_AUTH_DAO()
+        self.assertRaises(
+            DataFailureException, auth.get_auth_token, "test1")
+
+
+@override_settings(RESTCLIENTS_NWS_DAO_CLASS="Live",
+                   RESTCLIENTS_NWS_AUTH_DAO_CLASS="Live",
+                   RESTCLIENTS_NWS_HOST="https://nws.example.edu",
+                   RESTCLIENTS_NWS_AUTH_HOST="https://nws.example.edu",
+                   RESTCLIENTS_NWS_POOL_SIZE=4)
+class NWSTestConnectionPool(TestCase):
+    def tearDown(self):
+        for key in list(LiveDAO.pools.keys()):
+            if key.startswith("nws"):
+                del LiveDAO.pools[key]
+
+    def test_pool_settings(self):
+        dao = NWS_DAO()
+        implementation = dao.get_implementation()
+        self.assertIsInstance(implementation, NWSLiveDAO)
+
+        pool = implementation.get_pool()
+        self.assertIs(pool, implementation.get_pool())
+        self.assertEqual(pool.pool.maxsize, 4)
+        self.assertTrue(pool.block)
+        self.assertNotIn("socket_options", pool.conn_kw)
+        self.assertIsNot(pool, NWS_AUTH_DAO().get_implementation().get_pool())
+
+    @override_settings(RESTCLIENTS_NWS_DAO_CLASS="Live",
+                       RESTCLIENTS_NWS_AUTH_DAO_CLASS="Live",
+                       RESTCLIENTS_NWS_HOST="https://nws.example.edu",
+                       RESTCLIENTS_NWS_AUTH_HOST="https://nws.example.edu",
+                       RESTCLIENTS_NWS_POOL_SHARED=True,
+                       RESTCLIENTS_NWS_AUTH_POOL_SHARED=True,
+                       RESTCLIENTS_NWS_POOL_BLOCK=False,
+                       RESTCLIENTS_NWS_POOL_TCP_KEEPIDLE=30)
+    def test_shared_pool(self):
+        pool = NWS_DAO().get_implementation().get_pool()
+        self.assertIs(pool, NWS_AUTH_DAO().get_implementation().get_pool())
+        self.assertFalse(pool.block)
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+                      pool.conn_kw["socket_options"])
+
+    def test_pool_stats(self):
+        dao = NWS_DAO()
+        stats = dao.get_pool_stats()
+        self.assertEqual(stats, {
+            "pool": "nws", "maxsize": 4, "idle": 0, "requests": 0,
+            "hits": 0, "misses": 0})
+
+        pool = dao.get_implementation().get_pool()
+        pool.num_requests = 10
+        pool.num_connections = 2
+        stats = dao.get_pool_stats()
+        self.assertEqual(stats["hits"], 8)
+        self.assertEqual(stats["misses"], 2)
+
+    @override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock")
+    def test_mock_pool_stats(self):
+        self.assertIsNone(NWS_DAO().get_pool_stats())
+
+
+def mock_response(status, headers=None):
+    response = MockHTTP()
+    response.status = status
+    response.headers = headers or {}
+    return response
+
+
+@override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                   RESTCLIENTS_NWS_RETRY_MAX_ATTEMPTS=3,
+                   RESTCLIENTS_NWS_CIRCUIT_FAILURE_THRESHOLD=2)
+@mock.patch("uw_nws.dao.time.sleep")
+class NWSTestRetry(TestCase):
+    def setUp(self):
+        CircuitBreaker.reset_all()
+
+    def tearDown(self):
+        CircuitBreaker.reset_all()
+
+    def test_retry_get(self, mock_sleep):
+        dao = NWS_DAO()
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(503), mock_response(429),
+                    mock_response(200)]) as mock_load:
+            response = dao.getURL("/notification/v1/channel/1")
+            self.assertEqual(response.status, 200)
+            self.assertEqual(mock_load.call_count, 3)
+            self.assertEqual(mock_sleep.call_count, 2)
+            self.assertLessEqual(mock_sleep.call_args_list[0][0][0], 1.0)
+            self.assertLessEqual(mock_sleep.call_args_list[1][0][0], 2.0)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(503), mock_response(503),
+                    mock_response(503), mock_response(200)]) as mock_load:
+            response = dao.getURL("/notification/v1/channel/1")
+            self.assertEqual(response.status, 503)
+            self.assertEqual(mock_load.call_count, 3)
+
+    def test_retry_connection_error(self, mock_sleep):
+        dao = NWS_DAO()
+        error = DataFailureException("/notification/v1/channel/1", 0, "")
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    error, mock_response(200)]):
+            self.assertEqual(
+                dao.getURL("/notification/v1/channel/1").status, 200)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=error):
+            self.assertRaises(
+                DataFailureException, dao.getURL,
+                "/notification/v1/channel/1")
+
+    def test_retry_post(self, mock_sleep):
+        dao = NWS_DAO()
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(502), mock_response(200)]) as mock_load:
+            response = dao.postURL("/notification/v1/dispatch", {}, "{}")
+            self.assertEqual(response.status, 200)
+            self.assertEqual(mock_load.call_count, 2)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(502), mock_response(201)]) as mock_load:
+            response = dao.postURL("/notification/v1/subscription", {}, "{}")
+            self.assertEqual(response.status, 502)
+            self.assertEqual(mock_load.call_count, 1)
+            self.assertEqual(mock_sleep.call_count, 1)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(503), mock_response(201)]) as mock_load:
+            response = dao.postURL("/notification/v1/subscription", {}, "{}")
+            self.assertEqual(response.status, 201)
+            self.assertEqual(mock_load.call_count, 2)
+
+        error = DataFailureException("/notification/v1/subscription", 0, "")
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    error, mock_response(201)]) as mock_load:
+            self.assertRaises(
+                DataFailureException, dao.postURL,
+                "/notification/v1/subscription", {}, "{}")
+            self.assertEqual(mock_load.call_count, 1)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(500), mock_response(204)]) as mock_load:
+            response = dao.deleteURL("/notification/v1/subscription/1", {})
+            self.assertEqual(response.status, 204)
+            self.assertEqual(mock_load.call_count, 2)
+
+        error = DataFailureException("/notification/v1/subscription/1", 0, "")
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    error, mock_response(404)]) as mock_load:
+            response = dao.deleteURL("/notification/v1/subscription/1", {})
+            self.assertEqual(response.status, 204)
+            self.assertEqual(mock_load.call_count, 2)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource",
+                return_value=mock_response(404)) as mock_load:
+            response = dao.deleteURL("/notification/v1/subscription/1", {})
+            self.assertEqual(response.status, 404)
+            self.assertEqual(mock_load.call_count, 1)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(503), mock_response(204)]) as mock_load:
+            response = dao.putURL("/notification/v1/person/1", {}, "{}")
+            self.assertEqual(response.status, 503)
+            self.assertEqual(mock_load.call_count, 1)
+
+    @override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                       RESTCLIENTS_NWS_CIRCUIT_FAILURE_THRESHOLD=2,
+                       RESTCLIENTS_NWS_AUTH_SECRET="test1")
+    @mock.patch.object(NWS_AUTH_DAO, "postURL")
+    def test_auth_token_failure(self, mock_sleep, mock_post):
+        mock_post.return_value = mock.Mock(status=401, data="")
+        NWS_AUTH_DAO.clear_auth_tokens()
+
+        dao = NWS_DAO()
+        breaker = dao.get_circuit_breaker()
+        breaker.failures = 1
+        self.assertRaises(
+            DataFailureException, dao.getURL, "/notification/v1/channel/1")
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_sleep.call_count, 0)
+        self.assertEqual(breaker.failures, 1)
+
+        breaker.record_failure()
+        breaker.opened_at -= 30
+        self.assertRaises(
+            DataFailureException, dao.getURL, "/notification/v1/channel/1")
+        self.assertEqual(breaker.state, OPEN)
+        self.assertTrue(breaker.allow_request())
+
+    def test_retry_after(self, mock_sleep):
+        dao = NWS_DAO()
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(429, {"retry-after": "5"}),
+                    mock_response(200)]):
+            dao.getURL("/notification/v1/channel/1")
+            delay = mock_sleep.call_args[0][0]
+            self.assertGreaterEqual(delay, 5)
+            self.assertLessEqual(delay, 5.5)
+
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource", side_effect=[
+                    mock_response(503, {"Retry-After": "600"}),
+                    mock_response(200)]):
+            self.assertEqual(
+                dao.getURL("/notification/v1/channel/1").status, 503)
+            self.assertEqual(mock_sleep.call_count, 1)
+
+        self.assertAlmostEqual(
+            dao._parse_retry_after(formatdate(time.time() + 10)), 10,
+            delta=1.5)
+        self.assertIsNone(dao._parse_retry_after("soon"))
+        self.assertIsNone(dao._parse_retry_after(None))
+
+    def test_circuit_breaker(self, mock_sleep):
+        dao = NWS_DAO()
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource",
+                return_value=mock_response(500)) as mock_load:
+            dao.getURL("/notification/v1/channel/1")
+            dao.deleteURL("/notification/v1/subscription/1")
+            self.assertEqual(dao.get_circuit_breaker().state, OPEN)
+            self.assertEqual(mock_load.call_count, 6)
+
+            self.assertRaises(
+                CircuitOpenException, dao.getURL,
+                "/notification/v1/channel/1")
+            self.assertEqual(mock_load.call_count, 6)
+
+        breaker = dao.get_circuit_breaker()
+        breaker.opened_at -= 30
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource",
+                return_value=mock_response(404)):
+            self.assertEqual(
+                dao.getURL("/notification/v1/channel/1").status, 404)
+        self.assertEqual(breaker.state, CLOSED)
+
+    @override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock")
+    def test_disabled(self, mock_sleep):
+        dao = NWS_DAO()
+        self.assertIsNone(dao.get_circuit_breaker())
+        with mock.patch.object(
+                NWS_DAO, "_load_timed_resource",
+                return_value=mock_response(503)) as mock_load:
+            for i in range(10):
+                dao.getURL("/notification/v1/channel/1")
+            self.assertEqual(mock_load.call_count, 10)
+            self.assertEqual(mock_sleep.call_count, 0)
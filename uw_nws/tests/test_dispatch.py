@@ -5,6 +5,7 @@ from uw_nws.utilities import fdao_nws_override
 from restclients_core.exceptions import (
     DataFailureException)
 from uw_nws.exceptions import InvalidUUID
+import mock
 
 
 @fdao_nws_override
@@ -38,6 +39,54 @@ class NWSTestDispatch(TestCase):
         self.assertRaises(
             InvalidUUID, nws.create_new_dispatch, dispatch)
 
+    def test_create_dispatches(self):
+        dispatches = []
+        for i in range(5):
+            dispatch = self._setup_dispatch()
+            dispatch.dispatch_id = (
+                "8b77b7b8-604e-4854-9c8d-872214fe8ae{}".format(i))
+            dispatches.append(dispatch)
+
+        nws = NWS(actas_user="javerage")
+        results = nws.create_dispatches(dispatches, max_in_flight=2)
+        self.assertEquals(len(results), 5)
+        for dispatch, result in zip(dispatches, results):
+            self.assertEquals(result.item, dispatch)
+            self.assertFalse(result.is_success())
+            self.assertIsInstance(result.exception, DataFailureException)
+
+        with mock.patch("uw_nws.DAO.postURL") as mock_post:
+            mock_post.return_value = mock.Mock(status=200, data="")
+            results = nws.create_dispatches(iter(dispatches))
+            self.assertEquals(mock_post.call_count, 5)
+            self.assertTrue(all(r.is_success() for r in results))
+            self.assertEquals(results[0].value, 200)
+
+        def post_url(url, headers, body):
+            if b"8b77b7b8-604e-4854-9c8d-872214fe8ae2" in body:
+                raise ConnectionError("connection reset")
+            return mock.Mock(status=200, data="")
+
+        with mock.patch("uw_nws.DAO.postURL", side_effect=post_url):
+            results = nws.create_dispatches(dispatches, max_in_flight=2)
+            self.assertEquals(
+                [r.is_success() for r in results],
+                [True, True, False, True, True])
+            self.assertIsInstance(results[2].exception, ConnectionError)
+
+        self.assertEquals(nws.create_dispatches([]), [])
+
+    def test_create_invalid_dispatches(self):
+        dispatch = self._setup_dispatch()
+        invalid = self._setup_dispatch()
+        invalid.dispatch_id = "123"
+
+        nws = NWS()
+        with mock.patch("uw_nws.DAO.postURL") as mock_post:
+            self.assertRaises(
+                InvalidUUID, nws.create_dispatches, [dispatch, invalid])
+            self.assertEquals(mock_post.call_count, 0)
+
     def test_delete_dispatch(self):
         nws = NWS(actas_user="javerage")
         self.assertRaises(
@@ -0,0 +1,320 @@
+from unittest import TestCase
+from uw_nws import NWS
+from uw_nws.index import SubscriptionIndex, ChannelIndex
+from uw_nws.models import Subscription, Endpoint, Channel
+from uw_nws.utilities import fdao_nws_override
+from uw_nws.exceptions import InvalidUUID
+from restclients_core.exceptions import DataFailureException
+from restclients_core.models import MockHTTP
+from commonconf import override_settings
+from urllib.parse import parse_qsl, urlparse
+import tempfile
+import json
+import mock
+import os
+
+CHANNEL_ID = "b779df7b-d6f6-4afb-8165-8dbe6232119f"
+OTHER_CHANNEL_ID = "ce1d46fe-1cdf-4c5a-a316-20f6c99789b8"
+THIRD_CHANNEL_ID = "d4e1a9c6-0b1f-4f8e-9c35-8f0e6a2b7c11"
+
+
+@fdao_nws_override
+class NWSTestSubscriptionIndex(TestCase):
+    def _subscription(self, subscription_id, channel_id, subscriber_id,
+                      endpoint_id="ff53f5b8-f7f9-4eae-9d8b-b92717d4b670"):
+        subscription = Subscription()
+        subscription.subscription_id = subscription_id
+        subscription.endpoint = Endpoint()
+        subscription.endpoint.endpoint_id = endpoint_id
+        subscription.endpoint.subscriber_id = subscriber_id
+        subscription.channel = Channel()
+        subscription.channel.channel_id = channel_id
+        return subscription
+
+    def test_load_search(self):
+        index = SubscriptionIndex()
+        index.load_search(NWS(), channel_id=CHANNEL_ID)
+        self.assertEquals(len(index), 5)
+        self.assertTrue(index.is_subscribed(CHANNEL_ID, "javerage"))
+        self.assertTrue(
+            index.is_subscribed(CHANNEL_ID, "JAverage@washington.edu"))
+        self.assertFalse(index.is_subscribed(CHANNEL_ID, "bill"))
+        self.assertFalse(index.is_subscribed(OTHER_CHANNEL_ID, "javerage"))
+        self.assertTrue(index.has_endpoint(
+            CHANNEL_ID, "ff53f5b8-f7f9-4eae-9d8b-b92717d4b670"))
+        self.assertEquals(index.get_subscribers(CHANNEL_ID), {"javerage"})
+        self.assertEquals(
+            index.get_channel_ids("javerage@washington.edu"), {CHANNEL_ID})
+
+    def test_add_remove(self):
+        index = SubscriptionIndex([
+            self._subscription("1d4878da-bfd3-4a23-abfe-58979ca65e7f",
+                               CHANNEL_ID, "javerage"),
+            self._subscription("5a9fe11e-354f-4017-b1f2-ae42a0b89031",
+                               CHANNEL_ID, "javerage"),
+            self._subscription(None, OTHER_CHANNEL_ID, "bill")])
+        self.assertEquals(len(index), 3)
+        self.assertEquals(index.get_channel_ids("bill"), {OTHER_CHANNEL_ID})
+
+        self.assertTrue(index.remove("1d4878da-bfd3-4a23-abfe-58979ca65e7f"))
+        self.assertFalse(index.remove("1d4878da-bfd3-4a23-abfe-58979ca65e7f"))
+        self.assertTrue(index.is_subscribed(CHANNEL_ID, "javerage"))
+
+        index.remove("5a9fe11e-354f-4017-b1f2-ae42a0b89031")
+        self.assertFalse(index.is_subscribed(CHANNEL_ID, "javerage"))
+        self.assertEquals(index.get_subscribers(CHANNEL_ID), set())
+        self.assertFalse(index.has_endpoint(
+            CHANNEL_ID, "ff53f5b8-f7f9-4eae-9d8b-b92717d4b670"))
+
+        index.clear()
+        self.assertEquals(len(index), 0)
+
+    def test_created_then_loaded(self):
+        index = SubscriptionIndex()
+        created = self._subscription(None, CHANNEL_ID, "javerage", None)
+        self.assertTrue(index.add(created))
+        self.assertEquals(len(index), 1)
+
+        index.load_search(NWS(), channel_id=CHANNEL_ID)
+        self.assertEquals(len(index), 5)
+        index.add(created)
+        self.assertEquals(len(index), 5)
+
+        for subscription in NWS().search_subscriptions(
+                channel_id=CHANNEL_ID):
+            index.remove(subscription.subscription_id)
+        self.assertFalse(index.is_subscribed(CHANNEL_ID, "javerage"))
+        self.assertEquals(len(index), 0)
+
+        index.add(created)
+        index.add(self._subscription(
+            "1d4878da-bfd3-4a23-abfe-58979ca65e7f", CHANNEL_ID, "javerage",
+            None))
+        self.assertTrue(index.remove("1d4878da-bfd3-4a23-abfe-58979ca65e7f"))
+        self.assertEquals(len(index), 0)
+
+        created.endpoint = None
+        self.assertFalse(index.add(created))
+        created.endpoint = Endpoint(endpoint_id=CHANNEL_ID)
+        self.assertFalse(index.add(created))
+        self.assertEquals(len(index), 0)
+
+    def test_snapshot(self):
+        index = SubscriptionIndex()
+        index.load_search(NWS(), channel_id=CHANNEL_ID)
+        index.add(self._subscription(None, OTHER_CHANNEL_ID, "bill"))
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            index.save(path)
+            loaded = SubscriptionIndex.load(path)
+        finally:
+            os.remove(path)
+
+        self.assertEquals(len(loaded), 6)
+        self.assertTrue(loaded.is_subscribed(CHANNEL_ID, "javerage"))
+        self.assertTrue(loaded.is_subscribed(OTHER_CHANNEL_ID, "bill"))
+        loaded.remove("7a0a343a-6854-4ebe-adc6-c6807e922422")
+        self.assertEquals(len(loaded), 5)
+
+    def test_nws_is_subscribed(self):
+        index = SubscriptionIndex()
+        nws = NWS(actas_user="javerage", subscription_index=index)
+        with mock.patch("uw_nws.DAO.getURL") as mock_get:
+            self.assertFalse(nws.is_subscribed(CHANNEL_ID, "javerage"))
+            self.assertEquals(mock_get.call_count, 0)
+
+        self.assertTrue(NWS().is_subscribed(CHANNEL_ID, "javerage"))
+        self.assertRaises(
+            InvalidUUID, nws.is_subscribed, "abc", "javerage")
+
+        endpoint_id = "780f2a49-2118-4969-9bef-bbd38c26970a"
+        with mock.patch("uw_nws.DAO.getURL") as mock_get:
+            self.assertEquals(
+                nws.get_subscriptions_by_channel_id_and_subscriber_id(
+                    CHANNEL_ID, "javerage"), [])
+            self.assertRaises(
+                DataFailureException,
+                nws.get_subscription_by_channel_id_and_endpoint_id,
+                CHANNEL_ID, endpoint_id)
+            self.assertEquals(mock_get.call_count, 0)
+
+        index.add(self._subscription(
+            "c4597f93-0f62-4feb-ac88-af5f0329001e", CHANNEL_ID, "javerage",
+            endpoint_id=endpoint_id))
+        self.assertEquals(len(
+            nws.get_subscriptions_by_channel_id_and_subscriber_id(
+                CHANNEL_ID, "javerage")), 5)
+        self.assertEquals(
+            nws.get_subscription_by_channel_id_and_endpoint_id(
+                CHANNEL_ID, endpoint_id).endpoint.endpoint_id, endpoint_id)
+        index.clear()
+
+        subscription = self._subscription(
+            "c4597f93-0f62-4feb-ac88-af5f0329001f", CHANNEL_ID, "bill")
+        with mock.patch("uw_nws.DAO.postURL") as mock_post, \
+                mock.patch("uw_nws.DAO.deleteURL") as mock_delete:
+            mock_post.return_value = mock.Mock(status=201, data="")
+            mock_delete.return_value = mock.Mock(status=204, data="")
+
+            nws.create_subscription(subscription)
+            self.assertTrue(nws.is_subscribed(CHANNEL_ID, "bill"))
+
+            nws.delete_subscription(subscription.subscription_id)
+            self.assertFalse(nws.is_subscribed(CHANNEL_ID, "bill"))
+
+            subscription.endpoint = None
+            self.assertEquals(nws.create_subscription(subscription), 201)
+            subscription.endpoint = self._subscription(
+                None, CHANNEL_ID, "bill").endpoint
+
+            mock_delete.return_value = mock.Mock(status=500, data="")
+            nws.create_subscriptions([subscription])
+            nws.delete_subscriptions([subscription.subscription_id])
+            self.assertTrue(nws.is_subscribed(CHANNEL_ID, "bill"))
+
+
+@fdao_nws_override
+class NWSTestChannelIndex(TestCase):
+    def setUp(self):
+        self.channels = []
+        self.requests = []
+
+    def _channel(self, channel_id, sln, last_modified="2013-01-01 00:00:00",
+                 expires="2099-06-15T00:00:00+00:00"):
+        return {
+            "ChannelID": channel_id,
+            "ChannelURI": "/notification/v1/channel/{}".format(channel_id),
+            "SurrogateID": "2013,spring,cse,142,a",
+            "Type": "uw_student_courseavailable",
+            "Name": "COMPUTER PRGRMNG I",
+            "LastModified": last_modified,
+            "Expires": expires,
+            "Tags": {"sln": sln, "year": "2013", "quarter": "spring"},
+        }
+
+    def _get_url(self, url, headers):
+        """
+        Serves a page of self.channels, with an ETag of its content
+        """
+        params = dict(parse_qsl(urlparse(url).query))
+        first_result = int(params["first_result"])
+        page = self.channels[first_result - 1:(
+            first_result - 1 + int(params["max_results"]))]
+        data = json.dumps({"Channels": page,
+                           "TotalCount": len(self.channels)})
+        etag = '"{}"'.format(hash(data))
+
+        response = MockHTTP()
+        response.headers = {"ETag": etag}
+        if headers.get("If-None-Match") == etag:
+            response.status = 304
+            response.data = ""
+        else:
+            response.status = 200
+            response.data = data
+        self.requests.append(response.status)
+        return response
+
+    def test_refresh(self):
+        index = ChannelIndex("uw_student_courseavailable", 2013, "Spring",
+                             page_size=2)
+        self.assertTrue(index.covers("uw_student_courseavailable",
+                                     "2013", "spring"))
+        self.assertFalse(index.covers("uw_student_courseavailable",
+                                      2013, "summer"))
+
+        nws = NWS()
+        self.channels = [self._channel(CHANNEL_ID, "12345"),
+                         self._channel(OTHER_CHANNEL_ID, "12346"),
+                         self._channel(THIRD_CHANNEL_ID, "12348")]
+        with mock.patch("uw_nws.DAO.getURL") as mock_get:
+            mock_get.side_effect = self._get_url
+            self.assertEquals(index.refresh(nws), 3)
+            self.assertEquals(self.requests, [200, 200])
+            url = mock_get.call_args_list[0][0][0]
+            self.assertIn("type=uw_student_courseavailable", url)
+            self.assertIn("tag_year=2013", url)
+            self.assertIn("tag_quarter=spring", url)
+            self.assertIn("expires_after=", url)
+
+            self.assertEquals(len(index), 3)
+            self.assertEquals(index.get_slns(),
+                              set(["12345", "12346", "12348"]))
+            channels = index.get_channels_by_sln(12345)
+            self.assertEquals(len(channels), 1)
+            self.assertIsInstance(channels[0], Channel)
+            self.assertEquals(channels[0].channel_id, CHANNEL_ID)
+            self.assertEquals(index.get_channels_by_sln("99999"), [])
+
+            # Unchanged pages are not downloaded again
+            self.requests = []
+            self.assertEquals(index.refresh(nws), 0)
+            self.assertEquals(self.requests, [304, 304])
+            self.assertEquals(len(index), 3)
+
+            self.channels[1] = self._channel(
+                OTHER_CHANNEL_ID, "12347", last_modified="2013-02-01 00:00:00")
+            self.requests = []
+            self.assertEquals(index.refresh(nws), 1)
+            self.assertEquals(self.requests, [200, 304])
+            self.assertEquals(index.get_slns(),
+                              set(["12345", "12347", "12348"]))
+
+            del self.channels[0]
+            self.requests = []
+            self.assertEquals(index.refresh(nws), 1)
+            self.assertEquals(self.requests, [200])
+            self.assertEquals(index.get_channels_by_sln("12345"), [])
+            self.assertEquals(len(index), 2)
+
+        index._add(self._channel(
+            CHANNEL_ID, "12345", expires="2013-06-15T00:00:00+00:00"))
+        self.assertEquals(len(index), 3)
+        self.assertEquals(index.get_channels_by_sln("12345"), [])
+
+        index.clear()
+        self.assertEquals(len(index), 0)
+        self.assertTrue(index.is_stale())
+
+    def test_is_stale(self):
+        index = ChannelIndex("uw_student_courseavailable", 2013, "spring",
+                             max_age=60)
+        self.assertTrue(index.is_stale())
+        with mock.patch("uw_nws.index.time.time") as mock_time:
+            mock_time.return_value = 1000
+            index.refreshed = 1000
+            self.assertFalse(index.is_stale())
+            mock_time.return_value = 1060
+            self.assertTrue(index.is_stale())
+
+        index.max_age = None
+        self.assertFalse(index.is_stale())
+
+    def test_nws_get_active_channels_by_sln_year_quarter(self):
+        index = ChannelIndex("uw_student_courseavailable", 2013, "spring")
+        nws = NWS(channel_index=index)
+        self.channels = [self._channel(CHANNEL_ID, "12345"),
+                         self._channel(OTHER_CHANNEL_ID, "12345",
+                                       expires="2013-06-15T00:00:00+00:00")]
+        with mock.patch("uw_nws.DAO.getURL") as mock_get:
+            mock_get.side_effect = self._get_url
+            for i in range(3):
+                channels = nws.get_active_channels_by_sln_year_quarter(
+                    "uw_student_courseavailable", "12345", 2013, "spring")
+                self.assertEquals(len(channels), 1)
+                self.assertIsInstance(channels[0], Channel)
+                self.assertEquals(channels[0].channel_id, CHANNEL_ID)
+            self.assertEquals(nws.get_active_channels_by_sln_year_quarter(
+                "uw_student_courseavailable", "12346", 2013, "spring"), [])
+            self.assertEquals(mock_get.call_count, 1)
+
+        with mock.patch.object(nws, "search_channels") as search_channels:
+            search_channels.return_value = []
+            nws.get_active_channels_by_sln_year_quarter(
+                "uw_student_courseavailable", "12345", 2012, "autumn")
+            search_channels.assert_called_once_with(
+                type="uw_student_courseavailable", tag_sln="12345",
+                tag_year=2012, tag_quarter="autumn",
+                expires_after=mock.ANY)
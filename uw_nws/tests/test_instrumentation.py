@@ -0,0 +1,107 @@
+from unittest import TestCase
+from uw_nws import NWS
+from uw_nws.instrumentation import (
+    CallMetrics, register_callback, unregister_callback)
+from uw_nws.utilities import fdao_nws_override
+from uw_nws.exceptions import InvalidUUID
+from restclients_core.exceptions import DataFailureException
+
+
+@fdao_nws_override
+class NWSTestInstrumentation(TestCase):
+    def setUp(self):
+        self.calls = []
+        register_callback(self.calls.append)
+
+    def tearDown(self):
+        unregister_callback(self.calls.append)
+
+    def test_call_metrics(self):
+        NWS().get_channel_by_channel_id(
+            "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+
+        self.assertEquals(len(self.calls), 1)
+        call = self.calls[0]
+        self.assertEquals(call.method, "get_channel_by_channel_id")
+        self.assertEquals(
+            call.url_template, "/notification/v1/channel/{channel_id}")
+        self.assertEquals(call.status, 200)
+        self.assertEquals(call.requests, 1)
+        self.assertTrue(call.bytes_received > 0)
+        self.assertTrue(call.decode_time > 0)
+        self.assertTrue(call.total_time >= (
+            call.request_time + call.decode_time))
+        self.assertAlmostEqual(call.total_time, (
+            call.request_time + call.decode_time + call.build_time))
+        self.assertIsNone(call.exception)
+        self.assertIn("status:200", str(call))
+
+    def test_failures(self):
+        nws = NWS()
+        self.assertRaises(
+            DataFailureException, nws.get_channel_by_channel_id,
+            "00000000-d6f6-4afb-8165-8dbe6232119f")
+        self.assertRaises(InvalidUUID, nws.get_channel_by_channel_id, "abc")
+
+        self.assertEquals(len(self.calls), 2)
+        self.assertEquals(self.calls[0].status, 404)
+        self.assertIsInstance(
+            self.calls[0].exception, DataFailureException)
+        self.assertEquals(self.calls[1].requests, 0)
+        self.assertIsInstance(self.calls[1].exception, InvalidUUID)
+
+    def test_bulk_calls(self):
+        NWS().get_people([
+            "9136CCB8F66711D5BE060004AC494FFE", "javerage@washington.edu",
+            "ABC6CCB8F66711D5BE060004AC494FFE"], max_in_flight=3)
+
+        self.assertEquals(len(self.calls), 1)
+        call = self.calls[0]
+        self.assertEquals(call.method, "get_people")
+        self.assertEquals(call.requests, 3)
+        self.assertIn(call.status, (200, 404))
+        self.assertTrue(call.bytes_received > 0)
+        self.assertTrue(call.request_time > 0)
+
+    def test_nested_calls(self):
+        NWS().get_subscriptions_by_channel_id(
+            "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+
+        self.assertEquals(len(self.calls), 1)
+        self.assertEquals(
+            self.calls[0].method, "get_subscriptions_by_channel_id")
+        self.assertEquals(self.calls[0].requests, 1)
+        self.assertTrue(self.calls[0].decode_time > 0)
+
+    def test_generator(self):
+        subscriptions = NWS().iter_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f", max_results=2)
+        next(subscriptions)
+        self.assertEquals(self.calls, [])
+
+        self.assertEquals(len(list(subscriptions)), 4)
+        self.assertEquals(len(self.calls), 1)
+        self.assertEquals(self.calls[0].method, "iter_subscriptions")
+        self.assertEquals(self.calls[0].requests, 3)
+
+    def test_callback_errors(self):
+        def callback(call):
+            raise Exception("callback error")
+
+        register_callback(callback)
+        try:
+            with self.assertLogs("uw_nws.instrumentation", level="ERROR"):
+                NWS().get_channel_by_channel_id(
+                    "b779df7b-d6f6-4afb-8165-8dbe6232119f")
+        finally:
+            unregister_callback(callback)
+        self.assertEquals(len(self.calls), 1)
+
+    def test_build_time(self):
+        call = CallMetrics("search_channels", "/channel?{query}")
+        call.total_time = 1.0
+        call.request_time = 0.5
+        call.decode_time = 0.25
+        self.assertEquals(call.build_time, 0.25)
+        call.decode_time = 0.75
+        self.assertEquals(call.build_time, 0.0)
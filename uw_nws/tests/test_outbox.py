@@ -0,0 +1,182 @@
+from unittest import TestCase
+from uw_nws import NWS
+from uw_nws.models import Dispatch
+from uw_nws.outbox import DispatchOutbox
+from uw_nws.instrumentation import prometheus_outbox_depth
+from uw_nws.utilities import fdao_nws_override
+from uw_nws.exceptions import InvalidUUID
+from restclients_core.exceptions import DataFailureException
+import threading
+import tempfile
+import shutil
+import json
+import time
+import mock
+import os
+
+
+@fdao_nws_override
+class NWSTestDispatchOutbox(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.outbox = DispatchOutbox(
+            os.path.join(self.path, "outbox.db"), max_attempts=2, backoff=0)
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.path)
+
+    def _dispatch(self, i):
+        dispatch = Dispatch()
+        dispatch.dispatch_id = "8b77b7b8-604e-4854-9c8d-872214fe8ae{}".format(
+            i)
+        dispatch.message = {"Body": "Seat available"}
+        return dispatch
+
+    def test_enqueue(self):
+        nws = NWS(actas_user="javerage", dispatch_outbox=self.outbox)
+        with mock.patch("uw_nws.DAO.postURL") as mock_post:
+            for i in range(3):
+                self.assertEqual(
+                    nws.create_new_dispatch(self._dispatch(i)), 202)
+            nws.create_new_dispatch(self._dispatch(0))
+            self.assertEqual(mock_post.call_count, 0)
+        self.assertEqual(self.outbox.depth(), 3)
+        self.assertGreaterEqual(self.outbox.oldest_age(), 0)
+
+        invalid = self._dispatch(0)
+        invalid.dispatch_id = "123"
+        self.assertRaises(InvalidUUID, nws.create_new_dispatch, invalid)
+
+        reopened = DispatchOutbox(os.path.join(self.path, "outbox.db"))
+        self.assertEqual(reopened.depth(), 3)
+        reopened.close()
+
+    def test_drain(self):
+        nws = NWS(actas_user="javerage", dispatch_outbox=self.outbox)
+        for i in range(3):
+            nws.create_new_dispatch(self._dispatch(i))
+        NWS(dispatch_outbox=self.outbox).create_new_dispatch(
+            self._dispatch(3))
+
+        with mock.patch("uw_nws.DAO.postURL") as mock_post:
+            mock_post.return_value = mock.Mock(status=200, data="")
+            self.assertEqual(self.outbox.drain(), 4)
+            self.assertEqual(mock_post.call_count, 4)
+            body = json.loads(mock_post.call_args_list[0][0][2])
+            self.assertEqual(body["Dispatch"]["Message"]["Body"],
+                             "Seat available")
+            actas_users = sorted(
+                str(args[0][1].get("X_UW_ACT_AS"))
+                for args in mock_post.call_args_list)
+            self.assertEqual(actas_users, ["None"] + ["javerage"] * 3)
+
+        self.assertEqual(self.outbox.depth(), 0)
+        self.assertEqual(self.outbox.oldest_age(), 0)
+        self.assertEqual(prometheus_outbox_depth._value.get(), 0)
+        self.assertEqual(self.outbox.drain(), 0)
+
+    def test_retry(self):
+        self.outbox.enqueue("8b77b7b8-604e-4854-9c8d-872214fe8ae0", b"{}")
+        self.outbox.enqueue("8b77b7b8-604e-4854-9c8d-872214fe8ae1", b"{}")
+
+        with mock.patch("uw_nws.NWS._post_dispatch_body") as mock_post, \
+                self.assertLogs("uw_nws.outbox", level="ERROR"):
+            mock_post.side_effect = DataFailureException("/", 503, "")
+            self.assertEqual(self.outbox.drain(), 0)
+            self.assertEqual(self.outbox.depth(), 2)
+            self.assertEqual(self.outbox.drain(), 0)
+            self.assertEqual(mock_post.call_count, 4)
+
+        self.assertEqual(self.outbox.depth(), 0)
+        self.assertEqual(self.outbox.get_failed(), [
+            ("8b77b7b8-604e-4854-9c8d-872214fe8ae0", 2, 503),
+            ("8b77b7b8-604e-4854-9c8d-872214fe8ae1", 2, 503)])
+
+    def test_no_retry(self):
+        self.outbox.enqueue("8b77b7b8-604e-4854-9c8d-872214fe8ae0", b"{}")
+        with mock.patch("uw_nws.NWS._post_dispatch_body") as mock_post, \
+                self.assertLogs("uw_nws.outbox", level="ERROR"):
+            mock_post.side_effect = DataFailureException("/", 400, "")
+            self.outbox.drain()
+        self.assertEqual(self.outbox.get_failed(), [
+            ("8b77b7b8-604e-4854-9c8d-872214fe8ae0", 1, 400)])
+
+    def test_shared_outbox(self):
+        other = DispatchOutbox(os.path.join(self.path, "outbox.db"))
+        for i in range(3):
+            self.outbox.enqueue(self._dispatch(i).dispatch_id, b"{}")
+
+        others = []
+
+        def post(body):
+            others.append(other.drain())
+            return 200
+
+        with mock.patch("uw_nws.NWS._post_dispatch_body",
+                        side_effect=post) as mock_post:
+            self.assertEqual(self.outbox.drain(), 3)
+            self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(others, [0, 0, 0])
+        self.assertEqual(other.depth(), 0)
+        other.close()
+
+    def test_expired_claim(self):
+        self.outbox.enqueue("8b77b7b8-604e-4854-9c8d-872214fe8ae0", b"{}")
+        claim, rows = self.outbox._claim()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(self.outbox.depth(), 1)
+
+        with mock.patch("uw_nws.NWS._post_dispatch_body") as mock_post:
+            mock_post.return_value = 200
+            self.assertEqual(self.outbox.drain(), 0)
+            with mock.patch("uw_nws.outbox.time.time",
+                            return_value=time.time() + 301):
+                self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual(self.outbox.depth(), 0)
+
+    def test_unexpected_errors(self):
+        for i in range(3):
+            self.outbox.enqueue(self._dispatch(i).dispatch_id, str(i))
+
+        def post(body):
+            if body == "1":
+                raise ConnectionError("connection reset")
+            return 200
+
+        with mock.patch("uw_nws.NWS._post_dispatch_body", side_effect=post):
+            self.assertEqual(self.outbox.drain(), 2)
+        self.assertEqual(self.outbox.depth(), 1)
+        self.assertEqual(self.outbox.get_failed(), [])
+
+    def test_enqueue_while_sending(self):
+        dispatch_id = "8b77b7b8-604e-4854-9c8d-872214fe8ae0"
+        self.outbox.enqueue(dispatch_id, b"1")
+        bodies = []
+
+        def post(body):
+            bodies.append(body)
+            if body == b"1":
+                self.outbox.enqueue(dispatch_id, b"2")
+            return 200
+
+        with mock.patch("uw_nws.NWS._post_dispatch_body", side_effect=post):
+            self.assertEqual(self.outbox.drain(), 1)
+            self.assertEqual(self.outbox.depth(), 1)
+            self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual(bodies, [b"1", b"2"])
+        self.assertEqual(self.outbox.depth(), 0)
+
+    def test_background_drainer(self):
+        sent = threading.Event()
+
+        def post(body):
+            sent.set()
+            return 200
+
+        self.outbox.enqueue("8b77b7b8-604e-4854-9c8d-872214fe8ae0", b"{}")
+        with mock.patch("uw_nws.NWS._post_dispatch_body", side_effect=post):
+            self.outbox.start()
+            self.assertTrue(sent.wait(5))
+            self.outbox.stop()
+        self.assertEqual(self.outbox.depth(), 0)
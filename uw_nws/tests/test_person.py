@@ -1,9 +1,14 @@
 from unittest import TestCase
-from uw_nws import NWS
+from uw_nws import NWS, DAO
 from uw_nws.models import Person
 from uw_nws.utilities import fdao_nws_override
 from restclients_core.exceptions import (
     DataFailureException, InvalidNetID, InvalidRegID)
+from restclients_core.models import MockHTTP
+from commonconf import override_settings
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import mock
 
 
 @fdao_nws_override
@@ -69,3 +74,161 @@ class NWSTestPerson(TestCase):
         person = nws.get_person_by_surrogate_id("javerage@washington.edu")
         person.surrogate_id = ""
         self.assertRaises(InvalidNetID, nws.update_person, person)
+
+    def test_get_people(self):
+        nws = NWS()
+        people = nws.get_people([
+            "9136CCB8F66711D5BE060004AC494FFE", "javerage@washington.edu",
+            "ABC6CCB8F66711D5BE060004AC494FFE",
+            "9136CCB8F66711D5BE060004AC494FFE"], max_in_flight=2)
+
+        self.assertEquals(len(people), 3)
+        self._assert_person_matches(
+            people["9136CCB8F66711D5BE060004AC494FFE"].value)
+        self._assert_person_matches(people["javerage@washington.edu"].value)
+        self.assertTrue(people["javerage@washington.edu"].is_success())
+
+        result = people["ABC6CCB8F66711D5BE060004AC494FFE"]
+        self.assertFalse(result.is_success())
+        self.assertEquals(result.exception.status, 404)
+
+        # The javerage resource has no PersonURI
+        people = nws.get_people(["9136CCB8F66711D5BE060004AC494FFE",
+                                 "javerage"])
+        self.assertTrue(
+            people["9136CCB8F66711D5BE060004AC494FFE"].is_success())
+        self.assertFalse(people["javerage"].is_success())
+        self.assertIsInstance(people["javerage"].exception, KeyError)
+
+        self.assertRaises(
+            InvalidNetID, nws.get_people, ["javerage", "00ok"])
+        self.assertEquals(nws.get_people([]), {})
+
+    def test_coalesced_requests(self):
+        release = threading.Event()
+        get_url = DAO.getURL
+
+        def slow_get_url(*args, **kwargs):
+            release.wait(5)
+            return get_url(*args, **kwargs)
+
+        class PendingRequests(dict):
+            lookups = 0
+
+            def get(self, key):
+                self.lookups += 1
+                return super(PendingRequests, self).get(key)
+
+        nws = NWS()
+        with mock.patch.object(
+                DAO, "getURL", side_effect=slow_get_url) as mock_get, \
+                mock.patch.object(
+                    NWS, "_pending_requests", PendingRequests()) as pending:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(
+                    nws.get_person_by_uwregid,
+                    "9136CCB8F66711D5BE060004AC494FFE") for i in range(4)]
+                while pending.lookups < 4:
+                    release.wait(0.01)
+                release.set()
+                people = [future.result() for future in futures]
+
+            self.assertEquals(mock_get.call_count, 1)
+            self.assertEquals(len(set(id(person) for person in people)), 4)
+            for person in people:
+                self._assert_person_matches(person)
+
+            nws.get_person_by_uwregid("9136CCB8F66711D5BE060004AC494FFE")
+            self.assertEquals(mock_get.call_count, 2)
+            self.assertEquals(pending, {})
+
+    def test_coalesced_failure(self):
+        release = threading.Event()
+        get_url = DAO.getURL
+
+        def slow_get_url(*args, **kwargs):
+            release.wait(5)
+            return get_url(*args, **kwargs)
+
+        class PendingRequests(dict):
+            lookups = 0
+
+            def get(self, key):
+                self.lookups += 1
+                return super(PendingRequests, self).get(key)
+
+        def get_exception(regid):
+            try:
+                nws.get_person_by_uwregid(regid)
+            except DataFailureException as ex:
+                return ex
+
+        nws = NWS()
+        with mock.patch.object(
+                DAO, "getURL", side_effect=slow_get_url) as mock_get, \
+                mock.patch.object(
+                    NWS, "_pending_requests", PendingRequests()) as pending:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(
+                    get_exception, "0000CCB8F66711D5BE060004AC494FFE")
+                    for i in range(4)]
+                while pending.lookups < 4:
+                    release.wait(0.01)
+                release.set()
+                exceptions = [future.result() for future in futures]
+
+            self.assertEquals(mock_get.call_count, 1)
+            self.assertEquals(len(set(id(ex) for ex in exceptions)), 4)
+            for ex in exceptions:
+                self.assertEquals(ex.status, 404)
+
+    def test_conditional_get(self):
+        get_url = DAO.getURL
+        last_modified = "Tue, 05 Mar 2013 01:09:31 GMT"
+
+        def conditional_get_url(url, headers):
+            if headers.get("If-None-Match") == '"v1"':
+                response = MockHTTP()
+                response.status = 304
+                return response
+            response = get_url(url, headers)
+            response.headers = {"etag": '"v1"', "Last-Modified": last_modified}
+            return response
+
+        regid = "9136CCB8F66711D5BE060004AC494FFE"
+        nws = NWS()
+        with mock.patch.object(NWS, "_validator_cache", None), \
+                mock.patch.object(
+                    DAO, "getURL", side_effect=conditional_get_url) as \
+                mock_get, mock.patch.object(
+                    NWS, "_json_loads", wraps=nws._json_loads) as json_loads:
+            person = nws.get_person_by_uwregid(regid)
+            person.attributes["AcceptedTermsOfUse"] = False
+            self.assertEquals(json_loads.call_count, 1)
+
+            person = nws.get_person_by_uwregid(regid)
+            self._assert_person_matches(person)
+            self.assertEquals(json_loads.call_count, 1)
+            headers = mock_get.call_args[0][1]
+            self.assertEquals(headers["If-None-Match"], '"v1"')
+            self.assertEquals(headers["If-Modified-Since"], last_modified)
+
+            self.assertRaises(
+                DataFailureException, NWS(actas_user="javerage").update_person,
+                person)
+            self.assertIsNone(NWS.get_validator_cache().get(
+                "/notification/v1/person/{}".format(regid)))
+
+            nws.get_person_by_uwregid(regid)
+            self.assertNotIn("If-None-Match", mock_get.call_args[0][1])
+            self.assertEquals(json_loads.call_count, 2)
+
+    def test_conditional_get_disabled(self):
+        with mock.patch.object(NWS, "_validator_cache", None), \
+                override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                                  RESTCLIENTS_NWS_VALIDATOR_CACHE_SIZE=0):
+            self.assertIsNone(NWS.get_validator_cache())
+            person = NWS().get_person_by_uwregid(
+                "9136CCB8F66711D5BE060004AC494FFE")
+            self._assert_person_matches(person)
+            self.assertIsNone(NWS._validator_cache)
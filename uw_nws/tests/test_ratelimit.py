@@ -0,0 +1,137 @@
+from unittest import TestCase, skipIf
+from uw_nws import NWS, DAO
+from uw_nws.dao import NWS_DAO
+from uw_nws.breaker import CircuitBreaker
+from uw_nws.models import Dispatch
+from uw_nws.exceptions import RateLimitException
+from uw_nws.ratelimit import (
+    TokenBucket, FileTokenBucket, get_rate_limiter, fcntl)
+from uw_nws import ratelimit
+from commonconf import override_settings
+from restclients_core.models import MockHTTP
+import tempfile
+import shutil
+import mock
+import os
+
+
+def mock_response(status):
+    response = MockHTTP()
+    response.status = status
+    response.headers = {}
+    return response
+
+
+class NWSTestTokenBucket(TestCase):
+    def test_acquire(self):
+        with mock.patch("uw_nws.ratelimit.time.monotonic") as mock_time, \
+                mock.patch("uw_nws.ratelimit.time.sleep") as mock_sleep:
+            mock_time.return_value = 100
+            bucket = TokenBucket(2, 3)
+            for i in range(3):
+                self.assertTrue(bucket.acquire())
+            self.assertEqual(mock_sleep.call_count, 0)
+
+            self.assertFalse(bucket.acquire(timeout=0.1))
+            self.assertEqual(bucket._take(), 0.5)
+
+            mock_sleep.side_effect = lambda wait: setattr(
+                mock_time, "return_value", mock_time.return_value + wait)
+            self.assertTrue(bucket.acquire())
+            mock_sleep.assert_called_once_with(0.5)
+
+            mock_time.return_value += 60
+            for i in range(3):
+                self.assertTrue(bucket.acquire(timeout=0))
+            self.assertFalse(bucket.acquire(timeout=0))
+
+
+@skipIf(fcntl is None, "fcntl is not available")
+class NWSTestFileTokenBucket(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_shared_state(self):
+        path = os.path.join(self.path, "nws_dispatch.bucket")
+        first = FileTokenBucket(path, 0.001, 3)
+        second = FileTokenBucket(path, 0.001, 3)
+        try:
+            self.assertTrue(first.acquire(timeout=0))
+            self.assertTrue(second.acquire(timeout=0))
+            self.assertTrue(first.acquire(timeout=0))
+            self.assertFalse(second.acquire(timeout=0))
+            self.assertFalse(first.acquire(timeout=0))
+        finally:
+            first.close()
+            second.close()
+
+
+@override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                   RESTCLIENTS_NWS_RATE_LIMITS={
+                       "dispatch": (0.001, 2), "subscription": 100},
+                   RESTCLIENTS_NWS_RATE_LIMIT_TIMEOUT=0,
+                   RESTCLIENTS_NWS_RETRY_MAX_ATTEMPTS=3)
+class NWSTestRateLimit(TestCase):
+    def setUp(self):
+        ratelimit._buckets.clear()
+
+    def tearDown(self):
+        ratelimit._buckets.clear()
+        CircuitBreaker.reset_all()
+
+    def test_get_rate_limiter(self):
+        bucket = get_rate_limiter(DAO, "dispatch")
+        self.assertIsInstance(bucket, TokenBucket)
+        self.assertIs(get_rate_limiter(DAO, "dispatch"), bucket)
+        self.assertEqual((bucket.rate, bucket.capacity), (0.001, 2))
+
+        bucket = get_rate_limiter(DAO, "subscription")
+        self.assertEqual((bucket.rate, bucket.capacity), (100, 100))
+        self.assertIsNone(get_rate_limiter(DAO, "verification"))
+
+    def test_dispatch_rate_limit(self):
+        dispatch = Dispatch()
+        dispatch.dispatch_id = "8b77b7b8-604e-4854-9c8d-872214fe8ae7"
+
+        nws = NWS(actas_user="javerage")
+        with mock.patch.object(NWS_DAO, "_load_timed_resource") as mock_load:
+            mock_load.return_value = mock_response(200)
+            results = nws.create_dispatches([dispatch] * 3)
+            self.assertEqual(mock_load.call_count, 2)
+            self.assertEqual(
+                [result.is_success() for result in results].count(True), 2)
+
+            self.assertRaises(
+                RateLimitException, nws.create_new_dispatch, dispatch)
+            self.assertEqual(mock_load.call_count, 2)
+
+    @mock.patch("uw_nws.dao.time.sleep")
+    def test_retry_rate_limit(self, mock_sleep):
+        dispatch = Dispatch()
+        dispatch.dispatch_id = "8b77b7b8-604e-4854-9c8d-872214fe8ae7"
+
+        nws = NWS(actas_user="javerage")
+        with mock.patch.object(NWS_DAO, "_load_timed_resource") as mock_load:
+            mock_load.return_value = mock_response(503)
+            self.assertRaises(
+                RateLimitException, nws.create_new_dispatch, dispatch)
+            self.assertEqual(mock_load.call_count, 2)
+
+    @skipIf(fcntl is None, "fcntl is not available")
+    def test_rate_limit_dir(self):
+        path = tempfile.mkdtemp()
+        try:
+            with override_settings(
+                    RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                    RESTCLIENTS_NWS_RATE_LIMITS={"dispatch": 1},
+                    RESTCLIENTS_NWS_RATE_LIMIT_DIR=path):
+                bucket = get_rate_limiter(DAO, "dispatch")
+                self.assertIsInstance(bucket, FileTokenBucket)
+                self.assertEqual(bucket.path, os.path.join(
+                    path, "nws_dispatch.bucket"))
+                bucket.close()
+        finally:
+            shutil.rmtree(path)
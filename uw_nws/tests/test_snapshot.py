@@ -0,0 +1,98 @@
+from unittest import TestCase
+from uw_nws import NWS, DAO
+from uw_nws.exceptions import InvalidSnapshot
+from uw_nws.index import SubscriptionIndex
+from uw_nws.models import Channel, Subscription, SubscriptionRecord
+from uw_nws.snapshot import Snapshot, export_snapshot, MAGIC
+from uw_nws.utilities import fdao_nws_override
+from commonconf import override_settings
+from restclients_core.exceptions import DataFailureException
+import tempfile
+import shutil
+import mock
+import os
+
+CHANNEL_ID = "b779df7b-d6f6-4afb-8165-8dbe6232119f"
+
+
+@fdao_nws_override
+class NWSTestSnapshot(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.path, "nws.snapshot")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _export(self):
+        return export_snapshot(
+            NWS(), self.snapshot_path,
+            channel_searches=[{
+                "type": "uw_student_courseavailable",
+                "surrogate_id": "2012,autumn,cse,100,w",
+                "max_results": 1}],
+            subscription_searches=[{"channel_id": CHANNEL_ID}])
+
+    def test_export_load(self):
+        self.assertEquals(
+            self._export(), {"channels": 2, "subscriptions": 5})
+        self.assertFalse(os.path.exists(self.snapshot_path + ".tmp"))
+
+        with Snapshot(self.snapshot_path) as snapshot:
+            self.assertEquals(snapshot.channel_count, 2)
+            self.assertEquals(snapshot.subscription_count, 5)
+
+            channels = list(snapshot.channels())
+            self.assertIsInstance(channels[0], Channel)
+            self.assertEquals(channels[0].channel_id, CHANNEL_ID)
+            self.assertEquals(
+                channels[1].channel_id, "9335df20-1a79-4c1b-ae42-66ddfa4c9b79")
+
+            subscriptions = list(snapshot.subscriptions())
+            self.assertIsInstance(subscriptions[0], Subscription)
+            self.assertEquals(
+                [s.subscription_id for s in subscriptions],
+                [s.subscription_id for s in NWS().search_subscriptions(
+                    channel_id=CHANNEL_ID)])
+
+            records = list(snapshot.subscriptions(records=True))
+            self.assertIsInstance(records[0], SubscriptionRecord)
+            index = SubscriptionIndex(records)
+            self.assertTrue(index.is_subscribed(CHANNEL_ID, "javerage"))
+
+    def test_export_failure(self):
+        self.assertRaises(
+            DataFailureException, export_snapshot, NWS(), self.snapshot_path,
+            channel_searches=[{"channel_id": "none"}])
+        self.assertFalse(os.path.exists(self.snapshot_path + ".tmp"))
+        self.assertFalse(os.path.exists(self.snapshot_path))
+
+    @override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                       RESTCLIENTS_NWS_LOOKUP_CACHE_TIMEOUT=60)
+    def test_warm_lookup_cache(self):
+        self._export()
+        with mock.patch.object(NWS, "_lookup_cache", None):
+            with Snapshot(self.snapshot_path) as snapshot:
+                self.assertEquals(snapshot.warm_lookup_cache(), 2)
+
+            with mock.patch.object(DAO, "getURL") as mock_get:
+                channel = NWS().get_channel_by_channel_id(CHANNEL_ID)
+                self.assertEquals(mock_get.call_count, 0)
+            self.assertEquals(channel.surrogate_id, "2012,autumn,cse,100,w")
+
+    def test_warm_lookup_cache_disabled(self):
+        self._export()
+        with Snapshot(self.snapshot_path) as snapshot:
+            self.assertEquals(snapshot.warm_lookup_cache(), 0)
+
+    def test_invalid_snapshot(self):
+        for data in (b"", b"{}", MAGIC + b"C\x00\x00", MAGIC + b"C\x00\x00"
+                     b"\x00\x10{}"):
+            with open(self.snapshot_path, "wb") as f:
+                f.write(data)
+            self.assertRaises(InvalidSnapshot, Snapshot, self.snapshot_path)
+
+        with open(self.snapshot_path, "wb") as f:
+            f.write(MAGIC)
+        with Snapshot(self.snapshot_path) as snapshot:
+            self.assertEquals(list(snapshot.channels()), [])
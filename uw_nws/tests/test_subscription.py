@@ -1,13 +1,30 @@
 from unittest import TestCase
 from uw_nws import NWS
-from uw_nws.models import Subscription, Endpoint, Channel
+from uw_nws.dao import NWS_DAO
+from uw_nws.breaker import CircuitBreaker
+from commonconf import override_settings
+from uw_nws.models import (
+    Subscription, Endpoint, Channel, LazySubscription, LazyEndpoint,
+    SubscriptionRecord, EndpointRecord, ChannelRecord)
 from uw_nws.utilities import fdao_nws_override
-from uw_nws.exceptions import InvalidUUID
+from uw_nws.exceptions import InvalidUUID, InvalidEndpointProtocol
 from restclients_core.exceptions import DataFailureException, InvalidNetID
+from restclients_core.models import MockHTTP
+import mock
+
+
+def mock_response(status):
+    response = MockHTTP()
+    response.status = status
+    response.headers = {}
+    return response
 
 
 @fdao_nws_override
 class NWSTestSubscription(TestCase):
+    def tearDown(self):
+        CircuitBreaker.reset_all()
+
     def _setup_subscription(self):
         subscription = Subscription()
         subscription.subscription_id = "c4597f93-0f62-4feb-ac88-af5f0329001f"
@@ -32,6 +49,112 @@ class NWSTestSubscription(TestCase):
             "b779df7b-d6f6-4afb-8165-8dbe6232119f")
         self.assertEquals(len(subscriptions), 5)
 
+    def test_lazy_subscriptions(self):
+        nws = NWS()
+        subscriptions = nws.search_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f")
+        lazy_subscriptions = nws.search_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f", lazy=True)
+        self.assertEquals(len(lazy_subscriptions), 5)
+
+        subscription = lazy_subscriptions[0]
+        self.assertIsInstance(subscription, LazySubscription)
+        self.assertIsInstance(subscription, Subscription)
+        self.assertEquals(subscription.__dict__.get("created"), None)
+        self.assertEquals(subscription.subscription_id,
+                          "1d4878da-bfd3-4a23-abfe-58979ca65e7f")
+        self.assertIsInstance(subscription.endpoint, LazyEndpoint)
+        self.assertEquals(
+            subscription.endpoint.endpoint_address, "222-222-3333")
+        self.assertFalse(subscription.endpoint.is_verified())
+        self.assertEquals(subscription.endpoint.__dict__.get("created"), None)
+        self.assertEquals(subscription.channel.tags, {})
+
+        for eager, lazy in zip(subscriptions, lazy_subscriptions):
+            self.assertEquals(eager.json_data(), lazy.json_data())
+
+        subscription.endpoint.protocol = "Email"
+        subscription.channel = None
+        data = subscription.json_data()["Subscription"]
+        self.assertEquals(data["Endpoint"]["Protocol"], "Email")
+        self.assertEquals(data["Channel"], None)
+
+        subscription = Subscription.from_json({
+            "SubscriptionID": "1d4878da-bfd3-4a23-abfe-58979ca65e7f"},
+            lazy=True)
+        self.assertEquals(subscription.endpoint, None)
+        self.assertEquals(subscription.created, None)
+
+    def test_subscription_records(self):
+        nws = NWS()
+        subscriptions = nws.search_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f")
+        records = nws.search_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f", records=True)
+        self.assertEquals(len(records), 5)
+
+        record = records[0]
+        self.assertIsInstance(record, SubscriptionRecord)
+        self.assertIsInstance(record.endpoint, EndpointRecord)
+        self.assertIsInstance(record.channel, ChannelRecord)
+        self.assertEquals(record.subscription_id,
+                          "1d4878da-bfd3-4a23-abfe-58979ca65e7f")
+        self.assertEquals(record.endpoint.endpoint_address, "222-222-3333")
+        self.assertEquals(record.endpoint.get_user_net_id(), "javerage")
+        self.assertFalse(record.endpoint.is_verified())
+        self.assertEquals(record.created, subscriptions[0].created)
+        self.assertRaises(AttributeError, setattr, record, "created", None)
+        self.assertFalse(hasattr(record, "__dict__"))
+
+        for subscription, record in zip(subscriptions, records):
+            self.assertEquals(subscription.json_data(), record.json_data())
+
+        records = list(nws.iter_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f", max_results=2,
+            records=True))
+        self.assertEquals(len(records), 5)
+        self.assertIsInstance(records[4], SubscriptionRecord)
+
+    def test_iter_subscriptions(self):
+        nws = NWS()
+        subscriptions = nws.iter_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f", max_results=2)
+        self.assertFalse(isinstance(subscriptions, list))
+
+        subscriptions = list(subscriptions)
+        self.assertEquals(len(subscriptions), 5)
+        self.assertEquals(len(set(
+            s.subscription_id for s in subscriptions)), 5)
+        self.assertEquals(subscriptions[4].subscription_id,
+                          "7a0a343a-6854-4ebe-adc6-c6807e922422")
+
+        subscriptions = list(nws.iter_subscriptions(
+            channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f", max_results=2,
+            lazy=True))
+        self.assertEquals(len(subscriptions), 5)
+        self.assertIsInstance(subscriptions[0], LazySubscription)
+
+        self.assertRaises(
+            DataFailureException, list, nws.iter_subscriptions(
+                channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f",
+                max_results=3))
+
+    def test_iter_subscriptions_capped_page_size(self):
+        nws = NWS()
+        search = nws._search
+        pages = []
+
+        def capped_search(resource, kwargs):
+            # Return pages of 2, as if the server capped max_results
+            pages.append(kwargs["first_result"])
+            return search(resource, dict(kwargs, max_results=2))
+
+        with mock.patch.object(nws, "_search", side_effect=capped_search):
+            subscriptions = list(nws.iter_subscriptions(
+                channel_id="b779df7b-d6f6-4afb-8165-8dbe6232119f"))
+        self.assertEquals(len(subscriptions), 5)
+        self.assertEquals(pages, [1, 3, 5])
+
     def test_subscriptions_channel_id_and_endpoint_id(self):
         nws = NWS()
         subscription = nws.get_subscription_by_channel_id_and_endpoint_id(
@@ -81,6 +204,68 @@ class NWSTestSubscription(TestCase):
         self.assertRaises(
             InvalidUUID, nws.create_subscription, subscription)
 
+    @override_settings(RESTCLIENTS_NWS_DAO_CLASS="Mock",
+                       RESTCLIENTS_NWS_RETRY_MAX_ATTEMPTS=3)
+    @mock.patch("uw_nws.dao.time.sleep")
+    def test_create_subscriptions(self, mock_sleep):
+        subscriptions = []
+        for i in range(5):
+            subscription = self._setup_subscription()
+            subscription.subscription_id = (
+                "c4597f93-0f62-4feb-ac88-af5f0329001{}".format(i))
+            subscriptions.append(subscription)
+
+        nws = NWS(actas_user="javerage")
+        report = nws.create_subscriptions(subscriptions, max_in_flight=2)
+        self.assertEquals(len(report), 5)
+        self.assertFalse(report.is_success())
+        self.assertEquals(len(report.failed), 5)
+        self.assertEquals(report[0].item, subscriptions[0])
+
+        responses = {}
+
+        def load_resource(method, url, headers, body):
+            attempt = responses.setdefault(body, 0) + 1
+            responses[body] = attempt
+            return mock_response(503 if attempt < 3 else 201)
+
+        with mock.patch.object(NWS_DAO, "_load_timed_resource",
+                               side_effect=load_resource):
+            report = nws.create_subscriptions(iter(subscriptions))
+            self.assertTrue(report.is_success())
+            self.assertEquals(report.status_counts(), {201: 5})
+            self.assertEquals(
+                [result.item for result in report], subscriptions)
+            self.assertEquals(sorted(responses.values()), [3] * 5)
+
+        with mock.patch.object(NWS_DAO, "_load_timed_resource") as mock_load:
+            mock_load.return_value = mock_response(429)
+            report = nws.create_subscriptions(subscriptions[:1])
+            self.assertEquals(mock_load.call_count, 3)
+            self.assertEquals(report.status_counts(), {429: 1})
+            self.assertEquals(str(report).split(" in ")[0],
+                              "0 succeeded, 1 failed")
+
+        # The subscription may have been created, so a 502 is not retried
+        with mock.patch.object(NWS_DAO, "_load_timed_resource") as mock_load:
+            mock_load.return_value = mock_response(502)
+            report = nws.create_subscriptions(subscriptions[:1])
+            self.assertEquals(mock_load.call_count, 1)
+            self.assertEquals(report.status_counts(), {502: 1})
+
+        self.assertEquals(len(nws.create_subscriptions([])), 0)
+
+    def test_create_invalid_subscriptions(self):
+        invalid = self._setup_subscription()
+        invalid.channel.channel_id = None
+
+        nws = NWS()
+        with mock.patch("uw_nws.DAO.postURL") as mock_post:
+            self.assertRaises(
+                InvalidUUID, nws.create_subscriptions,
+                [self._setup_subscription(), invalid])
+            self.assertEquals(mock_post.call_count, 0)
+
     def test_create_invalid_subscriber_id_subscription(self):
         subscription = self._setup_subscription()
         subscription.endpoint.subscriber_id = "-@#$ksjdsfkli13290243290490"
@@ -103,6 +288,80 @@ class NWSTestSubscription(TestCase):
             DataFailureException, nws.delete_subscription,
             "652236c6-a85a-4845-8dc5-3e518bec044c")
 
+    def test_delete_subscriptions(self):
+        subscription_ids = [
+            "652236c6-a85a-4845-8dc5-3e518bec044c",
+            "652236c6-a85a-4845-8dc5-3e518bec044d"]
+
+        nws = NWS(actas_user="javerage")
+        with mock.patch("uw_nws.DAO.deleteURL") as mock_delete:
+            mock_delete.return_value = mock.Mock(status=404, data="")
+            report = nws.delete_subscriptions(subscription_ids)
+            self.assertEquals(mock_delete.call_count, 2)
+            self.assertEquals(report.status_counts(), {404: 2})
+
+            mock_delete.return_value = mock.Mock(status=204, data="")
+            report = nws.delete_subscriptions(subscription_ids)
+            self.assertTrue(report.is_success())
+            self.assertEquals(report[1].item, subscription_ids[1])
+
+            self.assertRaises(
+                InvalidUUID, nws.delete_subscriptions, ["abc"])
+            self.assertEquals(mock_delete.call_count, 4)
+
+    def test_reconcile_channel(self):
+        channel_id = "b779df7b-d6f6-4afb-8165-8dbe6232119f"
+        nws = NWS(actas_user="javerage")
+
+        plan = nws.reconcile_channel(
+            channel_id, ["javerage@washington.edu", "bill"], dry_run=True)
+        self.assertEquals(plan.channel_id, channel_id)
+        self.assertEquals(plan.unchanged, 1)
+        self.assertEquals(plan.deletes, [])
+        self.assertEquals(len(plan.creates), 1)
+        self.assertEquals(plan.creates[0].channel.channel_id, channel_id)
+        self.assertEquals(plan.creates[0].endpoint.subscriber_id, "bill")
+        self.assertEquals(plan.creates[0].endpoint.protocol, "Email")
+        self.assertIsNone(plan.created)
+        self.assertEquals(
+            str(plan), "{}: 1 to create, 0 to delete, 1 unchanged".format(
+                channel_id))
+
+        plan = nws.reconcile_channel(channel_id, ["JAverage"], dry_run=True)
+        self.assertTrue(plan.is_empty())
+
+        with mock.patch("uw_nws.DAO.postURL") as mock_post, \
+                mock.patch("uw_nws.DAO.deleteURL") as mock_delete:
+            mock_post.return_value = mock.Mock(status=201, data="")
+            mock_delete.return_value = mock.Mock(status=204, data="")
+            plan = nws.reconcile_channel(
+                channel_id, ["bill"], protocol="SMS", max_in_flight=2)
+            self.assertEquals(len(plan.deletes), 5)
+            self.assertEquals(plan.creates[0].endpoint.protocol, "SMS")
+            self.assertEquals(plan.unchanged, 0)
+            self.assertTrue(plan.is_success())
+            self.assertEquals(plan.deleted.status_counts(), {204: 5})
+            self.assertEquals(plan.created.status_counts(), {201: 1})
+            self.assertEquals(mock_post.call_count, 1)
+            self.assertEquals(mock_delete.call_count, 5)
+
+        self.assertRaises(
+            InvalidUUID, nws.reconcile_channel, "abc", ["bill"])
+        self.assertRaises(
+            InvalidNetID, nws.reconcile_channel, channel_id, ["-@#$ksj"])
+        self.assertRaises(
+            InvalidEndpointProtocol, nws.reconcile_channel, channel_id,
+            ["bill"], protocol="Voice")
+
+        records = nws.search_subscriptions(
+            channel_id=channel_id, records=True)
+        records[0] = records[0]._replace(endpoint=None)
+        with mock.patch.object(nws, "iter_subscriptions") as mock_iter:
+            mock_iter.return_value = iter(records)
+            plan = nws.reconcile_channel(channel_id, [], dry_run=True)
+            self.assertEquals(len(plan.deletes), 4)
+            self.assertNotIn(records[0].subscription_id, plan.deletes)
+
     def test_delete_invalid_subscription(self):
         nws = NWS()
         self.assertRaises(
@@ -0,0 +1,71 @@
+from unittest import TestCase
+from uw_nws.utilities import iter_json_array
+from uw_nws.models import parse_datetime
+from datetime import datetime, timezone
+from json import JSONDecodeError
+import json
+import mock
+import dateutil.parser
+
+
+class NWSTestUtilities(TestCase):
+    def test_iter_json_array(self):
+        data = (
+            '{"QueryParams": {"a": [1, 2]}, "Items": [{"ID": 1}, '
+            '{"ID": 2, "Tags": {"x": "]"}}, [3]], "TotalCount": 3}')
+
+        items = iter_json_array(data, "Items")
+        self.assertEquals(next(items), {"ID": 1})
+        self.assertEquals(list(items), [{"ID": 2, "Tags": {"x": "]"}}, [3]])
+
+        members = {}
+        self.assertEquals(len(list(iter_json_array(
+            data.encode('utf-8'), "Items", members))), 3)
+        self.assertEquals(
+            members, {"QueryParams": {"a": [1, 2]}, "TotalCount": 3})
+
+    def test_iter_json_array_chunks(self):
+        data = json.dumps({
+            "Name": "caf\u00e9", "Items": [12345, "\u00e9\u00e9]\"", True, {
+                "a": [1.5e3, None]}], "TotalCount": 4}).encode('utf-8')
+        for chunk_size in (1, 2, 3, 7):
+            with mock.patch("uw_nws.utilities.CHUNK_SIZE", chunk_size):
+                members = {}
+                self.assertEquals(list(iter_json_array(
+                    data, "Items", members)), [
+                        12345, "\u00e9\u00e9]\"", True,
+                        {"a": [1500.0, None]}])
+                self.assertEquals(
+                    members, {"Name": "caf\u00e9", "TotalCount": 4})
+
+                self.assertRaises(JSONDecodeError, list, iter_json_array(
+                    b'{"Items": [12345 6]}', "Items"))
+
+    def test_iter_json_array_empty(self):
+        self.assertEquals(list(iter_json_array(' { } ', "Items")), [])
+        self.assertEquals(list(iter_json_array(
+            '{\n "Items" : [ ]\n}\n', "Items")), [])
+        self.assertEquals(list(iter_json_array(
+            '{"Items": null}', "Items")), [])
+        self.assertEquals(list(iter_json_array(
+            '{"Other": [1]}', "Items")), [])
+
+    def test_iter_json_array_invalid(self):
+        for data in ['', '[]', '{"Items": [1 2]}', '{"Items": [1,',
+                     '{"Items": [1]', '{Items: []}', '{"Items" []}']:
+            self.assertRaises(
+                JSONDecodeError, list, iter_json_array(data, "Items"))
+
+    def test_parse_datetime(self):
+        for value in ["2012-11-13 22:51:51+00:00", "2012-11-13T22:51:51",
+                      "2013-05-31T00:00:00.123456-07:00", "2013-05-31",
+                      "2012-11-13T22:51:51Z", "Nov 13 2012 10:51:51 PM"]:
+            self.assertEquals(
+                parse_datetime(value), dateutil.parser.parse(value))
+
+        self.assertEquals(
+            parse_datetime("2012-11-13 22:51:51+00:00"),
+            datetime(2012, 11, 13, 22, 51, 51, tzinfo=timezone.utc))
+        self.assertIs(parse_datetime("2012-11-13 22:51:51+00:00"),
+                      parse_datetime("2012-11-13 22:51:51+00:00"))
+        self.assertRaises(ValueError, parse_datetime, "not a date")
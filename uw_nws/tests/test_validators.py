@@ -0,0 +1,39 @@
+from unittest import TestCase
+from uw_nws.validators import (
+    validate_uuid, validate_uuids, validate_person_id,
+    validate_endpoint_protocol)
+from uw_nws.exceptions import InvalidUUID, InvalidEndpointProtocol
+from restclients_core.exceptions import InvalidNetID
+
+
+class NWSTestValidators(TestCase):
+    def test_validate_uuid(self):
+        validate_uuid("b779df7b-d6f6-4afb-8165-8dbe6232119f")
+        self.assertRaises(InvalidUUID, validate_uuid, None)
+        self.assertRaises(InvalidUUID, validate_uuid, "")
+        self.assertRaises(
+            InvalidUUID, validate_uuid, "B779DF7B-D6F6-4AFB-8165-8DBE6232119F")
+        self.assertRaises(
+            InvalidUUID, validate_uuid, "b779df7b-d6f6-4afb-8165-8dbe6232119")
+
+    def test_validate_uuids(self):
+        validate_uuids([])
+        validate_uuids(iter(["b779df7b-d6f6-4afb-8165-8dbe6232119f",
+                             "780f2a49-2118-4969-9bef-bbd38c26970a"]))
+        with self.assertRaises(InvalidUUID) as cm:
+            validate_uuids(["b779df7b-d6f6-4afb-8165-8dbe6232119f", "123",
+                            None])
+        self.assertEquals(str(cm.exception), "123")
+        self.assertRaises(InvalidUUID, validate_uuids, [None])
+
+    def test_validate_person_id(self):
+        validate_person_id("9136CCB8F66711D5BE060004AC494FFE")
+        validate_person_id("javerage@washington.edu")
+        self.assertRaises(InvalidNetID, validate_person_id, None)
+        self.assertRaises(InvalidNetID, validate_person_id, "00ok")
+
+    def test_validate_endpoint_protocol(self):
+        validate_endpoint_protocol("sms")
+        validate_endpoint_protocol("Email")
+        self.assertRaises(
+            InvalidEndpointProtocol, validate_endpoint_protocol, "Voice")
@@ -0,0 +1,91 @@
+from unittest import TestCase
+from uw_nws import NWS
+from uw_nws.models import Person, Endpoint
+from uw_nws.utilities import fdao_nws_override
+from uw_nws.writebehind import WriteBehindBuffer
+from restclients_core.exceptions import DataFailureException
+import threading
+import json
+import mock
+
+
+@fdao_nws_override
+class NWSTestWriteBehindBuffer(TestCase):
+    def test_put_flush(self):
+        buffer = WriteBehindBuffer(delay=60)
+        calls = []
+        buffer.put("a", lambda: calls.append(1) or 1)
+        buffer.put("a", lambda: calls.append(2) or 2)
+        buffer.put("b", lambda: calls.append(3) or 3)
+        self.assertEqual(len(buffer), 2)
+
+        results = buffer.flush()
+        self.assertEqual(calls, [2, 3])
+        self.assertEqual([(r.item, r.value) for r in results],
+                         [("a", 2), ("b", 3)])
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.flush(), [])
+
+        buffer.put("c", lambda: calls.append(4))
+        self.assertEqual(len(buffer.close()), 1)
+        self.assertEqual(calls, [2, 3, 4])
+        self.assertEqual(buffer.close(), [])
+        self.assertRaises(RuntimeError, buffer.put, "d", lambda: None)
+
+    def test_debounce(self):
+        sent = threading.Event()
+        errors = []
+        buffer = WriteBehindBuffer(
+            delay=0.01, on_error=lambda key, ex: errors.append(key))
+
+        def fail():
+            sent.set()
+            raise DataFailureException("/", 500, "")
+
+        with self.assertLogs("uw_nws.writebehind", level="ERROR"):
+            buffer.put("a", fail)
+            self.assertTrue(sent.wait(5))
+            buffer.close()
+        self.assertEqual(errors, ["a"])
+
+    def test_max_delay(self):
+        buffer = WriteBehindBuffer(delay=10, max_delay=12)
+        with mock.patch("uw_nws.writebehind.time.time") as mock_time:
+            mock_time.return_value = 100
+            buffer.put("a", lambda: None)
+            mock_time.return_value = 105
+            buffer.put("a", lambda: None)
+            self.assertEqual(buffer._pending["a"][1:], (100, 112))
+        buffer.close()
+
+    def test_nws_updates(self):
+        buffer = WriteBehindBuffer(delay=60)
+        nws = NWS(actas_user="javerage", write_buffer=buffer)
+        person = nws.get_person_by_uwregid("9136CCB8F66711D5BE060004AC494FFE")
+        endpoint = person.endpoints[0]
+
+        with mock.patch("uw_nws.DAO.putURL") as mock_put:
+            mock_put.return_value = mock.Mock(status=204, data="")
+            for i in range(3):
+                person.attributes["AcceptedTermsOfUse"] = i
+                self.assertEqual(nws.update_person(person), 202)
+                endpoint.endpoint_address = "javerage{}@uw.edu".format(i)
+                self.assertEqual(nws.update_endpoint(endpoint), 202)
+            self.assertEqual(mock_put.call_count, 0)
+
+            results = buffer.flush()
+            self.assertEqual(mock_put.call_count, 2)
+            self.assertTrue(all(result.is_success() for result in results))
+
+            urls = [args[0][0] for args in mock_put.call_args_list]
+            self.assertEqual(urls, [
+                "/notification/v1/person/9136CCB8F66711D5BE060004AC494FFE",
+                "/notification/v1/endpoint/{}".format(endpoint.endpoint_id)])
+            body = json.loads(mock_put.call_args_list[0][0][2])
+            self.assertEqual(
+                body["Person"]["Attributes"]["AcceptedTermsOfUse"], 2)
+            self.assertEqual(
+                mock_put.call_args_list[0][0][1]["X_UW_ACT_AS"], "javerage")
+
+            self.assertEqual(NWS().update_endpoint(endpoint), 204)
+        buffer.close()
@@ -1,4 +1,149 @@
 from commonconf import override_settings
+from json import JSONDecoder, JSONDecodeError
+import codecs
+import re
 
 
 fdao_nws_override = override_settings(RESTCLIENTS_NWS_DAO_CLASS='Mock')
+
+_decoder = JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+# Bytes of a body decoded to text at a time
+CHUNK_SIZE = 65536
+
+
+def get_response_header(response, name):
+    """
+    Returns the value of a response header, matching the name case
+    insensitively, or None.
+    """
+    name = name.lower()
+    for header, value in (response.headers or {}).items():
+        if header.lower() == name:
+            return value
+
+
+def is_last_page(count, page_size, next_result, total_count=None):
+    """
+    Returns True if a page of count search results is the last, because
+    next_result is past the TotalCount of the search, or, without a
+    TotalCount, because the page is short.
+    """
+    if count == 0:
+        return True
+    if total_count is not None:
+        return next_result > int(total_count)
+    return count < page_size
+
+
+def iter_json_array(data, key, members=None):
+    """
+    Yields the elements of the array stored under key in a json object,
+    decoding one element at a time rather than the whole document.  If a
+    members dict is passed, the other top-level members of the object are
+    added to it once the generator is exhausted.  Elements are decoded
+    with the json module, whatever the JSON_CODEC setting.  A bytes body is
+    decoded to text CHUNK_SIZE bytes at a time, and text that has been
+    parsed is released, so no str copy of the whole body is made.
+    """
+    window = _TextWindow(data)
+
+    def skip(idx):
+        while True:
+            idx = _whitespace.match(window.text, idx).end()
+            if idx < len(window.text) or not window.extend():
+                return idx
+
+    def peek(idx):
+        while idx >= len(window.text) and window.extend():
+            pass
+        return window.text[idx:idx + 1]
+
+    def expect(char, idx):
+        if peek(idx) != char:
+            raise JSONDecodeError(
+                "Expecting '{}'".format(char), window.text, idx)
+        return skip(idx + 1)
+
+    def decode(idx):
+        # A value cut off by the end of the window is retried with more
+        # of the body, as is a number that may continue past it
+        while True:
+            try:
+                value, end = _decoder.raw_decode(window.text, idx)
+            except JSONDecodeError:
+                if window.extend():
+                    continue
+                raise
+            if end < len(window.text) or not window.extend():
+                return value, end
+
+    idx = expect('{', skip(0))
+    while peek(idx) != '}':
+        if peek(idx) != '"':
+            raise JSONDecodeError(
+                "Expecting property name", window.text, idx)
+        name, idx = decode(idx)
+        idx = expect(':', skip(idx))
+
+        if name == key and peek(idx) == '[':
+            idx = skip(idx + 1)
+            while peek(idx) != ']':
+                value, idx = decode(idx)
+                idx = window.release(idx)
+                yield value
+                idx = skip(idx)
+                if peek(idx) != ']':
+                    idx = expect(',', idx)
+            idx = skip(idx + 1)
+        else:
+            value, idx = decode(idx)
+            if members is not None:
+                members[name] = value
+            idx = skip(idx)
+
+        if peek(idx) != '}':
+            idx = expect(',', idx)
+
+
+class _TextWindow(object):
+    """
+    The text of a json body that has been decoded but not yet parsed.  A
+    str body is a single window.
+    """
+    def __init__(self, data):
+        if isinstance(data, bytes):
+            self.data = data
+            self.offset = 0
+            self.text = ""
+            self._decoder = codecs.getincrementaldecoder('utf-8')()
+            self.extend()
+        else:
+            self.data = None
+            self.text = data
+
+    def extend(self):
+        """
+        Appends the next CHUNK_SIZE bytes of the body to the text.
+        Returns False if the whole body has been decoded.
+        """
+        if self.data is None:
+            return False
+
+        chunk = self.data[self.offset:self.offset + CHUNK_SIZE]
+        self.offset += len(chunk)
+        final = self.offset >= len(self.data)
+        self.text += self._decoder.decode(chunk, final)
+        if final:
+            self.data = None
+        return True
+
+    def release(self, idx):
+        """
+        Drops the parsed text before idx once it exceeds CHUNK_SIZE.
+        Returns the position of idx in the remaining text.
+        """
+        if idx < CHUNK_SIZE:
+            return idx
+        self.text = self.text[idx:]
+        return 0
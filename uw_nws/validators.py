@@ -0,0 +1,62 @@
+"""
+Validators for NWS identifiers, compiled once at import.
+"""
+
+from restclients_core.exceptions import InvalidNetID, InvalidRegID
+from uw_nws.exceptions import (
+    InvalidUUID, InvalidEndpointProtocol, InvalidSurrogateID)
+import re
+
+RE_UUID = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+RE_REGID = re.compile(r'^[A-F0-9]{32}$', re.I)
+RE_SUBSCRIBER_ID = re.compile(
+    r'^([a-z]adm_)?[a-z][a-z0-9]{0,7}(@washington.edu)?$', re.I)
+RE_PROTOCOL = re.compile(r'^(Email|SMS)$', re.I)
+RE_MESSAGE_TYPE_SURROGATE = re.compile(r'^uw_[a-z0-9|_]{1,37}$', re.I)
+
+
+def validate_uuid(uuid):
+    if uuid is None or not RE_UUID.match(str(uuid)):
+        raise InvalidUUID(uuid)
+
+
+def validate_uuids(uuids):
+    """
+    Validates a batch of UUIDs, raising InvalidUUID for the first invalid
+    one.
+    """
+    match = RE_UUID.match
+    for uuid in uuids:
+        if uuid is None or not match(str(uuid)):
+            raise InvalidUUID(uuid)
+
+
+def validate_regid(regid):
+    if regid is None or not RE_REGID.match(str(regid)):
+        raise InvalidRegID(regid)
+
+
+def validate_subscriber_id(subscriber_id):
+    if subscriber_id is None or not RE_SUBSCRIBER_ID.match(str(subscriber_id)):
+        raise InvalidNetID(subscriber_id)
+
+
+def validate_person_id(identifier):
+    """
+    Validates a uwregid or surrogate id.
+    """
+    if identifier is not None and RE_REGID.match(str(identifier)):
+        return
+    validate_subscriber_id(identifier)
+
+
+def validate_endpoint_protocol(protocol):
+    if protocol is None or not RE_PROTOCOL.match(str(protocol)):
+        raise InvalidEndpointProtocol(protocol)
+
+
+def validate_message_type_surrogate(surrogate_id):
+    if (surrogate_id is None or
+            not RE_MESSAGE_TYPE_SURROGATE.match(str(surrogate_id))):
+        raise InvalidSurrogateID(surrogate_id)
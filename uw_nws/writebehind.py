@@ -0,0 +1,132 @@
+"""
+A write-behind buffer that collapses repeated updates of a resource into a
+single request.
+"""
+
+from uw_nws.models import OperationResult
+from logging import getLogger
+import threading
+import atexit
+import time
+
+logger = getLogger(__name__)
+
+
+class WriteBehindBuffer(object):
+    """
+    Holds the latest pending write for each key, sending it from a
+    background thread once no newer write has been added for delay
+    seconds, or max_delay seconds after the first pending write.  Pending
+    writes are sent by flush(), and by close() when the process exits.
+    """
+    def __init__(self, delay=1.0, max_delay=5.0, on_error=None):
+        """
+        :param on_error: an optional callable, passed the key and the
+                         exception of a write that failed in the background
+        """
+        self.delay = delay
+        self.max_delay = max_delay
+        self.on_error = on_error
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def put(self, key, func):
+        """
+        Sets func as the pending write for key, replacing any pending write
+        for the same key.
+        """
+        now = time.time()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("WriteBehindBuffer is closed")
+
+            pending = self._pending.get(key)
+            first = pending[1] if pending is not None else now
+            due = min(now + self.delay, first + self.max_delay)
+            self._pending[key] = (func, first, due)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="uw_nws_write_behind",
+                    daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self):
+        """
+        Sends all pending writes now.
+        Returns a list of OperationResult, one for each write sent
+        """
+        with self._condition:
+            keys = list(self._pending.keys())
+        return self._send(keys)
+
+    def close(self):
+        """
+        Sends all pending writes and stops the background thread.
+        Returns a list of OperationResult, one for each write sent
+        """
+        with self._condition:
+            if self._closed:
+                return []
+            self._closed = True
+            self._condition.notify()
+
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        atexit.unregister(self.close)
+        return self.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.time()
+                    due = [key for key, entry in self._pending.items()
+                           if entry[2] <= now]
+                    if due:
+                        break
+                    timeout = None
+                    if self._pending:
+                        timeout = min(entry[2] for entry in (
+                            self._pending.values())) - now
+                    self._condition.wait(timeout)
+
+                if self._closed:
+                    return
+
+            for result in self._send(due):
+                if not result.is_success():
+                    self._report_error(result)
+
+    def _send(self, keys):
+        results = []
+        with self._send_lock:
+            for key in keys:
+                with self._condition:
+                    pending = self._pending.pop(key, None)
+                if pending is None:
+                    continue
+                try:
+                    results.append(OperationResult(key, value=pending[0]()))
+                except Exception as ex:
+                    results.append(OperationResult(key, exception=ex))
+        return results
+
+    def _report_error(self, result):
+        logger.error("NWS write-behind for {} failed: {}".format(
+            result.item, result.exception))
+        if self.on_error is not None:
+            try:
+                self.on_error(result.item, result.exception)
+            except Exception as ex:
+                logger.exception(
+                    "NWS write-behind error callback failed: {}".format(ex))
+
+    def __len__(self):
+        return len(self._pending)